@@ -23,9 +23,16 @@ import logging
 import pathlib
 import re
 import sys
+import time
 from typing import List, Optional
 
-from .controller import Controller
+from .controller import Commissioner, Controller
+from .controller.commissioning import (
+    MAX_CONCURRENT_PAIRINGS,
+    STATUS_BACKOFF,
+    STATUS_PAIRED,
+    load_manifest,
+)
 from .exceptions import HomeKitException
 from .model.characteristics import CharacteristicsTypes
 from .model.services import ServicesTypes
@@ -81,39 +88,49 @@ def prepare_string(input_string):
 
 async def discover_ip(args):
     controller = Controller()
-    for discovery in await controller.discover_ip(args.timeout):
-        info = discovery.info
+    discoveries = controller.discover_ip_iter(
+        args.timeout,
+        count=args.count,
+        device_ids=args.device_ids,
+        quiet_period=args.quiet_period,
+    )
+    try:
+        async for discovery in discoveries:
+            print_discovery(discovery, args)
+    finally:
+        await discoveries.aclose()
 
-        if args.unpaired_only and info["sf"] == "0":
-            continue
+    return True
 
-        print("Name: {name}".format(name=prepare_string(info["name"])))
-        print(
-            "Url: http_impl://{ip}:{port}".format(ip=info["address"], port=info["port"])
-        )
-        print("Configuration number (c#): {conf}".format(conf=info["c#"]))
-        print(
-            "Feature Flags (ff): {f} (Flag: {flags})".format(
-                f=info["flags"], flags=info["ff"]
-            )
+
+def print_discovery(discovery, args):
+    info = discovery.info
+    if args.unpaired_only and info["sf"] == "0":
+        return
+
+    print("Name: {name}".format(name=prepare_string(info["name"])))
+    print("Url: http_impl://{ip}:{port}".format(ip=info["address"], port=info["port"]))
+    print("Configuration number (c#): {conf}".format(conf=info["c#"]))
+    print(
+        "Feature Flags (ff): {f} (Flag: {flags})".format(
+            f=info["flags"], flags=info["ff"]
         )
-        print("Device ID (id): {id}".format(id=info["id"]))
-        print("Model Name (md): {md}".format(md=prepare_string(info["md"])))
-        print("Protocol Version (pv): {pv}".format(pv=info["pv"]))
-        print("State Number (s#): {sn}".format(sn=info["s#"]))
-        print(
-            "Status Flags (sf): {sf} (Flag: {flags})".format(
-                sf=info["statusflags"], flags=info["sf"]
-            )
+    )
+    print("Device ID (id): {id}".format(id=info["id"]))
+    print("Model Name (md): {md}".format(md=prepare_string(info["md"])))
+    print("Protocol Version (pv): {pv}".format(pv=info["pv"]))
+    print("State Number (s#): {sn}".format(sn=info["s#"]))
+    print(
+        "Status Flags (sf): {sf} (Flag: {flags})".format(
+            sf=info["statusflags"], flags=info["sf"]
         )
-        print(
-            "Category Identifier (ci): {c} (Id: {ci})".format(
-                c=info["category"], ci=info["ci"]
-            )
+    )
+    print(
+        "Category Identifier (ci): {c} (Id: {ci})".format(
+            c=info["category"], ci=info["ci"]
         )
-        print()
-
-    return True
+    )
+    print()
 
 
 async def pair_ip(args):
@@ -157,6 +174,56 @@ async def pair_ip(args):
     return True
 
 
+async def commission(args):
+    controller = Controller()
+
+    try:
+        controller.load_data(args.file)
+    except Exception:
+        logger.exception(f"Error while loading {args.file}")
+        return False
+
+    try:
+        manifest = load_manifest(args.manifest)
+    except (OSError, ValueError) as e:
+        print(f"Cannot load manifest {args.manifest}: {e}")
+        return False
+
+    def on_result(device_id, result):
+        if result["status"] == STATUS_PAIRED:
+            controller.save_data(args.file)
+        print_commissioning_result(device_id, result)
+
+    state_file = args.state_file or pathlib.Path(args.manifest).with_suffix(
+        ".state.json"
+    )
+    commissioner = Commissioner(controller, state_file, args.concurrency)
+    results = await commissioner.async_commission(manifest, args.timeout, on_result)
+
+    paired = [
+        device_id
+        for device_id, result in results.items()
+        if result["status"] == STATUS_PAIRED
+    ]
+    print(f"{len(paired)} of {len(manifest)} devices are paired.")
+
+    return all(
+        results.get(entry["id"].upper(), {}).get("status") == STATUS_PAIRED
+        or (entry.get("alias") or entry["id"].upper()) in controller.pairings
+        for entry in manifest
+    )
+
+
+def print_commissioning_result(device_id, result):
+    message = f'{device_id} ("{result["alias"]}"): {result["status"]}'
+    if "error" in result:
+        message += f" ({result['error']})"
+    if result["status"] == STATUS_BACKOFF:
+        retry_at = time.strftime("%X", time.localtime(result["retry_at"]))
+        message += f", retry after {retry_at}"
+    print(message)
+
+
 async def get_accessories(args: Namespace) -> bool:
     controller = Controller()
 
@@ -462,6 +529,29 @@ async def main(argv: Optional[List[str]] = None) -> None:
         dest="unpaired_only",
         help="If activated, this option will show only unpaired HomeKit IP Devices",
     )
+    discover_parser.add_argument(
+        "-n",
+        action="store",
+        required=False,
+        dest="count",
+        type=int,
+        help="Stop once this many devices have been found",
+    )
+    discover_parser.add_argument(
+        "-d",
+        action="append",
+        required=False,
+        dest="device_ids",
+        help="Stop once this device id has been found (can be given more than once)",
+    )
+    discover_parser.add_argument(
+        "-q",
+        action="store",
+        required=False,
+        dest="quiet_period",
+        type=float,
+        help="Stop once no new device has been found for this many seconds",
+    )
 
     # pair_ip
     pair_parser = subparsers.add_parser(
@@ -484,6 +574,54 @@ async def main(argv: Optional[List[str]] = None) -> None:
         help="HomeKit configuration code",
     )
 
+    # commission
+    commission_parser = subparsers.add_parser(
+        "commission",
+        help="Pair with all the HomeKit devices listed in a manifest",
+    )
+    commission_parser.set_defaults(func=commission)
+    commission_parser.add_argument(
+        "-f",
+        action="store",
+        required=False,
+        dest="file",
+        default=DEFAULT_PAIRING_FILE,
+        help="File with the pairing data",
+    )
+    commission_parser.add_argument(
+        "-m",
+        action="store",
+        required=True,
+        dest="manifest",
+        help='JSON list of devices, like [{"id": ..., "pin": ..., "alias": ...}]',
+    )
+    commission_parser.add_argument(
+        "-s",
+        action="store",
+        required=False,
+        dest="state_file",
+        help="File to keep the results in, so a new run can pick up where this one "
+        "stopped (defaults to the manifest name with .state.json)",
+    )
+    commission_parser.add_argument(
+        "-j",
+        action="store",
+        required=False,
+        dest="concurrency",
+        type=int,
+        default=MAX_CONCURRENT_PAIRINGS,
+        help="Number of devices to pair with at the same time",
+    )
+    commission_parser.add_argument(
+        "-t",
+        action="store",
+        required=False,
+        dest="timeout",
+        type=int,
+        default=10,
+        help="Number of seconds to look for the devices",
+    )
+
     # get_accessories - return all characteristics of all services of all accessories.
     get_accessories_parser = subparsers.add_parser(
         "accessories",
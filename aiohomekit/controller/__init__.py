@@ -14,6 +14,16 @@
 # limitations under the License.
 #
 
-__all__ = ["Controller"]
+__all__ = [
+    "AccessoriesCache",
+    "Commissioner",
+    "ConnectionManager",
+    "Controller",
+    "PollingPlanner",
+]
 
+from .cache import AccessoriesCache
+from .commissioning import Commissioner
+from .connections import ConnectionManager
 from .controller import Controller
+from .polling import PollingPlanner
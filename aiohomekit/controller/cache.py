@@ -0,0 +1,115 @@
+#
+# Copyright 2019 aiohomekit team
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""A persistent cache of the accessory database of paired devices."""
+
+import json
+from json.decoder import JSONDecodeError
+import logging
+import os
+import pathlib
+import re
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class AccessoriesCache:
+    """
+    Stores the normalised /accessories response of each pairing on disk.
+
+    Entries are keyed by the accessory pairing id and the configuration number (c#)
+    the accessory advertised when the data was fetched. An accessory bumps its c#
+    whenever its accessory database changes, so an entry is only used while the c#
+    still matches.
+
+    Each pairing is stored in its own file in the given directory, so updating one
+    pairing doesn't rewrite the data of every other pairing.
+    """
+
+    def __init__(self, path: str) -> None:
+        self.path = pathlib.Path(path)
+        self._entries: Dict[str, Dict[str, Any]] = {}
+
+    def _get_filename(self, pairing_id: str) -> pathlib.Path:
+        # Pairing ids look like MAC addresses, and ':' isn't allowed in Windows paths
+        return self.path / (re.sub(r"[^0-9A-Za-z_-]", "_", pairing_id) + ".json")
+
+    def _load(self, pairing_id: str) -> Optional[Dict[str, Any]]:
+        if pairing_id in self._entries:
+            return self._entries[pairing_id]
+
+        try:
+            with open(self._get_filename(pairing_id)) as input_fp:
+                entry = json.load(input_fp)
+        except FileNotFoundError:
+            return None
+        except (OSError, JSONDecodeError):
+            logger.warning("Ignoring unreadable accessories cache for %s", pairing_id)
+            return None
+
+        if not isinstance(entry, dict) or entry.get("id") != pairing_id:
+            return None
+
+        self._entries[pairing_id] = entry
+        return entry
+
+    def get(self, pairing_id: str, config_num: int) -> Optional[List[Dict[str, Any]]]:
+        """
+        Returns the cached accessories for a pairing if they were fetched at this config_num.
+
+        :param pairing_id: the accessory pairing id (e.g. "12:34:56:00:01:0A")
+        :param config_num: the c# currently advertised by the accessory
+        :return: the accessories list, or None if there is no usable entry
+        """
+        entry = self._load(pairing_id)
+        if not entry or entry.get("config_num") != config_num:
+            return None
+        return entry["accessories"]
+
+    def set(
+        self, pairing_id: str, config_num: int, accessories: List[Dict[str, Any]]
+    ) -> None:
+        """
+        Stores the accessories of a pairing at a config_num, replacing any older entry.
+
+        Failing to write the cache is logged and otherwise ignored, the data is still
+        available from the accessory next time.
+        """
+        entry = {"id": pairing_id, "config_num": config_num, "accessories": accessories}
+        self._entries[pairing_id] = entry
+
+        filename = self._get_filename(pairing_id)
+        tmp_filename = filename.with_suffix(".tmp")
+
+        try:
+            self.path.mkdir(parents=True, exist_ok=True)
+            with open(tmp_filename, "w") as output_fp:
+                json.dump(entry, output_fp)
+            # Replace in one step so a crash never leaves a half written entry
+            os.replace(tmp_filename, filename)
+        except OSError:
+            logger.warning("Could not write accessories cache for %s", pairing_id)
+
+    def remove(self, pairing_id: str) -> None:
+        """Forgets the cached accessories of a pairing, e.g. when it is unpaired."""
+        self._entries.pop(pairing_id, None)
+        try:
+            os.unlink(self._get_filename(pairing_id))
+        except FileNotFoundError:
+            pass
+        except OSError:
+            logger.warning("Could not remove accessories cache for %s", pairing_id)
@@ -0,0 +1,250 @@
+#
+# Copyright 2019 aiohomekit team
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Pair with many accessories in one go."""
+
+import asyncio
+import json
+from json.decoder import JSONDecodeError
+import logging
+import os
+import pathlib
+import time
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+from aiohomekit.exceptions import BackoffError, HomeKitException
+
+logger = logging.getLogger(__name__)
+
+# How many pair setups may run at once
+MAX_CONCURRENT_PAIRINGS = 4
+
+# How long to leave a device alone if it asks us to back off without saying how long for
+DEFAULT_RETRY_DELAY = 60
+
+STATUS_PAIRED = "paired"
+STATUS_FAILED = "failed"
+STATUS_NOT_FOUND = "not_found"
+STATUS_BACKOFF = "backoff"
+
+
+def load_manifest(path: str) -> List[Dict[str, str]]:
+    """
+    Load a commissioning manifest.
+
+    The manifest is a JSON list with an object per accessory, like
+    {"id": "12:34:56:00:01:0A", "pin": "031-45-154", "alias": "kitchen"}.
+    The alias is optional and defaults to the device id.
+    """
+    with open(path) as input_fp:
+        return json.load(input_fp)
+
+
+class Commissioner:
+    """
+    Pairs a controller with a batch of accessories.
+
+    One browse finds every accessory in the manifest, and each accessory is paired as
+    soon as it is found, with at most `concurrency` pair setups running at once.
+
+    The outcome for each device is stored in `state_file` as it happens. A later run
+    with the same state file skips the devices that were already paired, and the
+    devices that asked to back off until their retry delay has passed.
+    """
+
+    def __init__(
+        self,
+        controller,
+        state_file: Optional[str] = None,
+        concurrency: int = MAX_CONCURRENT_PAIRINGS,
+    ) -> None:
+        self.controller = controller
+        self.state_file = pathlib.Path(state_file) if state_file else None
+        self.concurrency = concurrency
+        self.results: Dict[str, Dict[str, Any]] = self._load_state()
+
+    def _load_state(self) -> Dict[str, Dict[str, Any]]:
+        if not self.state_file:
+            return {}
+
+        try:
+            with open(self.state_file) as input_fp:
+                state = json.load(input_fp)
+        except FileNotFoundError:
+            return {}
+        except (OSError, JSONDecodeError):
+            logger.warning("Ignoring unreadable state file %s", self.state_file)
+            return {}
+
+        return state if isinstance(state, dict) else {}
+
+    def _save_state(self) -> None:
+        if not self.state_file:
+            return
+
+        tmp_filename = self.state_file.with_suffix(".tmp")
+        try:
+            with open(tmp_filename, "w") as output_fp:
+                json.dump(self.results, output_fp, indent=4)
+            os.replace(tmp_filename, self.state_file)
+        except OSError:
+            logger.warning("Could not write state file %s", self.state_file)
+
+    def _is_pending(self, device_id: str, alias: str, now: float) -> bool:
+        if alias in self.controller.pairings:
+            return False
+
+        result = self.results.get(device_id)
+        if not result:
+            return True
+
+        if result["status"] == STATUS_PAIRED:
+            return False
+
+        return result.get("retry_at", 0) <= now
+
+    def _set_result(
+        self,
+        device_id: str,
+        alias: str,
+        status: str,
+        on_result: Optional[Callable[[str, Dict[str, Any]], None]],
+        error: Optional[str] = None,
+        retry_delay: Optional[float] = None,
+    ) -> None:
+        previous = self.results.get(device_id, {})
+
+        result = {
+            "alias": alias,
+            "status": status,
+            "attempts": previous.get("attempts", 0) + 1,
+        }
+        if error:
+            result["error"] = error
+        if retry_delay:
+            result["retry_at"] = time.time() + retry_delay
+
+        self.results[device_id] = result
+        self._save_state()
+
+        if on_result:
+            on_result(device_id, result)
+
+    async def _pair(self, discovery, device_id, alias, pin, semaphore, on_result):
+        async with semaphore:
+            try:
+                finish_pairing = await discovery.start_pairing(alias)
+                await finish_pairing(pin)
+
+            except BackoffError as e:
+                await discovery.close()
+                self._set_result(
+                    device_id,
+                    alias,
+                    STATUS_BACKOFF,
+                    on_result,
+                    error=str(e),
+                    retry_delay=e.retry_delay or DEFAULT_RETRY_DELAY,
+                )
+
+            except HomeKitException as e:
+                await discovery.close()
+                self._set_result(
+                    device_id,
+                    alias,
+                    STATUS_FAILED,
+                    on_result,
+                    error=str(e) or type(e).__name__,
+                )
+
+            else:
+                self._set_result(device_id, alias, STATUS_PAIRED, on_result)
+
+    async def async_commission(
+        self,
+        manifest: Iterable[Dict[str, str]],
+        max_seconds: int = 10,
+        on_result: Optional[Callable[[str, Dict[str, Any]], None]] = None,
+    ) -> Dict[str, Dict[str, Any]]:
+        """
+        Pair with every accessory in the manifest that isn't paired yet.
+
+        :param manifest: dicts with the "id" and "pin" (and optionally "alias") of each
+                         accessory, see load_manifest
+        :param max_seconds: how long to browse for accessories that haven't been found
+        :param on_result: called with the device id and result of each accessory as soon
+                          as it is known, e.g. to save the new pairings
+        :return: the results of all accessories ever commissioned with this state file,
+                 by device id
+        """
+        now = time.time()
+        pending = {}
+
+        for entry in manifest:
+            device_id = entry["id"].upper()
+            alias = entry.get("alias") or device_id
+
+            if not self._is_pending(device_id, alias, now):
+                continue
+
+            try:
+                self.controller.check_pin_format(entry["pin"])
+            except HomeKitException as e:
+                self._set_result(device_id, alias, STATUS_FAILED, on_result, str(e))
+                continue
+
+            pending[device_id] = (alias, entry["pin"])
+
+        if not pending:
+            return self.results
+
+        semaphore = asyncio.Semaphore(self.concurrency)
+        tasks = []
+
+        # Device ids are matched case insensitively, so the browse stops itself
+        discoveries = self.controller.discover_ip_iter(max_seconds)
+        try:
+            async for discovery in discoveries:
+                device_id = discovery.device_id.upper()
+                if device_id not in pending:
+                    continue
+
+                alias, pin = pending.pop(device_id)
+                tasks.append(
+                    asyncio.ensure_future(
+                        self._pair(
+                            discovery, device_id, alias, pin, semaphore, on_result
+                        )
+                    )
+                )
+
+                if not pending:
+                    break
+
+            for device_id, (alias, _) in pending.items():
+                self._set_result(
+                    device_id, alias, STATUS_NOT_FOUND, on_result, "Device not found"
+                )
+
+            if tasks:
+                await asyncio.gather(*tasks)
+
+        finally:
+            await discoveries.aclose()
+            for task in tasks:
+                task.cancel()
+
+        return self.results
@@ -0,0 +1,204 @@
+#
+# Copyright 2019 aiohomekit team
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Limit the sockets held open by the pairings of a controller."""
+
+import asyncio
+import logging
+from typing import Any, Dict, List, Optional
+
+logger = logging.getLogger(__name__)
+
+
+class ConnectionManager:
+    """
+    Keeps track of the open connections of every pairing of a controller.
+
+    Pairings connect when they are first used, not when they are loaded. The manager
+    can additionally cap the number of open sockets:
+
+     * max_connections limits the sockets open across all pairings, and
+       max_per_host the sockets open to a single IP address. A pairing that needs a
+       socket while the cap is reached closes the least recently used idle connection,
+       or waits until one becomes idle.
+     * idle_timeout closes connections that haven't made a request for that many
+       seconds.
+
+    A connection is idle when no request is in flight and its pairing has no event
+    subscriptions, as events can only arrive on an open connection. When any limit is
+    set, a connection that isn't subscribed to events isn't reconnected in the
+    background after it drops, it reconnects when it is next used instead.
+
+    How many connect attempts (and pair verifies) run at once is up to the
+    ReconnectScheduler.
+    """
+
+    def __init__(
+        self,
+        max_connections: Optional[int] = None,
+        max_per_host: Optional[int] = None,
+        idle_timeout: Optional[float] = None,
+    ) -> None:
+        self.max_connections = max_connections
+        self.max_per_host = max_per_host
+        self.idle_timeout = idle_timeout
+
+        # The host each open connection is connected to, and when it was last used
+        self._hosts: Dict[Any, str] = {}
+        self._last_used: Dict[Any, float] = {}
+        self._open_by_host: Dict[str, int] = {}
+        self._waiters: List[asyncio.Future] = []
+        self._idle_check = None
+
+    @property
+    def open_connections(self) -> int:
+        return len(self._hosts)
+
+    @property
+    def is_limited(self) -> bool:
+        return (
+            self.max_connections is not None
+            or self.max_per_host is not None
+            or self.idle_timeout is not None
+        )
+
+    def should_reconnect(self, connection) -> bool:
+        """Returns True if `connection` should reconnect by itself when it drops."""
+        if not self.is_limited:
+            return True
+        return bool(getattr(connection.owner, "subscriptions", None))
+
+    def _is_idle(self, connection) -> bool:
+        if not connection.is_idle:
+            return False
+        return not getattr(connection.owner, "subscriptions", None)
+
+    def _find_idle(self, host: Optional[str] = None):
+        idle = [
+            connection
+            for connection, connection_host in self._hosts.items()
+            if (host is None or connection_host == host) and self._is_idle(connection)
+        ]
+        if not idle:
+            return None
+        return min(idle, key=self._last_used.__getitem__)
+
+    def _host_is_full(self, host: str) -> bool:
+        return (
+            self.max_per_host is not None
+            and self._open_by_host.get(host, 0) >= self.max_per_host
+        )
+
+    def _is_full(self) -> bool:
+        return (
+            self.max_connections is not None
+            and len(self._hosts) >= self.max_connections
+        )
+
+    def _try_open(self, connection, host: str) -> bool:
+        while self._host_is_full(host) or self._is_full():
+            victim = self._find_idle(host if self._host_is_full(host) else None)
+            if not victim:
+                return False
+            logger.debug("Closing idle connection %r to make room", victim)
+            self._close(victim)
+
+        self._hosts[connection] = host
+        self._last_used[connection] = asyncio.get_event_loop().time()
+        self._open_by_host[host] = self._open_by_host.get(host, 0) + 1
+        self._schedule_idle_check()
+        return True
+
+    async def acquire(self, connection, host: str) -> None:
+        """
+        Wait until `connection` may open a socket to `host`.
+
+        The slot is held until release() is called for the connection.
+        """
+        if connection in self._hosts:
+            return
+
+        while not self._try_open(connection, host):
+            waiter = asyncio.get_event_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            finally:
+                self._waiters.remove(waiter)
+
+    def release(self, connection) -> None:
+        """Free the slot of a connection whose socket has been closed."""
+        if not self._remove(connection):
+            return
+        self._wake_waiters()
+
+    def touch(self, connection) -> None:
+        """Record that `connection` has just been used."""
+        if connection not in self._hosts:
+            return
+        self._last_used[connection] = asyncio.get_event_loop().time()
+
+        # The connection may have become idle, so it can make room for a waiter
+        self._wake_waiters()
+
+    def _remove(self, connection) -> bool:
+        host = self._hosts.pop(connection, None)
+        if host is None:
+            return False
+
+        del self._last_used[connection]
+        self._open_by_host[host] -= 1
+        if not self._open_by_host[host]:
+            del self._open_by_host[host]
+
+        if not self._hosts and self._idle_check:
+            self._idle_check.cancel()
+            self._idle_check = None
+
+        return True
+
+    def _close(self, connection) -> None:
+        self._remove(connection)
+        connection.close_idle()
+
+    def _wake_waiters(self) -> None:
+        for waiter in self._waiters:
+            if not waiter.done():
+                waiter.set_result(None)
+
+    def _schedule_idle_check(self) -> None:
+        if self.idle_timeout is None or self._idle_check:
+            return
+        self._idle_check = asyncio.get_event_loop().call_later(
+            self.idle_timeout / 2, self._check_idle
+        )
+
+    def _check_idle(self) -> None:
+        self._idle_check = None
+        now = asyncio.get_event_loop().time()
+        closed = False
+
+        for connection, last_used in list(self._last_used.items()):
+            if now - last_used >= self.idle_timeout and self._is_idle(connection):
+                logger.debug("Closing connection %r after being idle", connection)
+                self._close(connection)
+                closed = True
+
+        if closed:
+            self._wake_waiters()
+
+        if self._hosts:
+            self._schedule_idle_check()
@@ -14,12 +14,15 @@
 # limitations under the License.
 #
 
+import asyncio
+from collections.abc import MutableMapping
+from concurrent.futures import Executor
 import json
 from json.decoder import JSONDecodeError
 import logging
 import pathlib
 import re
-from typing import Dict
+from typing import Any, Callable, Dict, Iterator, List, Optional
 
 from ..const import BLE_TRANSPORT_SUPPORTED, IP_TRANSPORT_SUPPORTED
 from ..exceptions import (
@@ -29,13 +32,83 @@ from ..exceptions import (
     MalformedPinError,
     TransportNotSupportedError,
 )
+from .cache import AccessoriesCache
+from .connections import ConnectionManager
 from .pairing import AbstractPairing
+from .reconnect import ReconnectScheduler
 
 if IP_TRANSPORT_SUPPORTED:
-    from aiohomekit.zeroconf import async_find_data_for_device_id
+    from zeroconf.asyncio import AsyncZeroconf
+
+    from aiohomekit.zeroconf import (
+        HomeKitBrowser,
+        async_find_data_for_device_id,
+        async_iter_homekit_devices,
+    )
 
     from .ip import IpDiscovery, IpPairing
-    from .ip.zeroconf import async_discover_homekit_devices
+
+# How long shutdown() waits for the pairings to close, in seconds
+SHUTDOWN_TIMEOUT = 10
+
+
+class Pairings(MutableMapping):
+    """
+    The pairings of a controller, by alias.
+
+    Pairings can be added as just their pairing data, with add_lazy(). The pairing
+    object (and with it the connection) is only built when it is first looked up.
+    Checking whether an alias exists doesn't build anything.
+    """
+
+    def __init__(self, factory: Callable[[Dict[str, Any]], AbstractPairing]) -> None:
+        self._factory = factory
+        self._pairings: Dict[str, AbstractPairing] = {}
+        self._pending: Dict[str, Dict[str, Any]] = {}
+
+    def add_lazy(self, alias: str, pairing_data: Dict[str, Any]) -> None:
+        """Add a pairing that is built from `pairing_data` when it is first used."""
+        self._pairings.pop(alias, None)
+        self._pending[alias] = pairing_data
+
+    def get_pairing_data(self, alias: str) -> Dict[str, Any]:
+        """Returns the pairing data of `alias`, without building the pairing."""
+        if alias in self._pending:
+            return self._pending[alias]
+        return self._pairings[alias].pairing_data
+
+    def loaded(self) -> List[AbstractPairing]:
+        """Returns the pairings that have been built so far."""
+        return list(self._pairings.values())
+
+    def __getitem__(self, alias: str) -> AbstractPairing:
+        if alias in self._pairings:
+            return self._pairings[alias]
+
+        pairing = self._factory(self._pending[alias])
+        del self._pending[alias]
+        self._pairings[alias] = pairing
+        return pairing
+
+    def __setitem__(self, alias: str, pairing: AbstractPairing) -> None:
+        self._pending.pop(alias, None)
+        self._pairings[alias] = pairing
+
+    def __delitem__(self, alias: str) -> None:
+        if alias in self._pending:
+            del self._pending[alias]
+        else:
+            del self._pairings[alias]
+
+    def __contains__(self, alias: object) -> bool:
+        return alias in self._pairings or alias in self._pending
+
+    def __iter__(self) -> Iterator[str]:
+        yield from list(self._pairings)
+        yield from list(self._pending)
+
+    def __len__(self) -> int:
+        return len(self._pairings) + len(self._pending)
 
 
 class Controller:
@@ -43,21 +116,89 @@ class Controller:
     This class represents a HomeKit controller (normally your iPhone or iPad).
     """
 
-    def __init__(self, ble_adapter: str = "hci0", async_zeroconf_instance=None) -> None:
+    def __init__(
+        self,
+        ble_adapter: str = "hci0",
+        async_zeroconf_instance=None,
+        accessories_cache: Optional[AccessoriesCache] = None,
+        reconnect_scheduler: Optional[ReconnectScheduler] = None,
+        crypto_executor: Optional[Executor] = None,
+        connection_manager: Optional[ConnectionManager] = None,
+    ) -> None:
         """
         Initialize an empty controller. Use 'load_data()' to load the pairing data.
 
         :param ble_adapter: the bluetooth adapter to be used (defaults to hci0)
+        :param accessories_cache: where to keep the accessory database of each pairing
+                                  between restarts (optional)
+        :param reconnect_scheduler: coordinates reconnects between pairings (a default one
+                                    is created if not given)
+        :param crypto_executor: a thread pool to run the crypto of pair setup and pair
+                                verify in, instead of the event loop (optional)
+        :param connection_manager: limits the connections held open by the pairings (a
+                                   default one without limits is created if not given)
         """
-        self.pairings = {}
+        self.pairings = Pairings(self._create_pairing)
         self._async_zeroconf_instance = async_zeroconf_instance
+        self.accessories_cache = accessories_cache
+        self.reconnect_scheduler = reconnect_scheduler or ReconnectScheduler()
+        self.crypto_executor = crypto_executor
+        self.connection_manager = connection_manager or ConnectionManager()
+        self.browser = None
+        self._owns_async_zeroconf_instance = False
         self.ble_adapter = ble_adapter
         self.logger = logging.getLogger(__name__)
 
-    async def discover_ip(self, max_seconds=10):
+    async def start_browser(self):
+        """
+        Start a HAP zeroconf browser that keeps running until shutdown().
+
+        While it runs, reconnects and device lookups use the data it has already
+        collected instead of browsing again, and discover_ip returns immediately with the
+        devices seen so far. Use browser.add_listener to be told about devices appearing,
+        changing or going away.
+
+        :return: the HomeKitBrowser
+        """
+        if not IP_TRANSPORT_SUPPORTED:
+            raise TransportNotSupportedError("IP")
+
+        if self.browser:
+            return self.browser
+
+        if not self._async_zeroconf_instance:
+            self._async_zeroconf_instance = AsyncZeroconf()
+            self._owns_async_zeroconf_instance = True
+
+        self.browser = HomeKitBrowser(self._async_zeroconf_instance)
+        self.browser.add_listener(self._device_seen)
+        await self.browser.async_start()
+        return self.browser
+
+    def _device_seen(self, device_id, data) -> None:
+        """When a device we are reconnecting to shows up in zeroconf, retry it first."""
+        if not data:
+            return
+
+        # A pairing that hasn't been built yet can't be reconnecting
+        for pairing in self.pairings.loaded():
+            if pairing.pairing_data.get("AccessoryPairingID") != device_id:
+                continue
+
+            connection = getattr(pairing, "connection", None)
+            if not connection or not connection.is_reconnecting:
+                continue
+
+            self.reconnect_scheduler.prioritise(connection)
+            asyncio.ensure_future(connection.reconnect_soon())
+
+    async def discover_ip(
+        self, max_seconds=10, count=None, device_ids=None, quiet_period=None
+    ):
         """
-        Perform a Bonjour discovery for HomeKit accessory. The discovery will last for the given amount of seconds. The
-        result will be a list of dicts. The keys of the dicts are:
+        Perform a Bonjour discovery for HomeKit accessory. The discovery will last for the given amount of seconds, or
+        until one of the optional stop conditions is met. The result will be a list of IpDiscovery objects. The keys of
+        their info dicts are:
          * name: the Bonjour name of the HomeKit accessory (i.e. Testsensor1._hap._tcp.local.)
          * address: the IP address of the accessory
          * port: the used port
@@ -78,21 +219,60 @@ class Controller:
 
         :param max_seconds: how long should the Bonjour service browser do the discovery (default 10s). See sleep for
                             more details
-        :return: a list of dicts as described above
+        :param count: stop once this many devices have been found
+        :param device_ids: stop once all of these device ids have been found
+        :param quiet_period: stop once no new device has been found for this many seconds
+        :return: a list of IpDiscovery objects as described above
+        """
+        discoveries = self.discover_ip_iter(
+            max_seconds, count=count, device_ids=device_ids, quiet_period=quiet_period
+        )
+        try:
+            return [discovery async for discovery in discoveries]
+        finally:
+            await discoveries.aclose()
+
+    async def discover_ip_iter(
+        self, max_seconds=10, count=None, device_ids=None, quiet_period=None
+    ):
+        """
+        Like discover_ip, but yields each IpDiscovery as soon as the device is resolved.
+
+        Breaking out of the loop stops the discovery. Call aclose() on the iterator
+        afterwards to release the browser straight away, rather than when it is
+        garbage collected.
         """
         if not IP_TRANSPORT_SUPPORTED:
             raise TransportNotSupportedError("IP")
-        devices = await async_discover_homekit_devices(
-            max_seconds, async_zeroconf_instance=self._async_zeroconf_instance
+
+        if self.browser:
+            found = 0
+            for device in self.browser.devices():
+                yield IpDiscovery(self, device)
+                found += 1
+                if count is not None and found >= count:
+                    return
+            return
+
+        devices = async_iter_homekit_devices(
+            max_seconds,
+            async_zeroconf_instance=self._async_zeroconf_instance,
+            count=count,
+            device_ids=device_ids,
+            quiet_period=quiet_period,
         )
-        tmp = []
-        for device in devices:
-            tmp.append(IpDiscovery(self, device))
-        return tmp
+        try:
+            async for device in devices:
+                yield IpDiscovery(self, device)
+        finally:
+            await devices.aclose()
 
     async def find_ip_by_device_id(self, device_id, max_seconds=10):
         if not IP_TRANSPORT_SUPPORTED:
             raise TransportNotSupportedError("IP")
+        device = self.browser and self.browser.get(device_id)
+        if device:
+            return IpDiscovery(self, device)
         device = await async_find_data_for_device_id(
             device_id=device_id,
             max_seconds=max_seconds,
@@ -123,25 +303,49 @@ class Controller:
         """
         raise TransportNotSupportedError("BLE")
 
-    async def shutdown(self) -> None:
+    async def shutdown(self, timeout: float = SHUTDOWN_TIMEOUT) -> None:
         """
         Shuts down the controller by closing all connections that might be held open by the pairings of the controller.
+
+        The pairings are closed at the same time. Any that haven't closed after
+        `timeout` seconds are abandoned.
         """
-        for p in self.pairings:
-            await self.pairings[p].close()
+        tasks = [
+            asyncio.ensure_future(pairing.close()) for pairing in self.pairings.loaded()
+        ]
+        if tasks:
+            _, pending = await asyncio.wait(tasks, timeout=timeout)
+            for task in pending:
+                task.cancel()
+            if pending:
+                self.logger.warning(
+                    "%d pairings did not close within %s seconds", len(pending), timeout
+                )
+
+        if self.browser:
+            await self.browser.async_stop()
+            self.browser = None
+
+        if self._owns_async_zeroconf_instance:
+            await self._async_zeroconf_instance.async_close()
+            self._async_zeroconf_instance = None
+            self._owns_async_zeroconf_instance = False
 
     def load_pairing(self, alias: str, pairing_data: Dict[str, str]) -> AbstractPairing:
         """
         Loads a pairing instance from a pairing data dict.
         """
+        pairing = self.pairings[alias] = self._create_pairing(pairing_data)
+        return pairing
+
+    def _create_pairing(self, pairing_data: Dict[str, str]) -> AbstractPairing:
         if "Connection" not in pairing_data:
             pairing_data["Connection"] = "IP"
 
         if pairing_data["Connection"] == "IP":
             if not IP_TRANSPORT_SUPPORTED:
                 raise TransportNotSupportedError("IP")
-            pairing = self.pairings[alias] = IpPairing(self, pairing_data)
-            return pairing
+            return IpPairing(self, pairing_data)
 
         if pairing_data["Connection"] == "BLE":
             if not BLE_TRANSPORT_SUPPORTED:
@@ -150,7 +354,7 @@ class Controller:
         connection_type = pairing_data["Connection"]
         raise NotImplementedError(f"{connection_type} support")
 
-    def get_pairings(self) -> Dict[str, IpPairing]:
+    def get_pairings(self) -> Pairings:
         """
         Returns a dict containing all pairings known to the controller.
 
@@ -158,18 +362,23 @@ class Controller:
         """
         return self.pairings
 
-    def load_data(self, filename: str) -> None:
+    def load_data(self, filename: str, lazy: bool = False) -> None:
         """
         Loads the pairing data of the controller from a file.
 
         :param filename: the file name of the pairing data
+        :param lazy: only build each pairing when it is first looked up in `pairings`.
+                     Errors building a pairing are then raised by that lookup.
         :raises ConfigLoadingError: if the config could not be loaded. The reason is given in the message.
         """
         try:
             with open(filename) as input_fp:
                 data = json.load(input_fp)
                 for pairing_id in data:
-                    self.load_pairing(pairing_id, data[pairing_id])
+                    if lazy:
+                        self.pairings.add_lazy(pairing_id, data[pairing_id])
+                    else:
+                        self.load_pairing(pairing_id, data[pairing_id])
         except PermissionError:
             raise ConfigLoadingError(
                 f'Could not open "{filename}" due to missing permissions'
@@ -189,7 +398,7 @@ class Controller:
         data = {}
         for pairing_id in self.pairings:
             # package visibility like in java would be nice here
-            data[pairing_id] = self.pairings[pairing_id].pairing_data
+            data[pairing_id] = self.pairings.get_pairing_data(pairing_id)
 
         path = pathlib.Path(filename)
 
@@ -245,4 +454,7 @@ class Controller:
 
         await pairing.close()
 
+        if self.accessories_cache and "AccessoryPairingID" in pairing.pairing_data:
+            self.accessories_cache.remove(pairing.pairing_data["AccessoryPairingID"])
+
         del self.pairings[alias]
@@ -15,13 +15,12 @@
 #
 
 import asyncio
+import collections
 import json
 import logging
+import struct
 
-from aiohomekit.crypto.chacha20poly1305 import (
-    chacha20_aead_decrypt,
-    chacha20_aead_encrypt,
-)
+from aiohomekit.crypto.chacha20poly1305 import ChaCha20Poly1305Context
 from aiohomekit.exceptions import (
     AccessoryDisconnectedError,
     AccessoryNotFoundError,
@@ -29,17 +28,24 @@ from aiohomekit.exceptions import (
     ConnectionError,
     HomeKitException,
     HttpErrorResponse,
+    PairResumeError,
     TimeoutError,
 )
 import aiohomekit.hkjson as hkjson
 from aiohomekit.http import HttpContentTypes
 from aiohomekit.http.response import HttpResponse
-from aiohomekit.protocol import get_session_keys
+from aiohomekit.protocol import derive_session_keys, pair_verify
 from aiohomekit.protocol.tlv import TLV
 from aiohomekit.zeroconf import async_find_device_ip_and_port
 
 logger = logging.getLogger(__name__)
 
+# Consumed bytes are only dropped from the front of the receive buffer once this many
+# have built up, rather than after every frame.
+COMPACT_THRESHOLD = 64 * 1024
+
+FRAME_LENGTH = struct.Struct("<H")
+
 
 def serialize_json(obj) -> bytes:
     """
@@ -52,6 +58,74 @@ def serialize_json(obj) -> bytes:
     return json.dumps(obj, separators=(",", ":")).encode("utf-8")
 
 
+def _advance_state_machine(state_machine, response):
+    """
+    Runs a state machine up to its next request.
+
+    StopIteration can't be raised through a Future, so this returns a (done, value)
+    tuple instead. value is the next (request, expected) pair, or the result once done.
+    """
+    try:
+        return False, state_machine.send(response)
+    except StopIteration as result:
+        return True, result.value
+
+
+class ConcurrencyLimit:
+    """
+    Limits how many requests are in flight at once.
+
+    This works like an asyncio.Semaphore, except the limit can be changed while requests
+    are in flight without losing track of the ones that already hold a slot.
+    """
+
+    def __init__(self, limit):
+        self._limit = limit
+        self._in_flight = 0
+        self._waiters = collections.deque()
+
+    @property
+    def limit(self):
+        return self._limit
+
+    @property
+    def in_flight(self):
+        return self._in_flight
+
+    def set_limit(self, limit):
+        self._limit = limit
+        self._wake_waiters()
+
+    def _wake_waiters(self):
+        available = self._limit - self._in_flight
+        for waiter in self._waiters:
+            if available <= 0:
+                break
+            if not waiter.done():
+                waiter.set_result(None)
+                available -= 1
+
+    async def __aenter__(self):
+        while self._in_flight >= self._limit:
+            waiter = asyncio.get_event_loop().create_future()
+            self._waiters.append(waiter)
+            try:
+                await waiter
+            except asyncio.CancelledError:
+                # Don't swallow a wakeup that was meant for this task
+                if waiter.done() and not waiter.cancelled():
+                    self._wake_waiters()
+                raise
+            finally:
+                self._waiters.remove(waiter)
+
+        self._in_flight += 1
+
+    async def __aexit__(self, exc_type, exc, tb):
+        self._in_flight -= 1
+        self._wake_waiters()
+
+
 class InsecureHomeKitProtocol(asyncio.Protocol):
     def __init__(self, connection):
         self.connection = connection
@@ -92,8 +166,11 @@ class InsecureHomeKitProtocol(asyncio.Protocol):
             raise AccessoryDisconnectedError("Timeout while waiting for response")
 
     def data_received(self, data):
-        while data:
-            data = self.current_response.parse(data)
+        pos = 0
+        end = len(data)
+
+        while pos < end:
+            pos = self.current_response.feed(data, pos)
 
             if self.current_response.is_read_completely():
                 http_name = self.current_response.get_http_name().lower()
@@ -125,35 +202,52 @@ class SecureHomeKitProtocol(InsecureHomeKitProtocol):
         super().__init__(connection)
 
         self._incoming_buffer = bytearray()
-
-        self.c2a_counter = 0
-        self.a2c_counter = 0
+        self._incoming_offset = 0
 
         self.a2c_key = a2c_key
         self.c2a_key = c2a_key
 
-    async def send_bytes(self, payload):
-        buffer = b""
-
-        while len(payload) > 0:
-            current = payload[:1024]
-            payload = payload[1024:]
-
-            len_bytes = len(current).to_bytes(2, byteorder="little")
-            cnt_bytes = self.c2a_counter.to_bytes(8, byteorder="little")
-            self.c2a_counter += 1
-
-            data = chacha20_aead_encrypt(
-                len_bytes,
-                self.c2a_key,
-                cnt_bytes,
-                bytes([0, 0, 0, 0]),
-                current,
-            )
+        self._a2c_cipher = ChaCha20Poly1305Context(a2c_key)
+        self._c2a_cipher = ChaCha20Poly1305Context(c2a_key)
+
+    @property
+    def a2c_counter(self):
+        return self._a2c_cipher.counter
+
+    @property
+    def c2a_counter(self):
+        return self._c2a_cipher.counter
+
+    def encode_frames(self, payload):
+        """
+        Split payload into 1024 byte blocks and encrypt them.
+
+        The output buffer is sized up front and every frame is encrypted straight into
+        it, so the whole request can be handed to the transport in a single write.
+        """
+        length = len(payload)
+        frame_count = -(-length // 1024)
+
+        buffer = bytearray(length + frame_count * 18)
+
+        with memoryview(payload) as source, memoryview(buffer) as output:
+            pos = 0
+            for start in range(0, length, 1024):
+                block = source[start : start + 1024]
+                block_length = len(block)
+                frame_end = pos + block_length + 18
+
+                FRAME_LENGTH.pack_into(buffer, pos, block_length)
+                self._c2a_cipher.encrypt_into(
+                    output[pos : pos + 2], block, output[pos + 2 : frame_end]
+                )
 
-            buffer += len_bytes + data
+                pos = frame_end
 
-        return await super().send_bytes(buffer)
+        return buffer
+
+    async def send_bytes(self, payload):
+        return await super().send_bytes(self.encode_frames(payload))
 
     def data_received(self, data):
         """
@@ -166,40 +260,59 @@ class SecureHomeKitProtocol(InsecureHomeKitProtocol):
         interleaving of HTTP messages.
         """
 
-        self._incoming_buffer += data
+        buffer = self._incoming_buffer
+        buffer += data
 
-        while len(self._incoming_buffer) >= 2:
-            block_length_bytes = self._incoming_buffer[:2]
-            block_length = int.from_bytes(block_length_bytes, "little")
-            exp_length = block_length + 18
+        offset = self._incoming_offset
+        available = len(buffer)
 
-            if len(self._incoming_buffer) < exp_length:
-                # Not enough data yet
-                return
+        # Every complete frame is decrypted straight out of the receive buffer in one
+        # batch. The buffer can't be resized while the memoryview is alive, so it is
+        # always released before we compact or return.
+        view = memoryview(buffer)
+        try:
+            frames = []
+            starts = []
 
-            # Drop the length from the top of the buffer as we have already parsed it
-            del self._incoming_buffer[:2]
+            while available - offset >= 2:
+                block_length = buffer[offset] | (buffer[offset + 1] << 8)
+                frame_end = offset + block_length + 18
 
-            block = self._incoming_buffer[:block_length]
-            del self._incoming_buffer[:block_length]
-            tag = self._incoming_buffer[:16]
-            del self._incoming_buffer[:16]
+                if available < frame_end:
+                    # Not enough data yet
+                    break
 
-            decrypted = chacha20_aead_decrypt(
-                block_length_bytes,
-                self.a2c_key,
-                self.a2c_counter.to_bytes(8, byteorder="little"),
-                bytes([0, 0, 0, 0]),
-                block + tag,
-            )
+                starts.append(offset)
+                frames.append((view[offset : offset + 2], view[offset + 2 : frame_end]))
+                offset = frame_end
+
+            decrypted = self._a2c_cipher.decrypt_frames(frames)
+            del frames
+
+        finally:
+            view.release()
 
-            if decrypted is False:
-                # FIXME: Does raising here drop the connection or do we call close on transport ourselves
-                raise RuntimeError("Could not decrypt block")
+        failed = len(decrypted) < len(starts)
+        if failed:
+            # Only consume the frames that could be decrypted
+            offset = starts[len(decrypted)]
 
-            self.a2c_counter += 1
+        if offset == available:
+            # Fast path - everything was consumed so no bytes have to move
+            buffer.clear()
+            offset = 0
+        elif offset >= COMPACT_THRESHOLD:
+            del buffer[:offset]
+            offset = 0
 
-            super().data_received(decrypted)
+        self._incoming_offset = offset
+
+        for block in decrypted:
+            super().data_received(block)
+
+        if failed:
+            # FIXME: Does raising here drop the connection or do we call close on transport ourselves
+            raise RuntimeError("Could not decrypt block")
 
 
 class HomeKitConnection:
@@ -219,13 +332,41 @@ class HomeKitConnection:
 
         self.is_secure = False
 
-        self._concurrency_limit = asyncio.Semaphore(concurrency_limit)
+        self._concurrency_limit = ConcurrencyLimit(concurrency_limit)
         self._reconnect_wait_task = None
 
+        # Set once the device has sent an event only commentjson could parse
+        self._lenient_json = False
+
     @property
     def is_connected(self):
         return self.transport and self.protocol and not self.closed
 
+    @property
+    def is_reconnecting(self):
+        """True while the reconnect loop is running for a dropped connection."""
+        return self._connector is not None and not self.is_connected
+
+    @property
+    def is_idle(self):
+        """True while connected, with no request in flight and no connect running."""
+        return (
+            self.is_connected
+            and self._connector is None
+            and not self._concurrency_limit.in_flight
+        )
+
+    def set_concurrency_limit(self, concurrency_limit):
+        """
+        Change how many requests may be in flight on this connection at once.
+
+        With a limit above 1 requests are pipelined - they are written without waiting
+        for the previous response, and responses are matched to requests in the order
+        they arrive. Requests that are already in flight still count against the new
+        limit, so lowering it holds back new requests until enough of them complete.
+        """
+        self._concurrency_limit.set_limit(concurrency_limit)
+
     def _start_connector(self):
         """
         Start a reconnect background task.
@@ -410,6 +551,34 @@ class HomeKitConnection:
         body = TLV.decode_bytes(response.body, expected=expected)
         return body
 
+    async def post_state_machine(self, target, state_machine, executor=None):
+        """
+        Runs a pairing state machine (like pair_verify) against `target` on the accessory.
+
+        The state machines do their crypto between requests. If an executor is given
+        those steps run in it, so that they don't hold up the event loop. The requests
+        themselves are always made from the event loop.
+
+        :param executor: a thread pool, process pools can't run generators
+        :return: the value returned by the state machine
+        """
+        loop = asyncio.get_event_loop()
+        response = None
+
+        while True:
+            if executor:
+                done, value = await loop.run_in_executor(
+                    executor, _advance_state_machine, state_machine, response
+                )
+            else:
+                done, value = _advance_state_machine(state_machine, response)
+
+            if done:
+                return value
+
+            request, expected = value
+            response = await self.post_tlv(target, body=request, expected=expected)
+
     async def request(self, method, target, headers=None, body=None):
         """
         Sends a HTTP request to the current transport and returns an awaitable
@@ -454,11 +623,19 @@ class HomeKitConnection:
         # https://github.com/jlusiardi/homekit_python/issues/12
         # https://github.com/jlusiardi/homekit_python/issues/16
 
-        async with self._concurrency_limit:
-            if not self.protocol:
-                raise AccessoryDisconnectedError("Tried to send while not connected")
-            logger.debug("%s: raw request: %r", self.host, request_bytes)
-            resp = await self.protocol.send_bytes(request_bytes)
+        try:
+            async with self._concurrency_limit:
+                if not self.protocol:
+                    raise AccessoryDisconnectedError(
+                        "Tried to send while not connected"
+                    )
+                logger.debug("%s: raw request: %r", self.host, request_bytes)
+                resp = await self.protocol.send_bytes(request_bytes)
+        finally:
+            # Only now the connection can count as idle again
+            manager = self._get_connection_manager()
+            if manager:
+                manager.touch(self)
 
         if resp.code >= 400 and resp.code <= 499:
             logger.debug(f"Got HTTP error {resp.code} for {method} against {target}")
@@ -486,13 +663,26 @@ class HomeKitConnection:
         self.transport = None
         self.is_secure = None
 
+    def close_idle(self):
+        """
+        Close the transport of an idle connection to free its socket.
+
+        Unlike close(), the connection is opened again when it is next used.
+        """
+        if self.transport:
+            self.transport.close()
+
     def _connection_lost(self, exception):
         """
         Called by a Protocol instance when eof_received happens.
         """
         logger.debug("Connection %r lost.", self)
 
-        if not self.closing:
+        manager = self._get_connection_manager()
+        if manager:
+            manager.release(self)
+
+        if not self.closing and (not manager or manager.should_reconnect(self)):
             self._start_connector()
 
         if self.closing:
@@ -504,6 +694,10 @@ class HomeKitConnection:
     async def _connect_once(self):
         loop = asyncio.get_event_loop()
 
+        manager = self._get_connection_manager()
+        if manager:
+            await manager.acquire(self, self.host)
+
         logger.debug("Attempting connection to %s:%s", self.host, self.port)
 
         try:
@@ -515,11 +709,20 @@ class HomeKitConnection:
             )
 
         except asyncio.TimeoutError:
+            if manager:
+                manager.release(self)
             raise TimeoutError("Timeout")
 
         except OSError as e:
+            if manager:
+                manager.release(self)
             raise ConnectionError(str(e))
 
+        except asyncio.CancelledError:
+            if manager:
+                manager.release(self)
+            raise
+
         if self.owner:
             await self.owner.connection_made(False)
 
@@ -533,11 +736,17 @@ class HomeKitConnection:
         # _connect_once without having to do I/O
         #
         interval = 0.5
+        attempt = 0
+        scheduler = self._get_reconnect_scheduler()
 
         logger.debug("Starting reconnect loop to %s:%s", self.host, self.port)
         while not self.closing:
             try:
-                return await self._connect_once()
+                if not scheduler:
+                    return await self._connect_once()
+
+                async with scheduler.attempt(self.host, key=self):
+                    return await self._connect_once()
 
             except AuthenticationError:
                 # Authentication errors should bubble up because auto-reconnect is unlikely to help
@@ -556,7 +765,12 @@ class HomeKitConnection:
                     "Unexpected error whilst trying to connect to accessory. Will retry."
                 )
 
-            interval = min(60, 1.5 * interval)
+            if scheduler:
+                interval = scheduler.get_delay(attempt)
+                attempt += 1
+            else:
+                interval = min(60, 1.5 * interval)
+
             self._reconnect_wait_task = asyncio.ensure_future(asyncio.sleep(interval))
 
             try:
@@ -566,21 +780,49 @@ class HomeKitConnection:
             finally:
                 self._reconnect_wait_task = None
 
+    def _get_reconnect_scheduler(self):
+        controller = getattr(self.owner, "controller", None)
+        return getattr(controller, "reconnect_scheduler", None)
+
+    def _get_connection_manager(self):
+        controller = getattr(self.owner, "controller", None)
+        return getattr(controller, "connection_manager", None)
+
+    def _get_crypto_executor(self):
+        controller = getattr(self.owner, "controller", None)
+        return getattr(controller, "crypto_executor", None)
+
     def event_received(self, event):
         if not self.owner:
             return
 
         # FIXME: Should drop the connection if can't parse the event?
 
-        decoded = event.body.decode("utf-8")
-        if not decoded:
+        body = event.body
+        if not body:
             return
 
+        if not self._lenient_json:
+            # The built-in decoder reads utf-8 bytes directly, no need to decode first
+            try:
+                parsed = json.loads(body)
+            except UnicodeDecodeError:
+                return
+            except json.JSONDecodeError:
+                pass
+            else:
+                self.owner.event_received(parsed)
+                return
+
         try:
-            parsed = hkjson.loads(decoded)
-        except json.JSONDecodeError:
+            parsed = hkjson.loads_lenient(body.decode("utf-8"))
+        except ValueError:
             return
 
+        if not self._lenient_json:
+            logger.debug("%r sends non-standard json, using commentjson for events", self)
+            self._lenient_json = True
+
         self.owner.event_received(parsed)
 
     def __repr__(self):
@@ -596,6 +838,12 @@ class SecureHomeKitConnection(HomeKitConnection):
         )
         self.pairing_data = pairing_data
 
+        # The (session_id, shared_secret) of the last secure session. Reconnects try to
+        # resume it, which is much cheaper for the accessory than a full pair verify.
+        # This is never persisted as anyone holding it can resume the session.
+        self._resume_session = None
+        self._resume_supported = True
+
     @property
     def is_connected(self):
         return super().is_connected and self.is_secure
@@ -603,31 +851,45 @@ class SecureHomeKitConnection(HomeKitConnection):
     async def _connect_once(self):
         self.is_secure = False
 
-        try:
-            self.host, self.port = await async_find_device_ip_and_port(
-                self.pairing_data["AccessoryPairingID"],
-                async_zeroconf_instance=self.owner.controller._async_zeroconf_instance,
-            )
-        except AccessoryNotFoundError:
-            pass
+        controller = self.owner.controller
+        browser = getattr(controller, "browser", None)
+        data = browser and browser.get(self.pairing_data["AccessoryPairingID"])
+
+        if data:
+            self.host, self.port = data["address"], data["port"]
+        else:
+            try:
+                self.host, self.port = await async_find_device_ip_and_port(
+                    self.pairing_data["AccessoryPairingID"],
+                    async_zeroconf_instance=controller._async_zeroconf_instance,
+                )
+            except AccessoryNotFoundError:
+                pass
 
         await super()._connect_once()
 
-        state_machine = get_session_keys(self.pairing_data)
+        resume_session = self._resume_session if self._resume_supported else None
 
-        request, expected = state_machine.send(None)
-        while True:
-            try:
-                response = await self.post_tlv(
-                    "/pair-verify",
-                    body=request,
-                    expected=expected,
+        # A session id can only be used once, whatever the outcome
+        self._resume_session = None
+
+        try:
+            session = await self._pair_verify(resume_session)
+        except PairResumeError:
+            # Accessories that can't resume a session are meant to carry on with a
+            # full pair verify. This one failed the request, so don't try again.
+            logger.debug("%r does not support pair resume", self)
+            self._resume_supported = False
+
+            if not self.transport or self.transport.is_closing():
+                raise AccessoryDisconnectedError(
+                    "Accessory closed the connection after a pair resume request"
                 )
-                request, expected = state_machine.send(response)
-            except StopIteration as result:
-                # If the state machine raises a StopIteration then we have session keys
-                c2a_key, a2c_key = result.value
-                break
+
+            session = await self._pair_verify()
+
+        self._resume_session = session
+        c2a_key, a2c_key = derive_session_keys(session[1])
 
         # Secure session has been negotiated - switch protocol so all future messages are encrypted
         self.protocol = SecureHomeKitProtocol(
@@ -644,3 +906,10 @@ class SecureHomeKitConnection(HomeKitConnection):
 
         if self.owner:
             await self.owner.connection_made(True)
+
+    async def _pair_verify(self, resume_session=None):
+        return await self.post_state_machine(
+            "/pair-verify",
+            pair_verify(self.pairing_data, resume_session),
+            executor=self._get_crypto_executor(),
+        )
@@ -66,41 +66,20 @@ class IpDiscovery:
         elif self.info["ff"] & FeatureFlags.SUPPORTS_SOFTWARE_AUTHENTICATION:
             with_auth = False
 
-        state_machine = perform_pair_setup_part1(with_auth)
-        request, expected = state_machine.send(None)
-        while True:
-            try:
-                response = await self.connection.post_tlv(
-                    "/pair-setup",
-                    body=request,
-                    expected=expected,
-                )
-                request, expected = state_machine.send(response)
-            except StopIteration as result:
-                # If the state machine raises a StopIteration then we have XXX
-                salt, pub_key = result.value
-                break
+        salt, pub_key = await self.connection.post_state_machine(
+            "/pair-setup",
+            perform_pair_setup_part1(with_auth),
+            executor=self.controller.crypto_executor,
+        )
 
         async def finish_pairing(pin):
             self.controller.check_pin_format(pin)
 
-            state_machine = perform_pair_setup_part2(
-                pin, str(uuid.uuid4()), salt, pub_key
+            pairing = await self.connection.post_state_machine(
+                "/pair-setup",
+                perform_pair_setup_part2(pin, str(uuid.uuid4()), salt, pub_key),
+                executor=self.controller.crypto_executor,
             )
-            request, expected = state_machine.send(None)
-
-            while True:
-                try:
-                    response = await self.connection.post_tlv(
-                        "/pair-setup",
-                        body=request,
-                        expected=expected,
-                    )
-                    request, expected = state_machine.send(response)
-                except StopIteration as result:
-                    # If the state machine raises a StopIteration then we have XXX
-                    pairing = result.value
-                    break
 
             pairing["AccessoryIP"] = self.host
             pairing["AccessoryPort"] = self.port
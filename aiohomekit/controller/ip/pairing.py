@@ -15,14 +15,14 @@
 #
 
 import asyncio
-from itertools import groupby
 import json
 import logging
-from operator import itemgetter
+from typing import Any, Dict, Optional, Set
 
 from aiohomekit.controller.pairing import AbstractPairing
 from aiohomekit.exceptions import (
     AccessoryDisconnectedError,
+    AccessoryNotFoundError,
     AuthenticationError,
     HttpErrorResponse,
     HttpException,
@@ -36,6 +36,10 @@ from aiohomekit.model.services import ServicesTypes
 from aiohomekit.protocol import error_handler
 from aiohomekit.protocol.statuscodes import to_status_code
 from aiohomekit.protocol.tlv import TLV
+from aiohomekit.zeroconf import (
+    async_find_data_for_device_id,
+    async_zeroconf_has_hap_service_browser,
+)
 
 from .connection import SecureHomeKitConnection
 
@@ -44,6 +48,32 @@ logger = logging.getLogger(__name__)
 
 EMPTY_EVENT = {}
 
+# How many requests to keep in flight at once for a device where pipelining is enabled
+DEFAULT_PIPELINE_DEPTH = 4
+
+# How long (in seconds) a get_characteristics batch waits for more callers to join before
+# its GET is sent. Even with no wait, callers that arrive while an earlier GET is still in
+# flight are merged into the next one.
+READ_COALESCE_WINDOW = 0
+
+# How long (in seconds) queued writes wait for more writes before being sent, when
+# write batching is enabled for a pairing.
+WRITE_COALESCE_WINDOW = 0.05
+
+# Ways of sending event subscriptions, see IpPairing.set_subscription_mode
+SUBSCRIBE_PER_AID = "per-aid"
+SUBSCRIBE_PIPELINED = "pipelined"
+SUBSCRIBE_SINGLE = "single"
+SUBSCRIPTION_MODES = (SUBSCRIBE_PER_AID, SUBSCRIBE_PIPELINED, SUBSCRIBE_SINGLE)
+
+# Models (as reported by the accessory information service) that are known to cope with
+# several HTTP requests being in flight on the same connection.
+PIPELINING_ALLOWED_MODELS: Set[str] = set()
+
+# Models that are known to drop or mismatch responses when requests are pipelined. This
+# takes precedence over PIPELINING_ALLOWED_MODELS.
+PIPELINING_DENIED_MODELS: Set[str] = set()
+
 
 def format_characteristic_list(data):
     tmp = {}
@@ -60,6 +90,36 @@ def format_characteristic_list(data):
     return tmp
 
 
+def get_accessories_model(accessories) -> Optional[str]:
+    """
+    Find the model of the primary accessory (aid 1) in a /accessories response.
+
+    :return: the value of the Model characteristic of the accessory information service, or
+             None if there isn't one
+    """
+    info_type = ServicesTypes.get_uuid(ServicesTypes.ACCESSORY_INFORMATION)
+    model_type = CharacteristicsTypes.get_uuid(CharacteristicsTypes.MODEL)
+
+    for accessory in accessories:
+        if accessory.get("aid") != 1:
+            continue
+        for service in accessory.get("services", []):
+            if service.get("type", "").upper() != info_type:
+                continue
+            for characteristic in service.get("characteristics", []):
+                if characteristic.get("type", "").upper() == model_type:
+                    return characteristic.get("value")
+
+    return None
+
+
+def _parse_config_num(data: Dict[str, Any]) -> Optional[int]:
+    try:
+        return int(data["c#"])
+    except (KeyError, ValueError):
+        return None
+
+
 class IpPairing(AbstractPairing):
     """
     This represents a paired HomeKit IP accessory.
@@ -77,9 +137,88 @@ class IpPairing(AbstractPairing):
         self.pairing_data = pairing_data
         self.connection = SecureHomeKitConnection(self, self.pairing_data)
         self.supports_subscribe = True
+        self.pipeline_depth = 1
+        self._event_keys = {}
+
+        # Concurrent get_characteristics calls with the same options share a GET
+        self.read_coalesce_window = READ_COALESCE_WINDOW
+        self._read_batches = {}
+        self._read_locks = {}
+
+        # When enabled, put_characteristics calls are queued and merged into one PUT,
+        # keeping only the last value written to each characteristic
+        self.write_batching = False
+        self.write_coalesce_window = WRITE_COALESCE_WINDOW
+        self._write_batch = None
+        self._write_lock = asyncio.Lock()
+
+        self._update_pipeline_depth()
+
+    def set_pipeline_depth(self, depth: Optional[int]) -> None:
+        """
+        Set how many requests can be in flight to this accessory at once.
+
+        A depth of 1 turns pipelining off. The setting is stored in the pairing data, so
+        it is kept when the controller saves and loads its pairings. Passing None forgets
+        it and goes back to checking the model against the allow and deny lists.
+        """
+        if depth is None:
+            self.pairing_data.pop("PipelineDepth", None)
+        else:
+            if depth < 1:
+                raise ValueError("Pipeline depth must be at least 1")
+            self.pairing_data["PipelineDepth"] = depth
+
+        self._update_pipeline_depth()
+
+    def _update_pipeline_depth(self) -> None:
+        depth = self.pairing_data.get("PipelineDepth")
+
+        if depth is None:
+            depth = 1
+            model = get_accessories_model(self.pairing_data.get("accessories", []))
+            if (
+                model in PIPELINING_ALLOWED_MODELS
+                and model not in PIPELINING_DENIED_MODELS
+            ):
+                depth = DEFAULT_PIPELINE_DEPTH
+
+        if depth == self.pipeline_depth:
+            return
+
+        logger.debug(
+            "Setting pipeline depth for %s to %d",
+            self.pairing_data.get("AccessoryPairingID"),
+            depth,
+        )
+        self.pipeline_depth = depth
+        self.connection.set_concurrency_limit(depth)
 
     def event_received(self, event):
-        self._callback_listeners(format_characteristic_list(event))
+        if self.change_listeners:
+            self._callback_change_listeners(self._get_change_set(event))
+
+        if self.listeners:
+            self._callback_listeners(format_characteristic_list(event))
+
+    def _get_change_set(self, event):
+        # (aid, iid) keys are interned so every change set for a characteristic shares
+        # the same tuple rather than allocating one per event
+        keys = self._event_keys
+
+        changes = []
+        for c in event["characteristics"]:
+            key = (c["aid"], c["iid"])
+            changes.append((keys.setdefault(key, key), c.get("value")))
+
+        return tuple(changes)
+
+    def _callback_change_listeners(self, changes):
+        for listener in self.change_listeners:
+            try:
+                listener(changes)
+            except Exception:
+                logger.exception("Unhandled error when processing event")
 
     def _callback_listeners(self, event):
         for listener in self.listeners:
@@ -118,13 +257,40 @@ class IpPairing(AbstractPairing):
         await self.connection.close()
         await asyncio.sleep(0)
 
-    async def list_accessories_and_characteristics(self):
+    async def list_accessories_and_characteristics(
+        self, config_num: Optional[int] = None
+    ):
         """
         This retrieves a current set of accessories and characteristics behind this pairing.
 
+        If the controller has an accessories cache with an entry for this pairing at the
+        accessory's current configuration number, that entry is returned and the
+        accessory isn't asked at all.
+
+        :param config_num: the c# currently advertised by the accessory. If not given it is
+                           looked up from an active zeroconf browser, if there is one.
         :return: the accessory data as described in the spec on page 73 and following
         :raises AccessoryNotFoundError: if the device can not be found via zeroconf
         """
+        cache = getattr(self.controller, "accessories_cache", None)
+        pairing_id = self.pairing_data.get("AccessoryPairingID")
+
+        if cache and pairing_id:
+            if config_num is None:
+                config_num = await self._async_get_config_num()
+
+            if config_num is not None:
+                accessories = cache.get(pairing_id, config_num)
+                if accessories is not None:
+                    logger.debug(
+                        "Using cached accessories for %s at c# %d",
+                        pairing_id,
+                        config_num,
+                    )
+                    self.pairing_data["accessories"] = accessories
+                    self._update_pipeline_depth()
+                    return accessories
+
         await self._ensure_connected()
 
         response = await self.connection.get_json("/accessories")
@@ -149,8 +315,43 @@ class IpPairing(AbstractPairing):
                         pass
 
         self.pairing_data["accessories"] = accessories
+        self._update_pipeline_depth()
+
+        if cache and pairing_id and config_num is not None:
+            cache.set(pairing_id, config_num, accessories)
+
         return accessories
 
+    async def _async_get_config_num(self) -> Optional[int]:
+        """
+        Returns the c# the accessory is advertising, if it is known without browsing.
+
+        Starting a browse just for this would take longer than fetching /accessories, so
+        this only looks at the records of an already running HAP browser.
+        """
+        browser = getattr(self.controller, "browser", None)
+        data = browser and browser.get(self.pairing_data["AccessoryPairingID"])
+        if data:
+            return _parse_config_num(data)
+
+        async_zeroconf_instance = getattr(
+            self.controller, "_async_zeroconf_instance", None
+        )
+        if not async_zeroconf_instance or not async_zeroconf_has_hap_service_browser(
+            async_zeroconf_instance
+        ):
+            return None
+
+        try:
+            data = await async_find_data_for_device_id(
+                self.pairing_data["AccessoryPairingID"],
+                async_zeroconf_instance=async_zeroconf_instance,
+            )
+        except AccessoryNotFoundError:
+            return None
+
+        return _parse_config_num(data)
+
     async def list_pairings(self):
         """
         This method returns all pairings of a HomeKit accessory. This always includes the local controller and can only
@@ -228,21 +429,71 @@ class IpPairing(AbstractPairing):
         if "accessories" not in self.pairing_data:
             await self.list_accessories_and_characteristics()
 
-        url = "/characteristics?id=" + ",".join(
-            str(x[0]) + "." + str(x[1]) for x in set(characteristics)
-        )
-        if include_meta:
-            url += "&meta=1"
-        if include_perms:
-            url += "&perms=1"
-        if include_type:
-            url += "&type=1"
-        if include_events:
-            url += "&ev=1"
+        key = (include_meta, include_perms, include_type, include_events)
+        characteristics = set(characteristics)
+
+        batch = self._read_batches.get(key)
+        if not batch:
+            batch = self._read_batches[key] = (
+                set(),
+                asyncio.get_event_loop().create_future(),
+            )
+            asyncio.ensure_future(self._read_batch(key, batch))
 
-        response = await self.connection.get_json(url)
+        pending, result = batch
+        pending.update(characteristics)
 
-        return format_characteristic_list(response)
+        response = await asyncio.shield(result)
+
+        return {
+            char: dict(response[char]) for char in characteristics if char in response
+        }
+
+    async def _read_batch(self, key, batch):
+        """
+        Send one GET for every characteristic queued against a batch.
+
+        The batch stays open to new callers for read_coalesce_window seconds, and for
+        as long as an earlier GET with the same options is still in flight.
+        """
+        pending, result = batch
+        include_meta, include_perms, include_type, include_events = key
+
+        # Make sure an exception is never left unretrieved if every caller was cancelled
+        result.add_done_callback(lambda fut: fut.cancelled() or fut.exception())
+
+        try:
+            await asyncio.sleep(self.read_coalesce_window)
+
+            async with self._read_locks.setdefault(key, asyncio.Lock()):
+                # Close the batch - anyone arriving from now on starts a new one
+                if self._read_batches.get(key) is batch:
+                    del self._read_batches[key]
+
+                url = "/characteristics?id=" + ",".join(
+                    f"{aid}.{iid}" for aid, iid in sorted(pending)
+                )
+                if include_meta:
+                    url += "&meta=1"
+                if include_perms:
+                    url += "&perms=1"
+                if include_type:
+                    url += "&type=1"
+                if include_events:
+                    url += "&ev=1"
+
+                response = await self.connection.get_json(url)
+
+        except BaseException as e:
+            if self._read_batches.get(key) is batch:
+                del self._read_batches[key]
+            if not result.done():
+                result.set_exception(e)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            return
+
+        result.set_result(format_characteristic_list(response))
 
     async def put_characteristics(self, characteristics):
         """
@@ -261,6 +512,62 @@ class IpPairing(AbstractPairing):
         if "accessories" not in self.pairing_data:
             await self.list_accessories_and_characteristics()
 
+        if not self.write_batching:
+            return await self._put_characteristics(characteristics)
+
+        batch = self._write_batch
+        if not batch:
+            batch = self._write_batch = ({}, asyncio.get_event_loop().create_future())
+            asyncio.ensure_future(self._write_batch_task(batch))
+
+        pending, result = batch
+
+        keys = set()
+        for aid, iid, value in characteristics:
+            # Last write wins - an earlier value still waiting to be sent is replaced
+            pending[(aid, iid)] = value
+            keys.add((aid, iid))
+
+        response = await asyncio.shield(result)
+
+        return {key: response[key] for key in keys if key in response}
+
+    async def _write_batch_task(self, batch):
+        """
+        Send every write queued against a batch as a single PUT.
+
+        The batch stays open to new writes for write_coalesce_window seconds, and for
+        as long as the previous batch's PUT is still in flight.
+        """
+        pending, result = batch
+
+        # Make sure an exception is never left unretrieved if every caller was cancelled
+        result.add_done_callback(lambda fut: fut.cancelled() or fut.exception())
+
+        try:
+            await asyncio.sleep(self.write_coalesce_window)
+
+            async with self._write_lock:
+                # Close the batch - writes from now on go into the next one
+                if self._write_batch is batch:
+                    self._write_batch = None
+
+                response = await self._put_characteristics(
+                    [(aid, iid, value) for (aid, iid), value in pending.items()]
+                )
+
+        except BaseException as e:
+            if self._write_batch is batch:
+                self._write_batch = None
+            if not result.done():
+                result.set_exception(e)
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            return
+
+        result.set_result(response)
+
+    async def _put_characteristics(self, characteristics):
         data = []
         characteristics_set = set()
         for characteristic in characteristics:
@@ -322,29 +629,90 @@ class IpPairing(AbstractPairing):
         await super().unsubscribe(char_set)
         return status
 
+    def set_subscription_mode(self, mode: str) -> None:
+        """
+        Set how event subscriptions are sent to this accessory.
+
+         * SUBSCRIBE_PER_AID: one PUT per accessory, one after another, like iOS does
+         * SUBSCRIBE_PIPELINED: one PUT per accessory, all in flight at once (needs a
+           pipeline depth above 1, otherwise they are sent one after another)
+         * SUBSCRIBE_SINGLE: one PUT for every accessory. If the accessory rejects it
+           the pairing falls back to SUBSCRIBE_PER_AID and remembers that.
+
+        The mode is stored in the pairing data so it is kept across restarts.
+        """
+        if mode not in SUBSCRIPTION_MODES:
+            raise ValueError(f"Unknown subscription mode: {mode}")
+        self.pairing_data["SubscriptionMode"] = mode
+
+    @property
+    def subscription_mode(self) -> str:
+        return self.pairing_data.get("SubscriptionMode", SUBSCRIBE_PER_AID)
+
     async def _update_subscriptions(self, characteristics, ev):
         """Subscribe or unsubscribe to characteristics."""
-        status = {}
+        # Sort and dedupe so each aid only gets one PUT, however the input was ordered
+        by_aid = {}
+        for aid, iid in sorted(set(characteristics)):
+            by_aid.setdefault(aid, []).append(iid)
+
+        mode = self.subscription_mode
+
+        if mode == SUBSCRIBE_SINGLE and by_aid:
+            try:
+                return await self._put_subscriptions(by_aid.items(), ev)
+            except HttpErrorResponse:
+                logger.debug(
+                    "%s rejected a multi-accessory subscription, falling back to one accessory at a time",
+                    self.pairing_data.get("AccessoryPairingID"),
+                )
+                self.set_subscription_mode(SUBSCRIBE_PER_AID)
+            except AccessoryDisconnectedError:
+                # Resubscribing happens again on reconnect, one aid at a time
+                logger.debug(
+                    "%s dropped the connection after a multi-accessory subscription, falling back to one accessory at a time",
+                    self.pairing_data.get("AccessoryPairingID"),
+                )
+                self.set_subscription_mode(SUBSCRIBE_PER_AID)
+                return {}
+
+        if mode == SUBSCRIBE_PIPELINED and self.pipeline_depth > 1:
+            results = await asyncio.gather(
+                *(self._put_subscriptions([item], ev) for item in by_aid.items())
+            )
+            status = {}
+            for result in results:
+                status.update(result)
+            return status
+
         # We do one aid at a time to match what iOS does
         # even though its inefficient
         # https://github.com/home-assistant/core/issues/37996
+        status = {}
+        for item in by_aid.items():
+            status.update(await self._put_subscriptions([item], ev))
+        return status
 
-        for _, aid_iids in groupby(characteristics, key=itemgetter(0)):
-            response = await self.connection.put_json(
-                "/characteristics",
-                {
-                    "characteristics": [
-                        {"aid": aid, "iid": iid, "ev": ev} for aid, iid in aid_iids
-                    ]
-                },
-            )
-            if response:
-                # An empty body is a success response
-                for row in response.get("characteristics", []):
-                    status[(row["aid"], row["iid"])] = {
-                        "status": row["status"],
-                        "description": to_status_code(row["status"]).description,
-                    }
+    async def _put_subscriptions(self, aid_iids, ev):
+        response = await self.connection.put_json(
+            "/characteristics",
+            {
+                "characteristics": [
+                    {"aid": aid, "iid": iid, "ev": ev}
+                    for aid, iids in aid_iids
+                    for iid in iids
+                ]
+            },
+        )
+
+        status = {}
+        if response:
+            # An empty body is a success response
+            for row in response.get("characteristics", []):
+                status[(row["aid"], row["iid"])] = {
+                    "status": row["status"],
+                    "description": to_status_code(row["status"]).description,
+                }
 
         return status
 
@@ -21,6 +21,7 @@ class AbstractPairing(abc.ABC):
     def __init__(self, controller):
         self.controller = controller
         self.listeners = set()
+        self.change_listeners = set()
         self.subscriptions = set()
 
     @abc.abstractmethod
@@ -149,3 +150,22 @@ class AbstractPairing(abc.ABC):
             self.listeners.discard(callback)
 
         return stop_listening
+
+    def dispatcher_connect_changes(self, callback):
+        """
+        Register a handler to be called with a compact change set when characteristics change.
+
+        The change set is a tuple of ((aid, iid), value) pairs, one for each characteristic in
+        the event. It is shared between every handler, so it is immutable. Registering only
+        this kind of handler lets the pairing skip building the per-event dicts that
+        dispatcher_connect handlers get.
+
+        This function returns immediately. It returns a callable you can use to cancel the subscription.
+        """
+
+        self.change_listeners.add(callback)
+
+        def stop_listening():
+            self.change_listeners.discard(callback)
+
+        return stop_listening
@@ -0,0 +1,171 @@
+#
+# Copyright 2019 aiohomekit team
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Skip polling accessories whose advertised state number hasn't changed."""
+
+import asyncio
+import logging
+import time
+from typing import Any, Callable, Dict, Iterable, Optional, Tuple
+
+from aiohomekit.exceptions import AccessoryDisconnectedError
+
+from .pairing import AbstractPairing
+
+logger = logging.getLogger(__name__)
+
+# Even when the state number says nothing changed, poll at least this often (in seconds)
+MAX_SKIP_INTERVAL = 300
+
+
+def _parse_number(value: Any) -> Optional[int]:
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class PollingPlanner:
+    """
+    Decides when a pairing needs to be polled, based on the s# and c# it advertises.
+
+    Feed it discovery data (the dicts built by parse_discovery_properties) whenever
+    zeroconf reports an update for the accessory. Then call async_poll instead of
+    get_characteristics on each polling round. A round is skipped when the accessory's
+    state number hasn't moved since the last successful poll. When it does move, the
+    polled characteristics are refreshed straight away and the results are passed to
+    `callback`.
+
+    The spec lets IP accessories advertise a fixed s# of 1, so the state number is
+    only trusted once it has been seen to change. Until then, and at least every
+    max_skip_interval seconds afterwards, every round polls as normal.
+
+    A change of c# means the accessory database changed. It forces the next poll and
+    calls `config_changed_callback`, so the caller can reload the accessories.
+    """
+
+    def __init__(
+        self,
+        pairing: AbstractPairing,
+        characteristics: Iterable[Tuple[int, int]] = (),
+        callback: Optional[Callable[[Dict[Tuple[int, int], Any]], None]] = None,
+        config_changed_callback: Optional[Callable[[int], None]] = None,
+        max_skip_interval: float = MAX_SKIP_INTERVAL,
+    ) -> None:
+        self.pairing = pairing
+        self.characteristics = set(characteristics)
+        self.callback = callback
+        self.config_changed_callback = config_changed_callback
+        self.max_skip_interval = max_skip_interval
+
+        self.state_num: Optional[int] = None
+        self.config_num: Optional[int] = None
+        self.trusted = False
+
+        self._polled_state_num: Optional[int] = None
+        self._last_poll: Optional[float] = None
+        self._refresh_task: Optional[asyncio.Future] = None
+
+    def set_characteristics(self, characteristics: Iterable[Tuple[int, int]]) -> None:
+        """Replace the set of (aid, iid) pairs that are polled."""
+        self.characteristics = set(characteristics)
+
+    def process_discovery(self, data: Dict[str, Any]) -> None:
+        """
+        Update the planner from the discovery data of a zeroconf announcement.
+
+        :param data: a dict with (at least) "s#" and optionally "c#", as returned by
+                     parse_discovery_properties
+        """
+        config_num = _parse_number(data.get("c#"))
+        if config_num is not None:
+            if self.config_num is not None and config_num != self.config_num:
+                logger.debug(
+                    "Config number changed from %d to %d", self.config_num, config_num
+                )
+                self._polled_state_num = None
+                if self.config_changed_callback:
+                    self.config_changed_callback(config_num)
+            self.config_num = config_num
+
+        state_num = _parse_number(data.get("s#"))
+        if state_num is None or state_num == self.state_num:
+            return
+
+        if self.state_num is not None:
+            self.trusted = True
+
+        self.state_num = state_num
+
+        if self.trusted and state_num != self._polled_state_num:
+            self._start_refresh()
+
+    def should_poll(self) -> bool:
+        """Returns True if the next polling round needs to talk to the accessory."""
+        if not self.trusted or self._last_poll is None:
+            return True
+
+        if self.state_num != self._polled_state_num:
+            return True
+
+        return time.monotonic() - self._last_poll >= self.max_skip_interval
+
+    async def async_poll(self, force: bool = False):
+        """
+        Run one polling round.
+
+        :param force: poll even if the state number says nothing changed
+        :return: the results of get_characteristics, or None if the round was skipped
+        """
+        if not self.characteristics:
+            return None
+
+        if not force and not self.should_poll():
+            return None
+
+        state_num = self.state_num
+        results = await self.pairing.get_characteristics(self.characteristics)
+
+        # Anything that changed while the request was in flight is picked up next time
+        self._polled_state_num = state_num
+        self._last_poll = time.monotonic()
+
+        return results
+
+    def _start_refresh(self) -> None:
+        if self._refresh_task and not self._refresh_task.done():
+            return
+        self._refresh_task = asyncio.ensure_future(self._async_refresh())
+
+    async def _async_refresh(self) -> None:
+        try:
+            results = await self.async_poll(force=True)
+        except AccessoryDisconnectedError:
+            logger.debug("Could not refresh after state number change")
+            return
+
+        if results and self.callback:
+            self.callback(results)
+
+    async def async_stop(self) -> None:
+        """Cancel any refresh that is in progress."""
+        if self._refresh_task and not self._refresh_task.done():
+            self._refresh_task.cancel()
+            try:
+                await self._refresh_task
+            except asyncio.CancelledError:
+                pass
+        self._refresh_task = None
@@ -0,0 +1,163 @@
+#
+# Copyright 2019 aiohomekit team
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#    http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+#
+
+"""Coordinate reconnect attempts across every pairing of a controller."""
+
+import asyncio
+from contextlib import asynccontextmanager
+import itertools
+import logging
+import random
+from typing import Any, Dict, Hashable, List, Optional
+
+logger = logging.getLogger(__name__)
+
+# How many connect attempts (including pair-verify) may run at once across all pairings
+MAX_CONCURRENT_CONNECTS = 8
+
+# How many connect attempts may run at once against a single IP address
+MAX_CONNECTS_PER_HOST = 1
+
+# Reconnect backoff, in seconds. Each failure multiplies the delay by BACKOFF_FACTOR.
+INITIAL_RECONNECT_DELAY = 0.5
+MAX_RECONNECT_DELAY = 60
+BACKOFF_FACTOR = 1.5
+
+
+class _Waiter:
+    __slots__ = ("host", "key", "seq", "future")
+
+    def __init__(self, host: str, key: Optional[Hashable], seq: int) -> None:
+        self.host = host
+        self.key = key
+        self.seq = seq
+        self.future = asyncio.get_event_loop().create_future()
+
+
+class ReconnectScheduler:
+    """
+    Decides when the pairings of a controller may try to reconnect.
+
+    Without coordination every connection retries on its own fixed schedule, so after a
+    network outage all of them reconnect (and run pair-verify) in lockstep. The
+    scheduler spreads them out in two ways:
+
+     * Retry delays are jittered, so connections that failed together drift apart.
+     * Attempts are capped globally and per IP address. Attempts over the cap wait in
+       line, and a device that zeroconf has just seen come back goes to the front.
+    """
+
+    def __init__(
+        self,
+        max_concurrent: int = MAX_CONCURRENT_CONNECTS,
+        max_per_host: int = MAX_CONNECTS_PER_HOST,
+        initial_delay: float = INITIAL_RECONNECT_DELAY,
+        max_delay: float = MAX_RECONNECT_DELAY,
+    ) -> None:
+        self.max_concurrent = max_concurrent
+        self.max_per_host = max_per_host
+        self.initial_delay = initial_delay
+        self.max_delay = max_delay
+
+        self._in_flight = 0
+        self._in_flight_by_host: Dict[str, int] = {}
+        self._waiters: List[_Waiter] = []
+        self._prioritised = set()
+        self._seq = itertools.count()
+
+    @property
+    def in_flight(self) -> int:
+        return self._in_flight
+
+    def get_delay(self, attempt: int) -> float:
+        """
+        Returns how long to wait before retry number `attempt` (counting from 0).
+
+        The delay grows exponentially up to max_delay, and a random value between half
+        and all of it is used.
+        """
+        delay = min(self.max_delay, self.initial_delay * BACKOFF_FACTOR ** attempt)
+        return random.uniform(delay / 2, delay)
+
+    def prioritise(self, key: Hashable) -> None:
+        """
+        Move the next attempt for `key` to the front of the line.
+
+        Call this when zeroconf sees a device (re)appear, as it is the most likely to
+        connect successfully.
+        """
+        self._prioritised.add(key)
+
+    def _get_priority(self, waiter: _Waiter):
+        return (0 if waiter.key in self._prioritised else 1, waiter.seq)
+
+    def _can_start(self, host: str) -> bool:
+        return (
+            self._in_flight < self.max_concurrent
+            and self._in_flight_by_host.get(host, 0) < self.max_per_host
+        )
+
+    def _start(self, host: str, key: Optional[Hashable]) -> None:
+        self._in_flight += 1
+        self._in_flight_by_host[host] = self._in_flight_by_host.get(host, 0) + 1
+        self._prioritised.discard(key)
+
+    def _release(self, host: str) -> None:
+        self._in_flight -= 1
+        self._in_flight_by_host[host] -= 1
+        if not self._in_flight_by_host[host]:
+            del self._in_flight_by_host[host]
+        self._wake_waiters()
+
+    def _wake_waiters(self) -> None:
+        self._waiters.sort(key=self._get_priority)
+        for waiter in list(self._waiters):
+            if self._in_flight >= self.max_concurrent:
+                break
+            if waiter.future.done() or not self._can_start(waiter.host):
+                continue
+            self._waiters.remove(waiter)
+            self._start(waiter.host, waiter.key)
+            waiter.future.set_result(None)
+
+    @asynccontextmanager
+    async def attempt(self, host: str, key: Optional[Hashable] = None) -> Any:
+        """
+        Wait for a free slot, then hold it for the duration of one connect attempt.
+
+        :param host: the IP address being connected to
+        :param key: identifies the connection, for prioritise()
+        """
+        if self._can_start(host) and not self._waiters:
+            self._start(host, key)
+        else:
+            waiter = _Waiter(host, key, next(self._seq))
+            self._waiters.append(waiter)
+            self._wake_waiters()
+            try:
+                await waiter.future
+            except asyncio.CancelledError:
+                if waiter in self._waiters:
+                    self._waiters.remove(waiter)
+                elif waiter.future.done() and not waiter.future.cancelled():
+                    # The slot was handed over just as we were cancelled
+                    self._release(host)
+                raise
+
+        try:
+            yield
+        finally:
+            self._release(host)
@@ -15,6 +15,7 @@
 #
 
 __all__ = [
+    "ChaCha20Poly1305Context",
     "chacha20_aead_decrypt",
     "chacha20_aead_encrypt",
     "hkdf_derive",
@@ -22,6 +23,10 @@ __all__ = [
     "SrpServer",
 ]
 
-from .chacha20poly1305 import chacha20_aead_decrypt, chacha20_aead_encrypt
+from .chacha20poly1305 import (
+    ChaCha20Poly1305Context,
+    chacha20_aead_decrypt,
+    chacha20_aead_encrypt,
+)
 from .hkdf import hkdf_derive
 from .srp import SrpClient, SrpServer
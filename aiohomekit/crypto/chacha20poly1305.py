@@ -18,12 +18,34 @@
 Implements the ChaCha20 stream cipher and the Poly1350 authenticator. More information can be found on
 https://tools.ietf.org/html/rfc7539. See HomeKit spec page 51.
 """
-from typing import Tuple, Union
+import struct
+from typing import Iterable, List, Tuple, Union
 
 from cryptography.exceptions import InvalidTag
 from cryptography.hazmat.primitives.ciphers.aead import ChaCha20Poly1305
 
 
+def _supports_buffers() -> bool:
+    """
+    Older releases of cryptography only accept bytes for the data and aad arguments,
+    newer ones take any contiguous buffer (memoryview, bytearray, ...).
+    """
+    try:
+        ChaCha20Poly1305(bytes(32)).encrypt(bytes(12), memoryview(b""), None)
+    except TypeError:
+        return False
+    return True
+
+
+SUPPORTS_BUFFERS = _supports_buffers()
+
+# Newer releases of cryptography can write the cipher text straight into a caller
+# provided buffer
+SUPPORTS_ENCRYPT_INTO = hasattr(ChaCha20Poly1305, "encrypt_into")
+
+_COUNTER = struct.Struct("<Q")
+
+
 def chacha20_aead_encrypt(
     aad: bytes, key: bytes, iv: bytes, constant: bytes, plaintext: bytes
 ) -> Tuple[bytearray, bytes]:
@@ -52,7 +74,11 @@ def chacha20_aead_encrypt(
 
 
 def chacha20_aead_decrypt(
-    aad: bytes, key: bytes, iv: bytes, constant: bytes, ciphertext: bytes
+    aad: Union[bytes, memoryview],
+    key: bytes,
+    iv: bytes,
+    constant: bytes,
+    ciphertext: Union[bytes, bytearray, memoryview],
 ) -> Union[bool, bytearray]:
     """
     The decrypt method for chacha20 aead as required by the Apple specification. The 96-bit nonce from RFC7539 is
@@ -62,21 +88,142 @@ def chacha20_aead_decrypt(
     :param key: 256-bit (32-byte) key of type bytes
     :param iv: the initialisation vector
     :param constant: constant
-    :param ciphertext: arbitrary length plaintext of type bytes or bytearray
+    :param ciphertext: arbitrary length ciphertext of type bytes, bytearray or memoryview
     :return: False if the tag could not be verified or the plaintext as bytes
     """
     assert type(ciphertext) in [
         bytes,
         bytearray,
+        memoryview,
     ], "ciphertext is no instance of bytes: %s" % str(type(ciphertext))
     assert type(key) is bytes, "key is no instance of bytes"
     assert len(key) == 32
 
     nonce = constant + iv
 
+    if not SUPPORTS_BUFFERS:
+        ciphertext = bytes(ciphertext)
+        aad = bytes(aad)
+
     chacha = ChaCha20Poly1305(key)
     try:
-        return bytearray(chacha.decrypt(nonce, bytes(ciphertext), bytes(aad)))
+        return bytearray(chacha.decrypt(nonce, ciphertext, aad))
     except InvalidTag:
         # This should raise rather than the callees having to test for False
         return False
+
+
+class ChaCha20Poly1305Context:
+    """
+    The cipher state for one direction of an encrypted HomeKit session.
+
+    The key is checked and the cipher is set up once, rather than for every frame. The
+    nonce is formed from a fixed 4 byte prefix and a 64-bit little endian counter which
+    is advanced after every frame that is successfully encrypted or decrypted.
+    """
+
+    def __init__(self, key: bytes, constant: bytes = bytes([0, 0, 0, 0])) -> None:
+        """
+        :param key: 256-bit (32-byte) key of type bytes
+        :param constant: the 4 byte nonce prefix
+        """
+        assert type(key) is bytes, "key is no instance of bytes"
+        assert len(key) == 32
+        assert len(constant) == 4
+
+        self.counter = 0
+        self._cipher = ChaCha20Poly1305(key)
+        self._constant = bytes(constant)
+
+    def _nonce(self, counter: int) -> bytes:
+        return self._constant + _COUNTER.pack(counter)
+
+    def encrypt(
+        self,
+        aad: Union[bytes, memoryview],
+        plaintext: Union[bytes, bytearray, memoryview],
+    ) -> bytes:
+        """
+        Encrypt a single frame with the next nonce.
+
+        :return: the cipher text followed by the 16 byte tag
+        """
+        if not SUPPORTS_BUFFERS:
+            plaintext = bytes(plaintext)
+            aad = bytes(aad)
+
+        result = self._cipher.encrypt(self._nonce(self.counter), plaintext, aad)
+        self.counter += 1
+        return result
+
+    def encrypt_into(
+        self,
+        aad: Union[bytes, memoryview],
+        plaintext: Union[bytes, bytearray, memoryview],
+        buf: Union[bytearray, memoryview],
+    ) -> None:
+        """
+        Encrypt a single frame with the next nonce, writing the cipher text and tag into
+        buf. buf must be exactly 16 bytes longer than plaintext.
+        """
+        if not SUPPORTS_ENCRYPT_INTO:
+            buf[:] = self.encrypt(aad, plaintext)
+            return
+
+        self._cipher.encrypt_into(self._nonce(self.counter), plaintext, aad, buf)
+        self.counter += 1
+
+    def decrypt(
+        self,
+        aad: Union[bytes, memoryview],
+        ciphertext: Union[bytes, bytearray, memoryview],
+    ) -> Union[bool, bytes]:
+        """
+        Decrypt a single frame with the next nonce.
+
+        :return: False if the tag could not be verified or the plaintext as bytes
+        """
+        if not SUPPORTS_BUFFERS:
+            ciphertext = bytes(ciphertext)
+            aad = bytes(aad)
+
+        try:
+            result = self._cipher.decrypt(self._nonce(self.counter), ciphertext, aad)
+        except InvalidTag:
+            return False
+
+        self.counter += 1
+        return result
+
+    def encrypt_frames(
+        self,
+        frames: Iterable[
+            Tuple[Union[bytes, memoryview], Union[bytes, bytearray, memoryview]]
+        ],
+    ) -> List[bytes]:
+        """
+        Encrypt a batch of (aad, plaintext) frames with consecutive nonces.
+        """
+        return [self.encrypt(aad, plaintext) for aad, plaintext in frames]
+
+    def decrypt_frames(
+        self,
+        frames: Iterable[
+            Tuple[Union[bytes, memoryview], Union[bytes, bytearray, memoryview]]
+        ],
+    ) -> List[bytes]:
+        """
+        Decrypt a batch of (aad, ciphertext) frames with consecutive nonces.
+
+        Decryption stops at the first frame whose tag can't be verified. The counter is
+        left pointing at that frame, so it only reflects the frames that were returned.
+
+        :return: the plaintexts of the frames before the first failure as a list of bytes
+        """
+        results = []
+        for aad, ciphertext in frames:
+            decrypted = self.decrypt(aad, ciphertext)
+            if decrypted is False:
+                break
+            results.append(decrypted)
+        return results
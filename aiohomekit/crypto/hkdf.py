@@ -14,6 +14,8 @@
 # limitations under the License.
 #
 
+from typing import Union
+
 from cryptography.hazmat.backends import default_backend
 from cryptography.hazmat.primitives import hashes
 from cryptography.hazmat.primitives.kdf.hkdf import HKDF
@@ -21,11 +23,14 @@ from cryptography.hazmat.primitives.kdf.hkdf import HKDF
 backend = default_backend()
 
 
-def hkdf_derive(input: bytes, salt: str, info: str) -> bytes:
+def hkdf_derive(input: bytes, salt: Union[str, bytes], info: str) -> bytes:
+    if isinstance(salt, str):
+        salt = salt.encode()
+
     hkdf = HKDF(
         algorithm=hashes.SHA512(),
         length=32,
-        salt=salt.encode(),
+        salt=salt,
         info=info.encode(),
         backend=backend,
     )
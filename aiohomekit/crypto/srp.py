@@ -19,18 +19,12 @@ Implements the Secure Remote Password (SRP) algorithm. More information can be f
 https://tools.ietf.org/html/rfc5054. See HomeKit spec page 36 for adjustments imposed by Apple.
 """
 import hashlib
-import math
 import os
-from typing import Union
+from typing import Optional, Union
 
-
-class Srp:
-    def __init__(self) -> None:
-        # generator as defined by 3072bit group of RFC 5054
-        self.g = int(b"5", 16)
-        # modulus as defined by 3072bit group of RFC 5054
-        self.n = int(
-            b"""\
+# modulus as defined by 3072bit group of RFC 5054
+N_3072 = int(
+    b"""\
 FFFFFFFFFFFFFFFFC90FDAA22168C234C4C6628B80DC1CD129024E08\
 8A67CC74020BBEA63B139B22514A08798E3404DDEF9519B3CD3A431B\
 302B0A6DF25F14374FE1356D6D51C245E485B576625E7EC6F44C42E9\
@@ -45,8 +39,43 @@ B3970F85A6E1E4C7ABF5AE8CDB0933D71E8C94E04A25619DCEE3D226\
 1AD2EE6BF12FFA06D98A0864D87602733EC86A64521F2B18177B200C\
 BBE117577A615D6C770988C0BAD946E208E24FA074E5AB3143DB5BFC\
 E0FD108E4B82D120A93AD2CAFFFFFFFFFFFFFFFF""",
-            16,
-        )
+    16,
+)
+
+# generator as defined by 3072bit group of RFC 5054
+G_3072 = 5
+
+
+def _to_bytes(num: int) -> bytes:
+    return num.to_bytes((num.bit_length() + 7) // 8, "big")
+
+
+_N_3072_BYTES = _to_bytes(N_3072)
+
+# k = H(N | PAD(g)) (see https://tools.ietf.org/html/rfc5054#section-2.5.3)
+K_3072 = int.from_bytes(
+    hashlib.sha512(
+        _N_3072_BYTES + G_3072.to_bytes(len(_N_3072_BYTES), "big")
+    ).digest(),
+    "big",
+)
+
+# H(N) xor H(g), the first input to the proof of both sides
+_HN_XOR_HG_3072 = bytes(
+    hn ^ hg
+    for hn, hg in zip(
+        hashlib.sha512(_N_3072_BYTES).digest(),
+        hashlib.sha512(_to_bytes(G_3072)).digest(),
+    )
+)
+
+
+class Srp:
+    def __init__(self) -> None:
+        # The group never changes, so everything derived from it is calculated once
+        # when the module is loaded.
+        self.g = G_3072
+        self.n = N_3072
         # HomeKit requires SHA-512 (See page 36)
         self.h = hashlib.sha512
         self.A = None
@@ -55,6 +84,27 @@ E0FD108E4B82D120A93AD2CAFFFFFFFFFFFFFFFF""",
         self.username = None
         self.password = None
 
+    @property
+    def A(self) -> Optional[int]:
+        return self._A
+
+    @A.setter
+    def A(self, A: Optional[int]) -> None:
+        # The encoding is hashed into u and the proofs, so keep it around
+        self._A = A
+        self._A_bytes = _to_bytes(A) if A is not None else None
+        self._session_key = None
+
+    @property
+    def B(self) -> Optional[int]:
+        return self._B
+
+    @B.setter
+    def B(self, B: Optional[int]) -> None:
+        self._B = B
+        self._B_bytes = _to_bytes(B) if B is not None else None
+        self._session_key = None
+
     @staticmethod
     def generate_private_key() -> int:
         """
@@ -65,14 +115,7 @@ E0FD108E4B82D120A93AD2CAFFFFFFFFFFFFFFFF""",
         return int.from_bytes(os.urandom(16), byteorder="big")
 
     def _calculate_k(self) -> int:
-        # calculate k (see https://tools.ietf.org/html/rfc5054#section-2.5.3)
-        hash_instance = self.h()
-        n = Srp.to_byte_array(self.n)
-        g = bytearray.fromhex(383 * "00" + "05")  # 383 * b'0' + '5'.encode()
-        hash_instance.update(n)
-        hash_instance.update(g)
-        k = int.from_bytes(hash_instance.digest(), "big")
-        return k
+        return K_3072
 
     def _calculate_u(self) -> int:
         if self.A is None:
@@ -80,22 +123,34 @@ E0FD108E4B82D120A93AD2CAFFFFFFFFFFFFFFFF""",
         if self.B is None:
             raise RuntimeError("Server's public key is missing")
         hash_instance = self.h()
-        A_b = Srp.to_byte_array(self.A)
-        B_b = Srp.to_byte_array(self.B)
-        hash_instance.update(A_b)
-        hash_instance.update(B_b)
+        hash_instance.update(self._A_bytes)
+        hash_instance.update(self._B_bytes)
         u = int.from_bytes(hash_instance.digest(), "big")
         return u
 
     def get_session_key(self) -> int:
-        hash_instance = self.h()
-        hash_instance.update(Srp.to_byte_array(self.get_shared_secret()))
-        hash_value = int.from_bytes(hash_instance.digest(), "big")
-        return hash_value
+        # Both proofs need the session key, and the shared secret behind it is the
+        # most expensive part of the exchange
+        if self._session_key is None:
+            hash_instance = self.h()
+            hash_instance.update(_to_bytes(self.get_shared_secret()))
+            self._session_key = int.from_bytes(hash_instance.digest(), "big")
+        return self._session_key
 
     @staticmethod
     def to_byte_array(num: int) -> bytearray:
-        return bytearray(num.to_bytes(int(math.ceil(num.bit_length() / 8)), "big"))
+        return bytearray(_to_bytes(num))
+
+    def _calculate_proof(self) -> int:
+        # M = H(H(N) xor H(g), H(I), s, A, B, K)
+        hash_instance = self.h()
+        hash_instance.update(_HN_XOR_HG_3072)
+        hash_instance.update(self.h(self.username.encode()).digest())
+        hash_instance.update(_to_bytes(self.salt))
+        hash_instance.update(self._A_bytes)
+        hash_instance.update(self._B_bytes)
+        hash_instance.update(_to_bytes(self.get_session_key()))
+        return int.from_bytes(hash_instance.digest(), "big")
 
     def _calculate_x(self) -> int:
         i = (self.username + ":" + self.password).encode()
@@ -104,7 +159,7 @@ E0FD108E4B82D120A93AD2CAFFFFFFFFFFFFFFFF""",
         hash_value = hash_instance.digest()
 
         hash_instance = self.h()
-        hash_instance.update(Srp.to_byte_array(self.salt))
+        hash_instance.update(_to_bytes(self.salt))
         hash_instance.update(hash_value)
 
         return int.from_bytes(hash_instance.digest(), "big")
@@ -132,9 +187,10 @@ class SrpClient(Srp):
             self.salt = int.from_bytes(salt, "big")
         else:
             self.salt = salt
+        self._session_key = None
 
     def get_public_key(self) -> int:
-        return pow(self.g, self.a, self.n)
+        return self.A
 
     def set_server_public_key(self, B: Union[int, bytearray]) -> None:
         if isinstance(B, bytearray):
@@ -157,31 +213,7 @@ class SrpClient(Srp):
         if self.B is None:
             raise RuntimeError("Server's public key is missing")
 
-        hash_instance = self.h()
-        hash_instance.update(Srp.to_byte_array(self.n))
-        hN = bytearray(hash_instance.digest())
-
-        hash_instance = self.h()
-        hash_instance.update(Srp.to_byte_array(self.g))
-        hg = bytearray(hash_instance.digest())
-
-        for index in range(0, len(hN)):
-            hN[index] ^= hg[index]
-
-        u = self.username.encode()
-        hash_instance = self.h()
-        hash_instance.update(u)
-        hu = hash_instance.digest()
-        K = Srp.to_byte_array(self.get_session_key())
-
-        hash_instance = self.h()
-        hash_instance.update(hN)
-        hash_instance.update(hu)
-        hash_instance.update(Srp.to_byte_array(self.salt))
-        hash_instance.update(Srp.to_byte_array(self.A))
-        hash_instance.update(Srp.to_byte_array(self.B))
-        hash_instance.update(K)
-        return int.from_bytes(hash_instance.digest(), "big")
+        return self._calculate_proof()
 
     def verify_servers_proof(self, M: Union[int, bytearray]) -> bool:
         if isinstance(M, bytearray):
@@ -189,9 +221,9 @@ class SrpClient(Srp):
         else:
             tmp = M
         hash_instance = self.h()
-        hash_instance.update(Srp.to_byte_array(self.A))
-        hash_instance.update(Srp.to_byte_array(self.get_proof()))
-        hash_instance.update(Srp.to_byte_array(self.get_session_key()))
+        hash_instance.update(self._A_bytes)
+        hash_instance.update(_to_bytes(self.get_proof()))
+        hash_instance.update(_to_bytes(self.get_session_key()))
         return tmp == int.from_bytes(hash_instance.digest(), "big")
 
 
@@ -229,8 +261,7 @@ class SrpServer(Srp):
         return self.salt
 
     def get_public_key(self) -> int:
-        k = self._calculate_k()
-        return (k * self.verifier + pow(self.g, self.b, self.n)) % self.n
+        return self.B
 
     def get_shared_secret(self) -> int:
         if self.A is None:
@@ -243,35 +274,11 @@ class SrpServer(Srp):
         if self.B is None:
             raise RuntimeError("Server's public key is missing")
 
-        hash_instance = self.h()
-        hash_instance.update(Srp.to_byte_array(self.n))
-        hN = bytearray(hash_instance.digest())
-
-        hash_instance = self.h()
-        hash_instance.update(Srp.to_byte_array(self.g))
-        hg = bytearray(hash_instance.digest())
-
-        for index in range(0, len(hN)):
-            hN[index] ^= hg[index]
-
-        u = self.username.encode()
-        hash_instance = self.h()
-        hash_instance.update(u)
-        hu = hash_instance.digest()
-        K = Srp.to_byte_array(self.get_session_key())
-
-        hash_instance = self.h()
-        hash_instance.update(hN)
-        hash_instance.update(hu)
-        hash_instance.update(Srp.to_byte_array(self.salt))
-        hash_instance.update(Srp.to_byte_array(self.A))
-        hash_instance.update(Srp.to_byte_array(self.B))
-        hash_instance.update(K)
-        return m == int.from_bytes(hash_instance.digest(), "big")
+        return m == self._calculate_proof()
 
     def get_proof(self, m: int) -> int:
         hash_instance = self.h()
-        hash_instance.update(Srp.to_byte_array(self.A))
-        hash_instance.update(Srp.to_byte_array(m))
-        hash_instance.update(Srp.to_byte_array(self.get_session_key()))
+        hash_instance.update(self._A_bytes)
+        hash_instance.update(_to_bytes(m))
+        hash_instance.update(_to_bytes(self.get_session_key()))
         return int.from_bytes(hash_instance.digest(), "big")
@@ -74,9 +74,13 @@ class BackoffError(ProtocolError):
     """
     Raised upon receipt of a back off error. It seems unclear when this is raised, must be related to
     kTLVType_RetryDelay which is defined on page 61 of the spec.
+
+    If the accessory sent a kTLVType_RetryDelay, the number of seconds to wait is in retry_delay.
     """
 
-    pass
+    def __init__(self, message, retry_delay=None):
+        super().__init__(message)
+        self.retry_delay = retry_delay
 
 
 class MaxPeersError(ProtocolError):
@@ -143,6 +147,14 @@ class InvalidAuthTagError(ProtocolError):
     pass
 
 
+class PairResumeError(ProtocolError):
+    """
+    Raised if an accessory fails a pair resume request instead of carrying on with a full pair verify.
+    """
+
+    pass
+
+
 class IncorrectPairingIdError(ProtocolError):
     """
     Raised in Pair Verify Step 3.5 (Page 49) if the accessory responds with an unexpected pairing id.
@@ -36,3 +36,13 @@ def loads(s):
         return json.loads(s)
     except json.JSONDecodeError:
         return commentjson.loads(s)
+
+
+def loads_lenient(s):
+    """Load json with commentjson only.
+
+    For devices that are already known to send json that
+    the built-in parser rejects, so they don't pay for a
+    failed strict decode every time.
+    """
+    return commentjson.loads(s)
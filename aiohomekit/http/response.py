@@ -15,7 +15,7 @@
 #
 
 import logging
-from typing import Union
+from typing import Optional, Tuple, Union
 
 from aiohomekit.exceptions import HttpException
 
@@ -23,15 +23,27 @@ logger = logging.getLogger(__name__)
 
 
 class HttpResponse:
+    """
+    An incremental HTTP/1.1 response parser.
+
+    Data is fed in as it arrives and each byte is only looked at once. Partial status,
+    header and chunk size lines are the only thing that is buffered between calls, body
+    data is copied straight from the input into `body`.
+    """
+
     STATE_PRE_STATUS = 0
     STATE_HEADERS = 1
     STATE_BODY = 2
     STATE_DONE = 3
+    STATE_CHUNK_SIZE = 4
+    STATE_CHUNK_DATA = 5
+    STATE_CHUNK_END = 6
+    STATE_TRAILERS = 7
 
     def __init__(self) -> None:
         self._state = HttpResponse.STATE_PRE_STATUS
-        self._raw_response = bytearray()
-        self._is_ready = False
+        self._line = bytearray()
+        self._remaining = 0
         self._is_chunked = False
         self._had_empty_chunk = False
         self._content_length = -1
@@ -41,80 +53,150 @@ class HttpResponse:
         self.headers = []
         self.body = bytearray()
 
-    def parse(self, part: Union[bytearray, bytes]) -> bytearray:
-        self._raw_response += part
-        pos = self._raw_response.find(b"\r\n")
-
-        while pos != -1 and self._state < HttpResponse.STATE_BODY:
-            line = self._raw_response[:pos]
-            self._raw_response = self._raw_response[pos + 2 :]
-            if self._state == HttpResponse.STATE_PRE_STATUS:
-                # parse status line
-                line = line.split(b" ", 2)
-                if len(line) != 3:
-                    raise HttpException("Malformed status line.")
-                self.version = line[0].decode()
-                self.code = int(line[1])
-                self.reason = line[2].decode()
-                self._state = HttpResponse.STATE_HEADERS
-
-            elif self._state == HttpResponse.STATE_HEADERS and line == b"":
-                # this is the empty line after the headers
-                self._state = HttpResponse.STATE_BODY
+    def parse(self, part: Union[bytearray, bytes]) -> Union[bytearray, bytes]:
+        """
+        Parse part of a response.
 
-            elif self._state == HttpResponse.STATE_HEADERS:
-                # parse a header line
-                line = line.split(b":", 1)
-                name = line[0].decode().strip().title()
-                value = line[1].decode().strip()
-                if name == "Transfer-Encoding":
-                    if value == "chunked":
-                        self._is_chunked = True
-                elif name == "Content-Length":
-                    self._content_length = int(value)
-                self.headers.append((name, value))
-            else:
-                raise HttpException("Unknown parser state")
-
-            pos = self._raw_response.find(b"\r\n")
-
-        if self._state == HttpResponse.STATE_BODY and self._is_chunked:
-            pos = self._raw_response.find(b"\r\n")
-            while pos > -1:
-                line = self._raw_response[:pos]
-                self._raw_response = self._raw_response[pos + 2 :]
-                length = int(line, 16)
-                if length + 2 > len(self._raw_response):
-                    self._raw_response = line + b"\r\n" + self._raw_response
-                    # the remaining bytes in raw response are not sufficient. bail out and wait for an other call.
-                    break
-
-                if length == 0:
-                    self._had_empty_chunk = True
-                    self._state = HttpResponse.STATE_DONE
-                    self._raw_response = self._raw_response[length + 2 :]
-                    break
-
-                line = self._raw_response[:length]
-                self.body += line
-                self._raw_response = self._raw_response[length + 2 :]
-
-                pos = self._raw_response.find(b"\r\n")
-
-        if self._state == HttpResponse.STATE_BODY and self._content_length > 0:
-            remaining = self._content_length - len(self.body)
-            self.body += self._raw_response[:remaining]
-            self._raw_response = self._raw_response[remaining:]
-
-        if self.is_read_completely():
+        :return: any bytes that were left over after the response was complete
+        """
+        return part[self.feed(part) :]
+
+    def feed(self, data: Union[bytearray, bytes], pos: int = 0) -> int:
+        """
+        Parse data[pos:] and return the offset of the first byte that wasn't consumed.
+
+        Everything is consumed unless the response is completed part way through data,
+        in which case the remaining bytes belong to the next response.
+        """
+        if not isinstance(data, (bytes, bytearray)):
+            data = bytes(data)
+
+        end = len(data)
+
+        with memoryview(data) as view:
+            while pos < end and self._state != HttpResponse.STATE_DONE:
+                state = self._state
+
+                if state in (HttpResponse.STATE_BODY, HttpResponse.STATE_CHUNK_DATA):
+                    taken = min(self._remaining, end - pos)
+                    self.body += view[pos : pos + taken]
+                    pos += taken
+                    self._remaining -= taken
+
+                    if self._remaining == 0:
+                        if state == HttpResponse.STATE_BODY:
+                            self._state = HttpResponse.STATE_DONE
+                        else:
+                            # Skip the \r\n after the chunk data
+                            self._remaining = 2
+                            self._state = HttpResponse.STATE_CHUNK_END
+
+                elif state == HttpResponse.STATE_CHUNK_END:
+                    skipped = min(self._remaining, end - pos)
+                    pos += skipped
+                    self._remaining -= skipped
+
+                    if self._remaining == 0:
+                        self._state = HttpResponse.STATE_CHUNK_SIZE
+
+                else:
+                    line, pos = self._read_line(data, pos, end)
+                    if line is None:
+                        break
+                    self._handle_line(line)
+
+        if self._state == HttpResponse.STATE_DONE and pos < end:
             # Whatever is left in the buffer is part of the next request
-            if len(self._raw_response) > 0:
-                logger.debug(
-                    "Bytes left in buffer after parsing packet: %r", self._raw_response
-                )
-            return self._raw_response
+            logger.debug("Bytes left in buffer after parsing packet: %r", data[pos:])
+
+        return pos
+
+    def _read_line(
+        self, data: Union[bytearray, bytes], pos: int, end: int
+    ) -> Tuple[Optional[bytes], int]:
+        """
+        Find the next \\r\\n terminated line, starting at data[pos].
 
-        return bytearray()
+        If there is no complete line yet the partial line is kept for the next call and
+        (None, end) is returned.
+        """
+        search = pos
+
+        while True:
+            newline = data.find(b"\n", search, end)
+
+            if newline == -1:
+                self._line += data[pos:end]
+                return None, end
+
+            if newline > pos:
+                has_cr = data[newline - 1] == 0x0D
+            else:
+                has_cr = self._line[-1:] == b"\r"
+
+            if has_cr:
+                break
+
+            search = newline + 1
+
+        if self._line:
+            line = bytes(self._line + data[pos:newline])
+            self._line.clear()
+        else:
+            line = bytes(data[pos:newline])
+
+        return line[:-1], newline + 1
+
+    def _handle_line(self, line: bytes) -> None:
+        state = self._state
+
+        if state == HttpResponse.STATE_PRE_STATUS:
+            # parse status line
+            line = line.split(b" ", 2)
+            if len(line) != 3:
+                raise HttpException("Malformed status line.")
+            self.version = line[0].decode()
+            self.code = int(line[1])
+            self.reason = line[2].decode()
+            self._state = HttpResponse.STATE_HEADERS
+
+        elif state == HttpResponse.STATE_HEADERS and line == b"":
+            # this is the empty line after the headers
+            if self._is_chunked:
+                self._state = HttpResponse.STATE_CHUNK_SIZE
+            elif self._content_length > 0:
+                self._remaining = self._content_length
+                self._state = HttpResponse.STATE_BODY
+            else:
+                self._state = HttpResponse.STATE_DONE
+
+        elif state == HttpResponse.STATE_HEADERS:
+            # parse a header line
+            line = line.split(b":", 1)
+            name = line[0].decode().strip().title()
+            value = line[1].decode().strip()
+            if name == "Transfer-Encoding":
+                if value == "chunked":
+                    self._is_chunked = True
+            elif name == "Content-Length":
+                self._content_length = int(value)
+            self.headers.append((name, value))
+
+        elif state == HttpResponse.STATE_CHUNK_SIZE:
+            length = int(line.split(b";", 1)[0], 16)
+            if length == 0:
+                self._had_empty_chunk = True
+                self._state = HttpResponse.STATE_TRAILERS
+            else:
+                self._remaining = length
+                self._state = HttpResponse.STATE_CHUNK_DATA
+
+        elif state == HttpResponse.STATE_TRAILERS:
+            if line == b"":
+                self._state = HttpResponse.STATE_DONE
+
+        else:
+            raise HttpException("Unknown parser state")
 
     def read(self):
         """
@@ -125,16 +207,7 @@ class HttpResponse:
         return self.body
 
     def is_read_completely(self) -> bool:
-        if self._is_chunked:
-            return self._had_empty_chunk
-
-        if self._state < HttpResponse.STATE_BODY:
-            return False
-
-        if self._content_length != -1:
-            return len(self.body) == self._content_length
-
-        return True
+        return self._state == HttpResponse.STATE_DONE
 
     def get_http_name(self) -> str:
         """
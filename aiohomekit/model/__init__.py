@@ -30,6 +30,18 @@ from .feature_flags import FeatureFlags
 from .mixin import get_id
 from .services import Service, ServicesTypes
 
+# Optional characteristic fields in an /accessories response and their kwargs
+CHARACTERISTIC_JSON_KEYS = (
+    ("format", "format"),
+    ("description", "description"),
+    ("minValue", "min_value"),
+    ("maxValue", "max_value"),
+    ("valid-values", "valid_values"),
+    ("unit", "unit"),
+    ("minStep", "min_step"),
+    ("maxLen", "max_len"),
+)
+
 __all__ = [
     "Categories",
     "CharacteristicPermissions",
@@ -42,12 +54,21 @@ __all__ = [
 class Services:
     def __init__(self):
         self._services: List[Service] = []
+        self._iid_index: Optional[Dict[int, Service]] = None
 
     def __iter__(self):
         return iter(self._services)
 
     def iid(self, iid: int) -> Service:
-        return next(filter(lambda service: service.iid == iid, self._services))
+        # The index is built lazily because iids are often assigned after append()
+        index = self._iid_index
+        if index is None or iid not in index or index[iid].iid != iid:
+            index = self._iid_index = {
+                service.iid: service for service in reversed(self._services)
+            }
+        if iid not in index:
+            raise StopIteration
+        return index[iid]
 
     def filter(
         self,
@@ -108,23 +129,43 @@ class Services:
 
     def append(self, service: Service):
         self._services.append(service)
+        self._iid_index = None
 
 
 class Characteristics:
     def __init__(self, services):
         self._services = services
+        self._iid_index: Optional[Dict[int, Characteristic]] = None
 
-    def iid(self, iid: int) -> Optional[Characteristic]:
+    def invalidate(self) -> None:
+        """Called when a service or characteristic is added to the accessory."""
+        self._iid_index = None
+
+    def _build_index(self) -> Dict[int, Characteristic]:
+        index = {}
         for service in self._services:
             for char in service.characteristics:
-                if char.iid == iid:
-                    return char
-        return None
+                # Like a linear scan, the first characteristic with an iid wins
+                index.setdefault(char.iid, char)
+        self._iid_index = index
+        return index
+
+    def iid(self, iid: int) -> Optional[Characteristic]:
+        index = self._iid_index
+        if index is None:
+            index = self._build_index()
+
+        char = index.get(iid)
+        if char is not None and char.iid == iid:
+            return char
+
+        # The iid may have been assigned or changed since the index was built
+        return self._build_index().get(iid)
 
 
 class Accessory:
-    def __init__(self):
-        self.aid = get_id()
+    def __init__(self, aid: Optional[int] = None):
+        self.aid = get_id() if aid is None else aid
         self._next_id = 0
         self.services = Services()
         self.characteristics = Characteristics(self.services)
@@ -183,44 +224,32 @@ class Accessory:
 
     @classmethod
     def create_from_dict(cls, data: Dict[str, Any]) -> "Accessory":
-        accessory = cls()
-        accessory.aid = data["aid"]
+        accessory = cls(aid=data["aid"])
+        services_by_iid = {}
 
         for service_data in data["services"]:
-            service = accessory.add_service(service_data["type"], add_required=False)
-            service.iid = service_data["iid"]
+            service = accessory.add_service(
+                service_data["type"], add_required=False, iid=service_data["iid"]
+            )
+            services_by_iid[service.iid] = service
 
             for char_data in service_data["characteristics"]:
-                kwargs = {
-                    "perms": char_data["perms"],
-                }
-                if "format" in char_data:
-                    kwargs["format"] = char_data["format"]
-                if "description" in char_data:
-                    kwargs["description"] = char_data["description"]
-                if "minValue" in char_data:
-                    kwargs["min_value"] = char_data["minValue"]
-                if "maxValue" in char_data:
-                    kwargs["max_value"] = char_data["maxValue"]
-                if "valid-values" in char_data:
-                    kwargs["valid_values"] = char_data["valid-values"]
-                if "unit" in char_data:
-                    kwargs["unit"] = char_data["unit"]
-                if "minStep" in char_data:
-                    kwargs["min_step"] = char_data["minStep"]
-                if "maxLen" in char_data:
-                    kwargs["max_len"] = char_data["maxLen"]
-
-                char = service.add_char(char_data["type"], **kwargs)
-                char.iid = char_data["iid"]
+                kwargs = {"perms": char_data["perms"]}
+                for json_key, key in CHARACTERISTIC_JSON_KEYS:
+                    if json_key in char_data:
+                        kwargs[key] = char_data[json_key]
+
+                char = service.add_char(
+                    char_data["type"], iid=char_data["iid"], **kwargs
+                )
 
                 if char_data.get("value") is not None:
                     char.set_value(char_data["value"])
 
         for service_data in data["services"]:
             for linked_service in service_data.get("linked", []):
-                accessory.services.iid(service_data["iid"]).add_linked_service(
-                    accessory.services.iid(linked_service)
+                services_by_iid[service_data["iid"]].add_linked_service(
+                    services_by_iid[linked_service]
                 )
 
         return accessory
@@ -229,11 +258,23 @@ class Accessory:
         self._next_id += 1
         return self._next_id
 
+    def reserve_id(self, iid: int) -> None:
+        """Make sure get_next_id never hands out an iid that is already in use."""
+        if iid > self._next_id:
+            self._next_id = iid
+
     def add_service(
-        self, service_type: str, name: Optional[str] = None, add_required: bool = False
+        self,
+        service_type: str,
+        name: Optional[str] = None,
+        add_required: bool = False,
+        iid: Optional[int] = None,
     ) -> Service:
-        service = Service(self, service_type, name=name, add_required=add_required)
+        service = Service(
+            self, service_type, name=name, add_required=add_required, iid=iid
+        )
         self.services.append(service)
+        self.characteristics.invalidate()
         return service
 
     def to_accessory_and_service_list(self):
@@ -247,6 +288,7 @@ class Accessory:
 class Accessories:
     def __init__(self) -> None:
         self.accessories = []
+        self._aid_index: Optional[Dict[int, Accessory]] = None
 
     def __iter__(self):
         return iter(self.accessories)
@@ -268,6 +310,7 @@ class Accessories:
 
     def add_accessory(self, accessory: Accessory) -> None:
         self.accessories.append(accessory)
+        self._aid_index = None
 
     def serialize(self):
         accessories_list = []
@@ -279,16 +322,30 @@ class Accessories:
         d = {"accessories": self.serialize()}
         return json.dumps(d)
 
+    def _get_accessory(self, aid) -> Optional[Accessory]:
+        index = self._aid_index
+        if index is None or aid not in index or index[aid].aid != aid:
+            # The aid may have been assigned or changed since the index was built
+            index = self._aid_index = {
+                accessory.aid: accessory for accessory in reversed(self.accessories)
+            }
+        return index.get(aid)
+
     def aid(self, aid) -> Accessory:
-        return next(filter(lambda accessory: accessory.aid == aid, self.accessories))
+        accessory = self._get_accessory(aid)
+        if accessory is None:
+            raise StopIteration
+        return accessory
+
+    def get_characteristic(self, aid: int, iid: int) -> Optional[Characteristic]:
+        accessory = self._get_accessory(aid)
+        if not accessory:
+            return None
+        return accessory.characteristics.iid(iid)
 
     def process_changes(self, changes):
         for ((aid, iid), value) in changes.items():
-            accessory = self.aid(aid)
-            if not accessory:
-                continue
-
-            char = accessory.characteristics.iid(iid)
+            char = self.get_characteristic(aid, iid)
             if not char:
                 continue
 
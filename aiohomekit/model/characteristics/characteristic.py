@@ -57,34 +57,74 @@ INTEGER_TYPES = [
 
 NUMBER_TYPES = INTEGER_TYPES + [CharacteristicFormats.float]
 
+NO_METADATA: Dict[str, Any] = {}
+
 
 class Characteristic:
-    def __init__(self, service: "Service", characteristic_type: str, **kwargs) -> None:
+
+    __slots__ = (
+        "service",
+        "iid",
+        "type",
+        "perms",
+        "format",
+        "ev",
+        "description",
+        "unit",
+        "minValue",
+        "maxValue",
+        "minStep",
+        "maxLen",
+        "maxDataLen",
+        "valid_values",
+        "valid_values_range",
+        "_value",
+        "_status",
+    )
+
+    def __init__(
+        self,
+        service: "Service",
+        characteristic_type: str,
+        iid: Optional[int] = None,
+        **kwargs,
+    ) -> None:
         self.service = service
-        self.iid = service.accessory.get_next_id()
+        if iid is None:
+            self.iid = service.accessory.get_next_id()
+        else:
+            self.iid = iid
+            service.accessory.reserve_id(iid)
         try:
             self.type = CharacteristicsTypes.get_uuid(characteristic_type)
         except KeyError:
             self.type = characteristic_type
 
-        self.perms = self._get_configuration(
-            kwargs, "perms", [CharacteristicPermissions.paired_read]
-        )
-        self.format = self._get_configuration(kwargs, "format", None)
+        # The metadata for a type is looked up once and shared by all its instances
+        metadata = characteristics.get(self.type, NO_METADATA)
+
+        if "perms" in kwargs:
+            self.perms = kwargs["perms"]
+        elif "perms" in metadata:
+            self.perms = metadata["perms"]
+        else:
+            self.perms = [CharacteristicPermissions.paired_read]
+
+        self.format = kwargs.get("format", metadata.get("format"))
 
         self.ev = None
-        self.description = self._get_configuration(kwargs, "description", None)
-        self.unit = self._get_configuration(kwargs, "unit", None)
-        self.minValue = self._get_configuration(kwargs, "min_value", None)
-        self.maxValue = self._get_configuration(kwargs, "max_value", None)
-        self.minStep = self._get_configuration(kwargs, "min_step", None)
+        self.description = kwargs.get("description", metadata.get("description"))
+        self.unit = kwargs.get("unit", metadata.get("unit"))
+        self.minValue = kwargs.get("min_value", metadata.get("min_value"))
+        self.maxValue = kwargs.get("max_value", metadata.get("max_value"))
+        self.minStep = kwargs.get("min_step", metadata.get("min_step"))
         self.maxLen = 64
         self.maxDataLen = 2097152
-        self.valid_values = self._get_configuration(kwargs, "valid_values", None)
+        self.valid_values = kwargs.get("valid_values", metadata.get("valid_values"))
         self.valid_values_range = None
 
         self._value = None
-        self._status = HapStatusCode(0)
+        self._status = HapStatusCode.SUCCESS
 
         if CharacteristicPermissions.paired_read not in self.perms:
             return
@@ -109,20 +149,6 @@ class Characteristic:
                 self._value = self.maxValue
             self._value = min(self._value, self.maxValue)
 
-    def _get_configuration(
-        self,
-        kwargs: Dict[str, Any],
-        key: str,
-        default: Optional[Any] = None,
-    ) -> Optional[Any]:
-        if key in kwargs:
-            return kwargs[key]
-        if self.type not in characteristics:
-            return default
-        if key not in characteristics[self.type]:
-            return default
-        return characteristics[self.type][key]
-
     @property
     def type_name(self):
         try:
@@ -154,7 +180,7 @@ class Characteristic:
     @property
     def value(self):
         if self.format == CharacteristicFormats.tlv8:
-            extra_data = characteristics.get(self.type, {})
+            extra_data = characteristics.get(self.type, NO_METADATA)
 
             new_val = base64.b64decode(self._value)
             struct = extra_data.get("struct")
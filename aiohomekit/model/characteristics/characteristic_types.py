@@ -14,9 +14,13 @@
 # limitations under the License.
 #
 
+from functools import lru_cache
 from typing import Union
 import uuid
 
+# Unknown (mostly vendor specific) UUIDs are normalised once and then cached
+UNKNOWN_UUID_CACHE_SIZE = 256
+
 
 class _CharacteristicsTypes:
     """
@@ -436,6 +440,40 @@ class _CharacteristicsTypes:
             self._characteristics[k]: k for k in self._characteristics.keys()
         }
 
+        self._get_short_cached = lru_cache(maxsize=UNKNOWN_UUID_CACHE_SIZE)(
+            self._get_short
+        )
+        self._get_short_uuid_cached = lru_cache(maxsize=UNKNOWN_UUID_CACHE_SIZE)(
+            self._get_short_uuid
+        )
+        self._get_uuid_cached = lru_cache(maxsize=UNKNOWN_UUID_CACHE_SIZE)(
+            self._get_uuid
+        )
+
+        # Every known short form, long form and name resolves with a single dict hit
+        self._short_table = {}
+        self._short_uuid_table = {}
+        self._uuid_table = {}
+        for short, name in self._characteristics.items():
+            self._precompute(short, self._get_uuid(short), name)
+
+        self._precompute(
+            *(value for attr, value in vars(self.Vendor).items() if attr[0] != "_")
+        )
+
+    def _precompute(self, *items: str) -> None:
+        tables = (
+            (self._short_table, self._get_short),
+            (self._short_uuid_table, self._get_short_uuid),
+            (self._uuid_table, self._get_uuid),
+        )
+        for item in items:
+            for table, func in tables:
+                try:
+                    table[item] = func(item)
+                except KeyError:
+                    pass
+
     def __getitem__(self, item: Union[str, int]) -> str:
         if item in self._characteristics:
             return self._characteristics[item]
@@ -456,6 +494,12 @@ class _CharacteristicsTypes:
         :param uuid: the UUID in long form or the shortened version as defined in chapter 5.6.1 page 72.
         :return: the textual representation
         """
+        result = self._short_table.get(uuid)
+        if result is None:
+            result = self._get_short_cached(uuid)
+        return result
+
+    def _get_short(self, uuid: str) -> str:
         orig_item = uuid
         uuid = uuid.upper()
         if uuid.endswith(self.baseUUID):
@@ -478,6 +522,12 @@ class _CharacteristicsTypes:
         :return: the short UUID (e.g. "6D" instead of "0000006D-0000-1000-8000-0026BB765291")
         :raises KeyError: if the input is neither a UUID nor a type name. Specific error is given in the message.
         """
+        result = self._short_uuid_table.get(item_name)
+        if result is None:
+            result = self._get_short_uuid_cached(item_name)
+        return result
+
+    def _get_short_uuid(self, item_name: str) -> str:
         orig_item = item_name
         if item_name.upper().endswith(self.baseUUID):
             item_name = item_name.upper()
@@ -511,6 +561,12 @@ class _CharacteristicsTypes:
         :return: the full UUID (e.g. "0000006D-0000-1000-8000-0026BB765291")
         :raises KeyError: if the input is neither a short UUID nor a type name. Specific error is given in the message.
         """
+        result = self._uuid_table.get(item_name)
+        if result is None:
+            result = self._get_uuid_cached(item_name)
+        return result
+
+    def _get_uuid(self, item_name: str) -> str:
         orig_item = item_name
         # if we get a full length uuid with the proper base and a known short one, this should also work.
         if item_name.upper().endswith(self.baseUUID):
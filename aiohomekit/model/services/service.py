@@ -28,6 +28,9 @@ if TYPE_CHECKING:
 
 
 class Characteristics:
+
+    __slots__ = ("_characteristics",)
+
     def __init__(self):
         self._characteristics = []
 
@@ -51,12 +54,23 @@ class Characteristics:
 
 
 class Service:
+
+    __slots__ = (
+        "type",
+        "accessory",
+        "iid",
+        "characteristics",
+        "characteristics_by_type",
+        "linked",
+    )
+
     def __init__(
         self,
         accessory: "Accessory",
         service_type: str,
         name: Optional[str] = None,
         add_required: bool = False,
+        iid: Optional[int] = None,
     ):
         try:
             self.type = ServicesTypes.get_uuid(service_type)
@@ -64,7 +78,11 @@ class Service:
             self.type = service_type
 
         self.accessory = accessory
-        self.iid = accessory.get_next_id()
+        if iid is None:
+            self.iid = accessory.get_next_id()
+        else:
+            self.iid = iid
+            accessory.reserve_id(iid)
         self.characteristics = Characteristics()
         self.characteristics_by_type = {}
         self.linked = []
@@ -121,6 +139,11 @@ class Service:
         char = Characteristic(self, char_type, **kwargs)
         self.characteristics.append(char)
         self.characteristics_by_type[char.type] = char
+
+        characteristics = getattr(self.accessory, "characteristics", None)
+        if characteristics is not None:
+            characteristics.invalidate()
+
         return char
 
     def add_linked_service(self, service: "Service"):
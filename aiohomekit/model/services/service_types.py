@@ -14,6 +14,11 @@
 # limitations under the License.
 #
 
+from functools import lru_cache
+
+# Unknown (mostly vendor specific) UUIDs are normalised once and then cached
+UNKNOWN_UUID_CACHE_SIZE = 256
+
 
 class _ServicesTypes:
     """
@@ -119,6 +124,36 @@ class _ServicesTypes:
 
         self._services_rev = {self._services[k]: k for k in self._services.keys()}
 
+        self._get_short_cached = lru_cache(maxsize=UNKNOWN_UUID_CACHE_SIZE)(
+            self._get_short
+        )
+        self._get_short_uuid_cached = lru_cache(maxsize=UNKNOWN_UUID_CACHE_SIZE)(
+            self._get_short_uuid
+        )
+        self._get_uuid_cached = lru_cache(maxsize=UNKNOWN_UUID_CACHE_SIZE)(
+            self._get_uuid
+        )
+
+        # Every known short form, long form and name resolves with a single dict hit
+        self._short_table = {}
+        self._short_uuid_table = {}
+        self._uuid_table = {}
+        for short, name in self._services.items():
+            self._precompute(short, self._get_uuid(short), name)
+
+    def _precompute(self, *items: str) -> None:
+        tables = (
+            (self._short_table, self._get_short),
+            (self._short_uuid_table, self._get_short_uuid),
+            (self._uuid_table, self._get_uuid),
+        )
+        for item in items:
+            for table, func in tables:
+                try:
+                    table[item] = func(item)
+                except KeyError:
+                    pass
+
     def __getitem__(self, item: str) -> str:
         if item in self._services:
             return self._services[item]
@@ -137,6 +172,12 @@ class _ServicesTypes:
         :param item: the items full UUID
         :return: the last segment of the service name or a hint that it is unknown
         """
+        result = self._short_table.get(item)
+        if result is None:
+            result = self._get_short_cached(item)
+        return result
+
+    def _get_short(self, item: str) -> str:
         orig_item = item
         item = item.upper()
         if item.endswith(self.baseUUID):
@@ -158,6 +199,12 @@ class _ServicesTypes:
         :return: the full UUID (e.g. "0000006D-0000-1000-8000-0026BB765291")
         :raises KeyError: if the input is neither a short UUID nor a type name. Specific error is given in the message.
         """
+        result = self._uuid_table.get(item_name)
+        if result is None:
+            result = self._get_uuid_cached(item_name)
+        return result
+
+    def _get_uuid(self, item_name: str) -> str:
         orig_item = item_name
         # if we get a full length uuid with the proper base and a known short one, this should also work.
         if item_name.upper().endswith(self.baseUUID):
@@ -187,6 +234,12 @@ class _ServicesTypes:
         :return: the short UUID (e.g. "6D" instead of "0000006D-0000-1000-8000-0026BB765291")
         :raises KeyError: if the input is neither a UUID nor a type name. Specific error is given in the message.
         """
+        result = self._short_uuid_table.get(item_name)
+        if result is None:
+            result = self._get_short_uuid_cached(item_name)
+        return result
+
+    def _get_short_uuid(self, item_name: str) -> str:
         uuid = self.get_uuid(item_name)
         if uuid.upper().endswith(self.baseUUID):
             uuid = uuid.upper()
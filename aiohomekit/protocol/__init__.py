@@ -16,7 +16,7 @@
 
 from binascii import hexlify
 import logging
-from typing import Any, Dict, Generator, List, Tuple, Union
+from typing import Any, Dict, Generator, List, Optional, Tuple, Union
 
 from cryptography import exceptions as cryptography_exceptions
 from cryptography.hazmat.primitives import serialization
@@ -39,19 +39,24 @@ from aiohomekit.exceptions import (
     InvalidSignatureError,
     MaxPeersError,
     MaxTriesError,
+    PairResumeError,
     UnavailableError,
 )
 from aiohomekit.protocol.tlv import TLV
 
 logger = logging.getLogger(__name__)
 
+# Resumable sessions are identified by an 8 byte id
+RESUME_SESSION_ID_LENGTH = 8
 
-def error_handler(error: bytearray, stage: str):
+
+def error_handler(error: bytearray, stage: str, retry_delay: Optional[int] = None):
     """
     Transform the various error messages defined in table 4-5 page 60 into exceptions
 
     :param error: the kind of error
     :param stage: the stage it appeared in
+    :param retry_delay: the kTLVType_RetryDelay sent with a back off error, in seconds
     :return: None
     """
     if error == TLV.kTLVError_Unavailable:
@@ -59,7 +64,7 @@ def error_handler(error: bytearray, stage: str):
     elif error == TLV.kTLVError_Authentication:
         raise AuthenticationError(stage)
     elif error == TLV.kTLVError_Backoff:
-        raise BackoffError(stage)
+        raise BackoffError(stage, retry_delay)
     elif error == TLV.kTLVError_MaxPeers:
         raise MaxPeersError(stage)
     elif error == TLV.kTLVError_MaxTries:
@@ -83,7 +88,13 @@ def handle_state_step(tlv_dict, expected_state):
         raise InvalidError(f"Exepected state {expected_state} but got {actual_state}")
 
     if TLV.kTLVType_Error in tlv_dict:
-        error_handler(tlv_dict[TLV.kTLVType_Error], f"step {expected_state}")
+        retry_delay = tlv_dict.get(TLV.kTLVType_RetryDelay)
+        if retry_delay is not None:
+            retry_delay = int.from_bytes(retry_delay, "little")
+
+        error_handler(
+            tlv_dict[TLV.kTLVType_Error], f"step {expected_state}", retry_delay
+        )
 
 
 def perform_pair_setup_part1(
@@ -98,6 +109,7 @@ def perform_pair_setup_part1(
     :raises UnavailableError: if the device is already paired
     :raises MaxTriesError: if the device received more than 100 unsuccessful pairing attempts
     :raises BusyError: if a parallel pairing is ongoing
+    :raises BackoffError: if the device wants pairing attempts to back off for a while
     :raises AuthenticationError: if the verification of the device's SRP proof fails
     :raises MaxPeersError: if the device cannot accept an additional pairing
     :raises IllegalData: if the verification of the accessory's data fails
@@ -117,6 +129,7 @@ def perform_pair_setup_part1(
         TLV.kTLVType_Error,
         TLV.kTLVType_PublicKey,
         TLV.kTLVType_Salt,
+        TLV.kTLVType_RetryDelay,
     ]
     response_tlv = yield (request_tlv, step2_expectations)
 
@@ -349,8 +362,37 @@ def perform_pair_setup_part2(
     }
 
 
-def get_session_keys(
-    pairing_data: Dict[str, Union[str, int, List[Any]]]
+def derive_session_keys(shared_secret: bytes) -> Tuple[bytes, bytes]:
+    """
+    Derive the keys of a secure session from the shared secret of a pair verify.
+
+    :return: tuple of the session keys (controller_to_accessory_key and accessory_to_controller_key)
+    """
+    controller_to_accessory_key = hkdf_derive(
+        shared_secret, "Control-Salt", "Control-Write-Encryption-Key"
+    )
+
+    accessory_to_controller_key = hkdf_derive(
+        shared_secret, "Control-Salt", "Control-Read-Encryption-Key"
+    )
+
+    return controller_to_accessory_key, accessory_to_controller_key
+
+
+def derive_resume_session_id(shared_secret: bytes) -> bytes:
+    """
+    Derive the id under which a session agreed by a full pair verify can be resumed.
+    """
+    return hkdf_derive(
+        shared_secret,
+        "Pair-Verify-ResumeSessionID-Salt",
+        "Pair-Verify-ResumeSessionID-Info",
+    )[:RESUME_SESSION_ID_LENGTH]
+
+
+def pair_verify(
+    pairing_data: Dict[str, Union[str, int, List[Any]]],
+    resume_session: Optional[Tuple[bytes, bytes]] = None,
 ) -> Generator[
     Union[
         Tuple[List[Union[Tuple[int, bytearray], Tuple[int, bytes]]], List[int]],
@@ -361,12 +403,21 @@ def get_session_keys(
 ]:
     """
     HomeKit Controller state machine to perform a pair verify operation as described in chapter 4.8 page 47 ff.
+
+    If resume_session is given the accessory is first asked to resume that session
+    (Method=Resume with the session id), which saves it the ed25519 signing and
+    verification. An accessory that no longer knows the session answers with a normal
+    M2 and the full pair verify continues with the same ephemeral key.
+
     :param pairing_data: the paring data as returned by perform_pair_setup
-    :return: tuple of the session keys (controller_to_accessory_key and  accessory_to_controller_key)
+    :param resume_session: the (session_id, shared_secret) of an earlier pair_verify
+    :return: tuple of the session id and shared secret of the new session, pass them to
+             derive_session_keys and to the next pair_verify
     :raises InvalidAuthTagError: if the auth tag could not be verified,
     :raises IncorrectPairingIdError: if the accessory's LTPK could not be found
     :raises InvalidSignatureError: if the accessory's signature could not be verified
     :raises AuthenticationError: if the secured session could not be established
+    :raises PairResumeError: if the accessory failed the resume request
     """
 
     #
@@ -384,20 +435,68 @@ def get_session_keys(
         TLV.kTLVType_PublicKey,
         TLV.kTLVType_EncryptedData,
     ]
+
+    if resume_session:
+        session_id, resume_secret = resume_session
+
+        request_key = hkdf_derive(
+            resume_secret, ios_key_pub + session_id, "Pair-Resume-Request-Info"
+        )
+        auth_tag = chacha20_aead_encrypt(
+            bytes(), request_key, b"PR-Msg01", bytes([0, 0, 0, 0]), bytes()
+        )
+
+        request_tlv = [
+            (TLV.kTLVType_State, TLV.M1),
+            (TLV.kTLVType_Method, bytes([TLV.kTLVMethod_Resume])),
+            (TLV.kTLVType_PublicKey, ios_key_pub),
+            (TLV.kTLVType_SessionID, session_id),
+            (TLV.kTLVType_EncryptedData, auth_tag),
+        ]
+        step2_expectations += [TLV.kTLVType_SessionID, TLV.kTLVType_Error]
+
     response_tlv = yield (request_tlv, step2_expectations)
 
     #
     # Step #3 ios --> accessory (send SRP verify request)  (page 49)
     #
     response_tlv = dict(response_tlv)
-    handle_state_step(response_tlv, TLV.M2)
 
-    if TLV.kTLVType_PublicKey not in response_tlv:
-        raise InvalidError("M2: Missing public key")
+    if resume_session and TLV.kTLVType_Error in response_tlv:
+        raise PairResumeError("step 2")
+
+    handle_state_step(response_tlv, TLV.M2)
 
     if TLV.kTLVType_EncryptedData not in response_tlv:
         raise InvalidError("M2: Missing encrypted data")
 
+    if resume_session and TLV.kTLVType_PublicKey not in response_tlv:
+        # The accessory accepted the resume request
+        if TLV.kTLVType_SessionID not in response_tlv:
+            raise PairResumeError("M2: Missing session id")
+
+        new_session_id = bytes(response_tlv[TLV.kTLVType_SessionID])
+        salt = ios_key_pub + new_session_id
+
+        response_key = hkdf_derive(resume_secret, salt, "Pair-Resume-Response-Info")
+        decrypted = chacha20_aead_decrypt(
+            bytes(),
+            response_key,
+            b"PR-Msg02",
+            bytes([0, 0, 0, 0]),
+            response_tlv[TLV.kTLVType_EncryptedData],
+        )
+        if type(decrypted) == bool and not decrypted:
+            raise PairResumeError("M2: Invalid auth tag")
+
+        shared_secret = hkdf_derive(
+            resume_secret, salt, "Pair-Resume-Shared-Secret-Info"
+        )
+        return new_session_id, shared_secret
+
+    if TLV.kTLVType_PublicKey not in response_tlv:
+        raise InvalidError("M2: Missing public key")
+
     # 1) generate shared secret
     accessorys_session_pub_key_bytes = bytes(response_tlv[TLV.kTLVType_PublicKey])
     accessorys_session_pub_key = x25519.X25519PublicKey.from_public_bytes(
@@ -493,14 +592,24 @@ def get_session_keys(
     response_tlv = dict(response_tlv)
     handle_state_step(response_tlv, TLV.M4)
 
-    # calculate session keys
+    return derive_resume_session_id(shared_secret), shared_secret
 
-    controller_to_accessory_key = hkdf_derive(
-        shared_secret, "Control-Salt", "Control-Write-Encryption-Key"
-    )
 
-    accessory_to_controller_key = hkdf_derive(
-        shared_secret, "Control-Salt", "Control-Read-Encryption-Key"
-    )
+def get_session_keys(
+    pairing_data: Dict[str, Union[str, int, List[Any]]]
+) -> Generator[
+    Union[
+        Tuple[List[Union[Tuple[int, bytearray], Tuple[int, bytes]]], List[int]],
+        Tuple[List[Tuple[int, bytearray]], List[int]],
+    ],
+    None,
+    Tuple[bytes, bytes],
+]:
+    """
+    HomeKit Controller state machine to perform a full pair verify, see pair_verify.
 
-    return controller_to_accessory_key, accessory_to_controller_key
+    :param pairing_data: the paring data as returned by perform_pair_setup
+    :return: tuple of the session keys (controller_to_accessory_key and  accessory_to_controller_key)
+    """
+    _, shared_secret = yield from pair_verify(pairing_data)
+    return derive_session_keys(shared_secret)
@@ -20,9 +20,20 @@ from _socket import inet_ntoa
 import asyncio
 import contextlib
 import logging
-from typing import Any, Callable, Dict, List, Optional, Tuple, Union
-
-from zeroconf import ServiceBrowser
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Tuple,
+    Union,
+)
+from weakref import WeakKeyDictionary
+
+from zeroconf import ServiceBrowser, ServiceStateChange, current_time_millis
 from zeroconf.asyncio import AsyncServiceBrowser, AsyncServiceInfo, AsyncZeroconf
 
 from aiohomekit.exceptions import AccessoryNotFoundError
@@ -32,21 +43,47 @@ from aiohomekit.model.status_flags import IpStatusFlags
 
 HAP_TYPE = "_hap._tcp.local."
 CLASS_IN = 1
+TYPE_A = 1
 TYPE_PTR = 12
+TYPE_AAAA = 28
 
 _TIMEOUT_MS = 3000
 
+# How long to trust an address if zeroconf has no record of its TTL (the default
+# TTL zeroconf itself uses for host records)
+_DEFAULT_ADDRESS_TTL_MS = 120 * 1000
+
 logger = logging.getLogger(__name__)
 
+# The service name each device id was last seen with, per Zeroconf instance. It lets a
+# single device be resolved from the cache without resolving every HAP record first.
+_device_names: "WeakKeyDictionary[Any, Dict[str, str]]" = WeakKeyDictionary()
+
+
+def _get_device_names(zeroconf) -> Dict[str, str]:
+    names = _device_names.get(zeroconf)
+    if names is None:
+        names = _device_names[zeroconf] = {}
+    return names
+
+
+def _record_device_name(zeroconf, info: AsyncServiceInfo) -> None:
+    device_id = info.properties.get(b"id")
+    if device_id:
+        _get_device_names(zeroconf)[device_id.decode()] = info.name
+
 
 class CollectingListener:
     """Helper class to collect all zeroconf announcements."""
 
-    def __init__(self, device_id=None, found_device_event=None) -> None:
+    def __init__(
+        self, device_id=None, found_device_event=None, found_callback=None
+    ) -> None:
         """Init the listener."""
         self.data = []
         self._device_id = device_id
         self._found_device_event = found_device_event
+        self._found_callback = found_callback
 
     def remove_service(self, zeroconf, zeroconf_type, name):
         """Remove a device that is no longer visible via zeroconf."""
@@ -67,6 +104,8 @@ class CollectingListener:
             return
 
         self.data.append(info)
+        if self._found_callback:
+            self._found_callback(info)
         if info.properties[b"id"].decode() == self._device_id:
             self._found_device_event.set()
 
@@ -81,6 +120,158 @@ class CollectingListener:
         return self.data
 
 
+class HomeKitBrowser:
+    """
+    A long running _hap._tcp browser that keeps the latest data of every HomeKit device.
+
+    The data for each device is what async_discover_homekit_devices returns for it
+    (address, port, c#, s#, flags and so on), indexed by device id. An entry expires
+    when the address records it was resolved from do, and is dropped when the device
+    says goodbye, so a lookup never returns an address zeroconf has stopped trusting.
+
+    Listeners registered with add_listener are called with (device_id, data) whenever
+    a device appears or its data changes, and with (device_id, None) when it goes away.
+    """
+
+    def __init__(self, async_zeroconf_instance: AsyncZeroconf) -> None:
+        self.async_zeroconf_instance = async_zeroconf_instance
+        self._browser: Optional[AsyncServiceBrowser] = None
+        self._devices: Dict[str, Dict[str, Any]] = {}
+        self._expires: Dict[str, float] = {}
+        self._names: Dict[str, str] = {}
+        self._listeners = set()
+        self._tasks = set()
+
+    async def async_start(self) -> None:
+        """Start browsing. Devices are added as their records are resolved."""
+        if self._browser:
+            return
+        self._browser = AsyncServiceBrowser(
+            self.async_zeroconf_instance.zeroconf,
+            HAP_TYPE,
+            handlers=[self._handle_state_change],
+        )
+
+    async def async_stop(self) -> None:
+        """Stop browsing and forget every device."""
+        if self._browser:
+            await self._browser.async_cancel()
+            self._browser = None
+
+        for task in list(self._tasks):
+            task.cancel()
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+        self._devices.clear()
+        self._expires.clear()
+        self._names.clear()
+
+    def add_listener(self, callback: Callable[[str, Optional[Dict[str, Any]]], None]):
+        """
+        Register a callback for devices appearing, changing or going away.
+
+        It returns a callable you can use to cancel the subscription.
+        """
+        self._listeners.add(callback)
+
+        def stop_listening():
+            self._listeners.discard(callback)
+
+        return stop_listening
+
+    def get(self, device_id: str) -> Optional[Dict[str, Any]]:
+        """Returns the current data for a device id, or None if it isn't (or no longer) known."""
+        data = self._devices.get(device_id)
+        if data is None:
+            return None
+
+        if self._expires[device_id] <= current_time_millis():
+            logger.debug("Zeroconf data for %s has expired", device_id)
+            self._remove(device_id)
+            return None
+
+        return data
+
+    def devices(self) -> List[Dict[str, Any]]:
+        """Returns the data of every device that is currently known."""
+        return [data for data in map(self.get, list(self._devices)) if data]
+
+    def _handle_state_change(
+        self,
+        zeroconf,
+        service_type: str,
+        name: str,
+        state_change: ServiceStateChange,
+    ) -> None:
+        if state_change == ServiceStateChange.Removed:
+            device_id = self._names.pop(name, None)
+            if device_id and device_id not in self._names.values():
+                device_names = _get_device_names(zeroconf)
+                if device_names.get(device_id) == name:
+                    del device_names[device_id]
+                self._remove(device_id)
+            return
+
+        task = asyncio.ensure_future(self._async_update(name))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _async_update(self, name: str) -> None:
+        info = AsyncServiceInfo(HAP_TYPE, name)
+        try:
+            await info.async_request(self.async_zeroconf_instance.zeroconf, _TIMEOUT_MS)
+        except Exception:
+            logger.debug("Could not resolve %s", name, exc_info=True)
+            return
+
+        if not _service_info_is_homekit_device(info):
+            return
+
+        data = _build_data_from_service_info(info)
+        device_id = data.get("id")
+        if not device_id:
+            return
+
+        _record_device_name(self.async_zeroconf_instance.zeroconf, info)
+
+        self._names[name] = device_id
+        self._expires[device_id] = self._get_expiration_time(info)
+
+        if self._devices.get(device_id) == data:
+            return
+
+        self._devices[device_id] = data
+        self._notify(device_id, data)
+
+    def _get_expiration_time(self, info: AsyncServiceInfo) -> float:
+        cache = self.async_zeroconf_instance.zeroconf.cache
+        records = []
+        if info.server:
+            for record_type in (TYPE_A, TYPE_AAAA):
+                records.extend(
+                    cache.get_all_by_details(info.server, record_type, CLASS_IN)
+                )
+
+        if not records:
+            return current_time_millis() + _DEFAULT_ADDRESS_TTL_MS
+
+        return max(record.get_expiration_time(100) for record in records)
+
+    def _remove(self, device_id: str) -> None:
+        if self._devices.pop(device_id, None) is None:
+            return
+        del self._expires[device_id]
+        self._notify(device_id, None)
+
+    def _notify(self, device_id: str, data: Optional[Dict[str, Any]]) -> None:
+        for listener in list(self._listeners):
+            try:
+                listener(device_id, data)
+            except Exception:
+                logger.exception("Unhandled error when processing zeroconf update")
+
+
 async def _async_homekit_devices_from_cache(
     aiozc: AsyncZeroconf, filter_func: Callable = None
 ) -> List[Dict[str, Any]]:
@@ -98,6 +289,7 @@ async def _async_homekit_devices_from_cache(
     for info in infos:
         if not _service_info_is_homekit_device(info):
             continue
+        _record_device_name(aiozc.zeroconf, info)
         if filter_func and not filter_func(info):
             continue
         devices.append(_build_data_from_service_info(info))
@@ -109,6 +301,23 @@ async def _async_device_data_zeroconf_cache(
 ) -> Dict[str, Any]:
     """Find a homekit device in the zeroconf cache."""
     device_id_bytes = device_id.encode()
+
+    device_names = _get_device_names(aiozc.zeroconf)
+    name = device_names.get(device_id)
+    if name:
+        info = AsyncServiceInfo(HAP_TYPE, name)
+        await info.async_request(aiozc.zeroconf, _TIMEOUT_MS)
+        if (
+            _service_info_is_homekit_device(info)
+            and info.properties.get(b"id") == device_id_bytes
+        ):
+            logging.debug("Located Homekit IP accessory %s by name", name)
+            return _build_data_from_service_info(info)
+
+        # The device has gone or changed its name, look at every record instead
+        if device_names.get(device_id) == name:
+            del device_names[device_id]
+
     devices = await _async_homekit_devices_from_cache(
         aiozc, lambda info: info.properties[b"id"] == device_id_bytes
     )
@@ -169,28 +378,84 @@ async def async_discover_homekit_devices(
     :param max_seconds: the number of seconds we will wait for the devices to be discovered
     :return: a list of dicts containing all fields as described in table 5.7 page 69
     """
+    return [
+        data
+        async for data in async_iter_homekit_devices(
+            max_seconds, async_zeroconf_instance=async_zeroconf_instance
+        )
+    ]
+
+
+async def async_iter_homekit_devices(
+    max_seconds: float = 10,
+    async_zeroconf_instance: AsyncZeroconf = None,
+    count: Optional[int] = None,
+    device_ids: Optional[Iterable[str]] = None,
+    quiet_period: Optional[float] = None,
+) -> AsyncIterator[Dict[str, Any]]:
+    """Discovers HomeKit Accessories, yielding each one as soon as it is resolved.
+
+    Each service is yielded once, as the same dict async_discover_homekit_devices returns for it. Browsing
+    stops after max_seconds, or earlier when one of the optional stop conditions is met.
+
+    :param max_seconds: the longest time to browse for
+    :param count: stop once this many devices have been found
+    :param device_ids: stop once all of these device ids have been found
+    :param quiet_period: stop once no new device has been found for this many seconds
+    """
+    wanted = set(device_ids) if device_ids is not None else None
+    found = set()
+    seen_names = set()
+
+    def is_done():
+        if count is not None and len(found) >= count:
+            return True
+        return wanted is not None and wanted <= found
+
     if async_zeroconf_instance and async_zeroconf_has_hap_service_browser(
         async_zeroconf_instance
     ):
-        return await _async_homekit_devices_from_cache(async_zeroconf_instance)
+        for data in await _async_homekit_devices_from_cache(async_zeroconf_instance):
+            found.add(data["id"])
+            yield data
+            if is_done():
+                return
+        return
+
+    loop = asyncio.get_event_loop()
+    deadline = loop.time() + max_seconds
+    queue = asyncio.Queue()
 
     our_aiozc = async_zeroconf_instance or AsyncZeroconf()
-    listener = CollectingListener()
+    listener = CollectingListener(found_callback=queue.put_nowait)
     service_browser = AsyncServiceBrowser(our_aiozc.zeroconf, HAP_TYPE, listener)
-    await asyncio.sleep(max_seconds)
-    tmp = []
     try:
-        for info in listener.get_data():
-            if not _service_info_is_homekit_device(info):
+        while not is_done():
+            timeout = deadline - loop.time()
+            if quiet_period is not None:
+                timeout = min(timeout, quiet_period)
+            if timeout <= 0:
+                return
+
+            try:
+                info = await asyncio.wait_for(queue.get(), timeout)
+            except asyncio.TimeoutError:
+                return
+
+            # Services are announced again whenever their records change
+            if info.name in seen_names:
                 continue
+            seen_names.add(info.name)
+
             data = _build_data_from_service_info(info)
+            found.add(data["id"])
+
             logging.debug("found Homekit IP accessory %s", data)
-            tmp.append(data)
+            yield data
     finally:
         await service_browser.async_cancel()
         if not async_zeroconf_instance:
             await our_aiozc.async_close()
-    return tmp
 
 
 def _build_data_from_service_info(service_info) -> Dict[str, Any]:
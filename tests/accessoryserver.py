@@ -20,6 +20,7 @@ import io
 import json
 from json.decoder import JSONDecodeError
 import logging
+import os
 import select
 import socket
 from socketserver import ThreadingMixIn
@@ -48,7 +49,7 @@ from aiohomekit.exceptions import (
 from aiohomekit.http import HttpStatusCodes
 from aiohomekit.model import Accessories, Categories
 from aiohomekit.model.characteristics import CharacteristicsTypes
-from aiohomekit.protocol import TLV
+from aiohomekit.protocol import TLV, derive_resume_session_id
 from aiohomekit.protocol.statuscodes import HapStatusCode
 
 
@@ -84,6 +85,8 @@ class AccessoryServer(ThreadingMixIn, HTTPServer):
         self.data = AccessoryServerData(config_file)
         self.data.increase_configuration_number()
         self.sessions = {}
+        # (pairing id, shared secret) of verified sessions, by resume session id
+        self.resume_sessions = {}
         self.zeroconf = Zeroconf()
         self.mdns_type = "_hap._tcp.local."
         self.mdns_name = self.data.name + "._hap._tcp.local."
@@ -350,6 +353,7 @@ class AccessoryRequestHandler(BaseHTTPRequestHandler):
     DEBUG_CRYPT = False
     DEBUG_PAIR_VERIFY = False
     DEBUG_GET_CHARACTERISTICS = False
+    PAIR_RESUME = True
     timeout = 300
 
     def __init__(self, request, client_address, server):
@@ -463,7 +467,14 @@ class AccessoryRequestHandler(BaseHTTPRequestHandler):
         try:
             # make connection non blocking so the select can work
             self.connection.setblocking(0)
-            ready = select.select([self.connection], [], [], 1)
+
+            # pipelined requests can already be sitting in rfile's buffer, in which case
+            # the socket won't become readable again. This relies on SocketIO.readinto
+            # returning None for a non-blocking socket with nothing to read, so peek()
+            # returns b"" rather than blocking or raising when the buffer is empty.
+            ready = [self.rfile.peek(1)]
+            if not ready[0]:
+                ready = select.select([self.connection], [], [], 1)
 
             # no data was to be received, so we count up to track how many seconds in total this happened
             if not ready[0]:
@@ -882,6 +893,13 @@ class AccessoryRequestHandler(BaseHTTPRequestHandler):
     def _post_pair_verify(self):
         d_req = TLV.decode_bytes(self.body)
 
+        if dict(d_req).get(TLV.kTLVType_Method) == bytes([TLV.kTLVMethod_Resume]):
+            if not AccessoryRequestHandler.PAIR_RESUME:
+                self.send_error_reply(TLV.M2, TLV.kTLVError_Unknown)
+                return
+            if self._post_pair_resume(dict(d_req)):
+                return
+
         # Order is not consistent, so force things in to order specified in spec
         d_req = tlv_reorder(
             d_req,
@@ -1049,6 +1067,11 @@ class AccessoryRequestHandler(BaseHTTPRequestHandler):
             ] = accessory_to_controller_key
             self.server.sessions[self.session_id]["accessory_to_controller_count"] = 0
 
+            self.server.resume_sessions[derive_resume_session_id(shared_secret)] = (
+                ios_device_pairing_id,
+                shared_secret,
+            )
+
             d_res.append(
                 (
                     TLV.kTLVType_State,
@@ -1063,6 +1086,73 @@ class AccessoryRequestHandler(BaseHTTPRequestHandler):
 
         self.send_error(HttpStatusCodes.METHOD_NOT_ALLOWED)
 
+    def _post_pair_resume(self, d_req):
+        """
+        Resume a session from an earlier pair verify. Returns False if the session is
+        unknown, in which case the caller carries on with a normal pair verify.
+        """
+        ios_device_pub_key = bytes(d_req[TLV.kTLVType_PublicKey])
+        session_id = bytes(d_req[TLV.kTLVType_SessionID])
+
+        # Each session id can only be used once
+        ios_device_pairing_id, shared_secret = self.server.resume_sessions.pop(
+            session_id, (None, None)
+        )
+        if shared_secret is None:
+            return False
+
+        # Sessions of removed pairings can't be resumed
+        if self.server.data.get_peer_key(ios_device_pairing_id) is None:
+            return False
+
+        request_key = hkdf_derive(
+            shared_secret, ios_device_pub_key + session_id, "Pair-Resume-Request-Info"
+        )
+        decrypted = chacha20_aead_decrypt(
+            bytes(),
+            request_key,
+            b"PR-Msg01",
+            bytes([0, 0, 0, 0]),
+            d_req[TLV.kTLVType_EncryptedData],
+        )
+        if decrypted is False:
+            return False
+
+        new_session_id = os.urandom(8)
+        salt = ios_device_pub_key + new_session_id
+
+        response_key = hkdf_derive(shared_secret, salt, "Pair-Resume-Response-Info")
+        auth_tag = chacha20_aead_encrypt(
+            bytes(), response_key, b"PR-Msg02", bytes([0, 0, 0, 0]), bytes()
+        )
+
+        shared_secret = hkdf_derive(
+            shared_secret, salt, "Pair-Resume-Shared-Secret-Info"
+        )
+        self.server.resume_sessions[new_session_id] = (
+            ios_device_pairing_id,
+            shared_secret,
+        )
+
+        session = self.server.sessions[self.session_id]
+        session["controller_to_accessory_key"] = hkdf_derive(
+            shared_secret, "Control-Salt", "Control-Write-Encryption-Key"
+        )
+        session["controller_to_accessory_count"] = 0
+        session["accessory_to_controller_key"] = hkdf_derive(
+            shared_secret, "Control-Salt", "Control-Read-Encryption-Key"
+        )
+        session["accessory_to_controller_count"] = 0
+
+        self._send_response_tlv(
+            [
+                (TLV.kTLVType_State, TLV.M2),
+                (TLV.kTLVType_SessionID, new_session_id),
+                (TLV.kTLVType_EncryptedData, auth_tag),
+            ]
+        )
+        return True
+
     def _post_pairings(self):
         d_req = TLV.decode_bytes(self.body)
 
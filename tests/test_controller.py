@@ -1,5 +1,17 @@
+import asyncio
+import json
+import sys
+from unittest import mock
+
+if sys.version_info[:2] < (3, 8):
+    from asynctest.mock import CoroutineMock as AsyncMock  # noqa
+else:
+    from unittest.mock import AsyncMock  # noqa
+
 import pytest
 
+from aiohomekit import Controller
+from aiohomekit.controller.ip import IpPairing
 from aiohomekit.exceptions import AuthenticationError
 
 
@@ -24,3 +36,154 @@ async def test_find_ip_by_device_id(controller_and_unpaired_accessory):
 
     assert ip_discovery.host == "127.0.0.1"
     assert ip_discovery.device_id == "12:34:56:00:01:0A"
+
+
+async def test_reconnect_uses_browser(controller_and_paired_accessory):
+    controller = controller_and_paired_accessory
+    pairing = controller.pairings["alias"]
+
+    controller.browser = mock.Mock()
+    controller.browser.get.return_value = {
+        "address": "127.0.0.1",
+        "port": 51842,
+        "id": "12:34:56:00:01:0A",
+    }
+
+    with mock.patch(
+        "aiohomekit.controller.ip.connection.async_find_device_ip_and_port"
+    ) as find:
+        await pairing.get_characteristics([(1, 9)])
+
+    assert not find.called
+    controller.browser.get.assert_called_with("12:34:56:00:01:0A")
+    controller.browser = None
+
+
+async def test_start_browser():
+    controller = Controller(async_zeroconf_instance=mock.Mock())
+
+    with mock.patch("aiohomekit.controller.controller.HomeKitBrowser") as browser:
+        browser.return_value.async_start = AsyncMock()
+        browser.return_value.async_stop = AsyncMock()
+        browser.return_value.devices.return_value = [
+            {"address": "127.0.0.1", "port": 51842, "id": "12:34:56:00:01:0A"}
+        ]
+        browser.return_value.get.return_value = None
+
+        assert await controller.start_browser() is browser.return_value
+        assert await controller.start_browser() is browser.return_value
+        browser.return_value.async_start.assert_called_once()
+
+        discoveries = await controller.discover_ip()
+        assert [d.device_id for d in discoveries] == ["12:34:56:00:01:0A"]
+
+        await controller.shutdown()
+        browser.return_value.async_stop.assert_called_once()
+        assert controller.browser is None
+
+
+async def test_device_seen_prioritises_reconnect():
+    controller = Controller()
+
+    pairing = mock.Mock()
+    pairing.pairing_data = {"AccessoryPairingID": "12:34:56:00:01:0A"}
+    pairing.connection.is_reconnecting = True
+    pairing.connection.reconnect_soon = AsyncMock()
+    controller.pairings["alias"] = pairing
+
+    other = mock.Mock()
+    other.pairing_data = {"AccessoryPairingID": "12:34:56:00:01:0B"}
+    other.connection.reconnect_soon = AsyncMock()
+    controller.pairings["other"] = other
+
+    controller._device_seen("12:34:56:00:01:0A", None)
+    controller._device_seen("12:34:56:00:01:0A", {"id": "12:34:56:00:01:0A"})
+    await asyncio.sleep(0)
+
+    pairing.connection.reconnect_soon.assert_called_once()
+    assert not other.connection.reconnect_soon.called
+    assert pairing.connection in controller.reconnect_scheduler._prioritised
+
+
+async def test_shutdown_closes_pairings_in_parallel():
+    controller = Controller()
+    closing = []
+
+    async def close():
+        closing.append(True)
+        await asyncio.sleep(0.2)
+
+    for alias in ("one", "two", "three"):
+        controller.pairings[alias] = mock.Mock(close=close)
+
+    # Never built, so there is nothing to close
+    controller.pairings.add_lazy("four", {"AccessoryPairingID": "12:34:56:00:01:0B"})
+
+    loop = asyncio.get_event_loop()
+    start = loop.time()
+    await controller.shutdown()
+
+    assert len(closing) == 3
+    assert loop.time() - start < 0.4
+
+
+async def test_shutdown_timeout():
+    controller = Controller()
+    cancelled = []
+
+    async def close():
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+
+    controller.pairings["stuck"] = mock.Mock(close=close)
+    controller.pairings["quick"] = mock.Mock(close=AsyncMock())
+
+    await asyncio.wait_for(controller.shutdown(timeout=0.1), 1)
+    await asyncio.sleep(0)
+
+    controller.pairings["quick"].close.assert_awaited_once()
+    assert cancelled == [True]
+
+
+def test_load_data_lazy(tmp_path):
+    pairing_file = tmp_path / "pairing.json"
+    pairing_file.write_text(
+        json.dumps(
+            {
+                "alias": {
+                    "AccessoryPairingID": "12:34:56:00:01:0A",
+                    "AccessoryIP": "127.0.0.1",
+                    "AccessoryPort": 51842,
+                },
+                "broken": {"Connection": "Unknown"},
+            }
+        )
+    )
+
+    controller = Controller()
+    controller.load_data(str(pairing_file), lazy=True)
+
+    assert set(controller.pairings) == {"alias", "broken"}
+    assert "alias" in controller.pairings
+    assert controller.pairings.loaded() == []
+
+    # Saving doesn't need to build the pairings either
+    controller.save_data(str(tmp_path / "saved.json"))
+    assert controller.pairings.loaded() == []
+    assert json.loads((tmp_path / "saved.json").read_text()) == json.loads(
+        pairing_file.read_text()
+    )
+
+    pairing = controller.pairings["alias"]
+    assert isinstance(pairing, IpPairing)
+    assert controller.pairings["alias"] is pairing
+    assert controller.pairings.loaded() == [pairing]
+
+    with pytest.raises(NotImplementedError):
+        controller.pairings["broken"]
+
+    del controller.pairings["broken"]
+    assert list(controller.pairings) == ["alias"]
@@ -0,0 +1,55 @@
+import json
+
+from aiohomekit.controller.cache import AccessoriesCache
+
+ACCESSORIES = [{"aid": 1, "services": []}]
+
+
+def test_get_missing(tmp_path):
+    cache = AccessoriesCache(tmp_path)
+    assert cache.get("12:34:56:00:01:0A", 1) is None
+
+
+def test_set_and_get(tmp_path):
+    cache = AccessoriesCache(tmp_path / "cache")
+    cache.set("12:34:56:00:01:0A", 1, ACCESSORIES)
+
+    assert cache.get("12:34:56:00:01:0A", 1) == ACCESSORIES
+    assert cache.get("12:34:56:00:01:0A", 2) is None
+
+    # A new instance reads the entry back from disk
+    cache = AccessoriesCache(tmp_path / "cache")
+    assert cache.get("12:34:56:00:01:0A", 1) == ACCESSORIES
+    assert cache.get("12:34:56:00:01:0B", 1) is None
+
+
+def test_remove(tmp_path):
+    cache = AccessoriesCache(tmp_path)
+    cache.set("12:34:56:00:01:0A", 1, ACCESSORIES)
+    cache.remove("12:34:56:00:01:0A")
+    cache.remove("12:34:56:00:01:0A")
+
+    assert cache.get("12:34:56:00:01:0A", 1) is None
+    assert AccessoriesCache(tmp_path).get("12:34:56:00:01:0A", 1) is None
+
+
+def test_corrupt_entry_is_ignored(tmp_path):
+    cache = AccessoriesCache(tmp_path)
+    cache.set("12:34:56:00:01:0A", 1, ACCESSORIES)
+
+    for path in tmp_path.iterdir():
+        path.write_text("{")
+
+    assert AccessoriesCache(tmp_path).get("12:34:56:00:01:0A", 1) is None
+
+
+def test_entry_for_other_pairing_is_ignored(tmp_path):
+    cache = AccessoriesCache(tmp_path)
+    cache.set("12:34:56:00:01:0A", 1, ACCESSORIES)
+
+    for path in tmp_path.iterdir():
+        path.write_text(
+            json.dumps({"id": "other", "config_num": 1, "accessories": ACCESSORIES})
+        )
+
+    assert AccessoriesCache(tmp_path).get("12:34:56:00:01:0A", 1) is None
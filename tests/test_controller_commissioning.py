@@ -0,0 +1,155 @@
+import json
+import time
+from unittest import mock
+
+import pytest
+
+from aiohomekit.__main__ import main
+from aiohomekit.controller import Commissioner
+from aiohomekit.controller.ip import IpPairing
+from aiohomekit.exceptions import BackoffError
+from aiohomekit.protocol import handle_state_step
+from aiohomekit.protocol.tlv import TLV
+
+DEVICE = {
+    "name": "Testlicht._hap._tcp.local.",
+    "address": "127.0.0.1",
+    "port": 51842,
+    "c#": "1",
+    "ff": 0,
+    "id": "12:34:56:00:01:0A",
+    "md": "Demoserver",
+    "s#": "1",
+    "sf": "1",
+    "ci": "5",
+}
+
+MANIFEST = [
+    {"id": "12:34:56:00:01:0A", "pin": "031-45-154", "alias": "light"},
+    {"id": "12:34:56:00:01:0B", "pin": "031-45-154"},
+]
+
+
+def patch_browse(*devices):
+    browses = []
+
+    async def iter_devices(max_seconds, async_zeroconf_instance=None, **kwargs):
+        browses.append(max_seconds)
+        for device in devices:
+            yield device
+
+    patcher = mock.patch(
+        "aiohomekit.controller.controller.async_iter_homekit_devices", iter_devices
+    )
+    return patcher, browses
+
+
+async def test_commission(controller_and_unpaired_accessory, tmp_path):
+    controller = controller_and_unpaired_accessory
+    state_file = tmp_path / "state.json"
+    on_result = mock.Mock()
+
+    patcher, browses = patch_browse(DEVICE)
+    with patcher:
+        commissioner = Commissioner(controller, state_file)
+        results = await commissioner.async_commission(MANIFEST, 5, on_result)
+
+    assert browses == [5]
+    assert results == {
+        "12:34:56:00:01:0A": {"alias": "light", "status": "paired", "attempts": 1},
+        "12:34:56:00:01:0B": {
+            "alias": "12:34:56:00:01:0B",
+            "status": "not_found",
+            "attempts": 1,
+            "error": "Device not found",
+        },
+    }
+    assert on_result.call_count == 2
+
+    assert isinstance(controller.pairings["light"], IpPairing)
+    assert await controller.pairings["light"].get_characteristics([(1, 9)]) == {
+        (1, 9): {"value": False}
+    }
+
+    with open(state_file) as fp:
+        assert json.load(fp) == results
+
+    # A new run only looks for the device that wasn't found
+    patcher, browses = patch_browse()
+    with patcher:
+        commissioner = Commissioner(controller, state_file)
+        results = await commissioner.async_commission(MANIFEST, 5)
+
+    assert browses == [5]
+    assert results["12:34:56:00:01:0A"]["attempts"] == 1
+    assert results["12:34:56:00:01:0B"]["attempts"] == 2
+
+
+async def test_commission_backoff(controller_and_unpaired_accessory, tmp_path):
+    controller = controller_and_unpaired_accessory
+    state_file = tmp_path / "state.json"
+
+    patcher, browses = patch_browse(DEVICE)
+    with patcher, mock.patch(
+        "aiohomekit.controller.ip.IpDiscovery.start_pairing",
+        side_effect=BackoffError("step 2", 120),
+    ):
+        commissioner = Commissioner(controller, state_file)
+        results = await commissioner.async_commission(MANIFEST[:1])
+
+    result = results["12:34:56:00:01:0A"]
+    assert result["status"] == "backoff"
+    assert time.time() + 110 < result["retry_at"] <= time.time() + 120
+
+    # Nothing to do until the retry delay has passed
+    patcher, browses = patch_browse(DEVICE)
+    with patcher:
+        commissioner = Commissioner(controller, state_file)
+        await commissioner.async_commission(MANIFEST[:1])
+
+    assert browses == []
+    assert "light" not in controller.pairings
+
+
+async def test_commission_malformed_pin(controller_and_unpaired_accessory):
+    controller = controller_and_unpaired_accessory
+
+    patcher, browses = patch_browse(DEVICE)
+    with patcher:
+        results = await Commissioner(controller).async_commission(
+            [{"id": "12:34:56:00:01:0A", "pin": "1234"}]
+        )
+
+    assert browses == []
+    assert results["12:34:56:00:01:0A"]["status"] == "failed"
+
+
+async def test_commission_cli(controller_and_unpaired_accessory, tmp_path):
+    manifest = tmp_path / "manifest.json"
+    manifest.write_text(json.dumps(MANIFEST[:1]))
+    pairing_file = tmp_path / "pairing.json"
+
+    patcher, browses = patch_browse(DEVICE)
+    with patcher, mock.patch("sys.stdout") as stdout:
+        await main(["commission", "-f", str(pairing_file), "-m", str(manifest)])
+
+    printed = "".join(call[0][0] for call in stdout.write.call_args_list)
+    assert '12:34:56:00:01:0A ("light"): paired' in printed
+    assert "1 of 1 devices are paired." in printed
+
+    assert "light" in json.loads(pairing_file.read_text())
+    assert (tmp_path / "manifest.state.json").exists()
+
+
+def test_backoff_retry_delay():
+    with pytest.raises(BackoffError) as exc_info:
+        handle_state_step(
+            {
+                TLV.kTLVType_State: TLV.M2,
+                TLV.kTLVType_Error: TLV.kTLVError_Backoff,
+                TLV.kTLVType_RetryDelay: bytearray(b"\x2c\x01"),
+            },
+            TLV.M2,
+        )
+
+    assert exc_info.value.retry_delay == 300
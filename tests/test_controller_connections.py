@@ -0,0 +1,132 @@
+import asyncio
+from unittest import mock
+
+from aiohomekit.controller import ConnectionManager
+
+
+class FakeConnection:
+    def __init__(self, manager, subscriptions=()):
+        self.manager = manager
+        self.owner = mock.Mock(subscriptions=set(subscriptions))
+        self.is_idle = True
+        self.closed = False
+
+    def close_idle(self):
+        self.closed = True
+        self.manager.release(self)
+
+
+async def test_evicts_least_recently_used():
+    manager = ConnectionManager(max_connections=2)
+    first, second, third = (FakeConnection(manager) for _ in range(3))
+
+    await manager.acquire(first, "127.0.0.1")
+    await manager.acquire(second, "127.0.0.2")
+    manager.touch(first)
+
+    await manager.acquire(third, "127.0.0.3")
+
+    assert not first.closed
+    assert second.closed
+    assert manager.open_connections == 2
+
+
+async def test_per_host_limit():
+    manager = ConnectionManager(max_per_host=1)
+    first, second, other = (FakeConnection(manager) for _ in range(3))
+
+    await manager.acquire(first, "127.0.0.1")
+    await manager.acquire(other, "127.0.0.2")
+    await manager.acquire(second, "127.0.0.1")
+
+    assert first.closed
+    assert not other.closed
+    assert manager.open_connections == 2
+
+
+async def test_waits_for_idle_connection():
+    manager = ConnectionManager(max_connections=1)
+    busy = FakeConnection(manager)
+    subscribed = FakeConnection(manager, subscriptions=[(1, 9)])
+    waiting = FakeConnection(manager)
+
+    await manager.acquire(busy, "127.0.0.1")
+    busy.is_idle = False
+
+    task = asyncio.ensure_future(manager.acquire(waiting, "127.0.0.2"))
+    await asyncio.sleep(0)
+    assert not task.done()
+
+    # A connection with event subscriptions is never closed to make room
+    manager.release(busy)
+    await manager.acquire(subscribed, "127.0.0.3")
+    await asyncio.sleep(0)
+    assert not task.done()
+
+    subscribed.owner.subscriptions.clear()
+    manager.touch(subscribed)
+    await asyncio.wait_for(task, 1)
+
+    assert subscribed.closed
+    assert manager.open_connections == 1
+
+
+async def test_idle_timeout():
+    manager = ConnectionManager(idle_timeout=0.05)
+    idle = FakeConnection(manager)
+    subscribed = FakeConnection(manager, subscriptions=[(1, 9)])
+
+    await manager.acquire(idle, "127.0.0.1")
+    await manager.acquire(subscribed, "127.0.0.2")
+    await asyncio.sleep(0.2)
+
+    assert idle.closed
+    assert not subscribed.closed
+
+    manager.release(subscribed)
+    assert manager._idle_check is None
+
+
+def test_should_reconnect():
+    unlimited = ConnectionManager()
+    limited = ConnectionManager(idle_timeout=60)
+
+    assert unlimited.should_reconnect(FakeConnection(unlimited))
+    assert not limited.should_reconnect(FakeConnection(limited))
+    assert limited.should_reconnect(FakeConnection(limited, subscriptions=[(1, 9)]))
+
+
+async def test_max_connections_with_accessory(pairings):
+    left, right = pairings
+    manager = left.controller.connection_manager = ConnectionManager(max_connections=1)
+
+    assert await left.get_characteristics([(1, 9)]) == {(1, 9): {"value": False}}
+    assert await right.get_characteristics([(1, 9)]) == {(1, 9): {"value": False}}
+    await asyncio.sleep(0.1)
+
+    # The idle connection made room, and isn't reconnected until it is used again
+    assert not left.connection.is_connected
+    assert not left.connection.is_reconnecting
+    assert manager.open_connections == 1
+
+    assert await left.get_characteristics([(1, 9)]) == {(1, 9): {"value": False}}
+    await asyncio.sleep(0.1)
+
+    assert left.connection.is_connected
+    assert not right.connection.is_connected
+    assert manager.open_connections == 1
+
+
+async def test_idle_timeout_with_accessory(pairing):
+    manager = ConnectionManager(idle_timeout=0.1)
+    pairing.controller.connection_manager = manager
+
+    assert await pairing.get_characteristics([(1, 9)]) == {(1, 9): {"value": False}}
+    await asyncio.sleep(0.5)
+
+    assert not pairing.connection.is_connected
+    assert not pairing.connection.is_reconnecting
+    assert manager.open_connections == 0
+
+    assert await pairing.get_characteristics([(1, 9)]) == {(1, 9): {"value": False}}
+    assert manager.open_connections == 1
@@ -0,0 +1,101 @@
+import asyncio
+from unittest import mock
+
+from aiohomekit.controller.polling import PollingPlanner
+from aiohomekit.exceptions import AccessoryDisconnectedError
+
+
+class FakePairing:
+    def __init__(self):
+        self.calls = 0
+        self.error = None
+
+    async def get_characteristics(self, characteristics):
+        self.calls += 1
+        if self.error:
+            raise self.error
+        return {key: {"value": self.calls} for key in characteristics}
+
+
+def make_planner(**kwargs):
+    pairing = FakePairing()
+    planner = PollingPlanner(pairing, [(1, 9)], **kwargs)
+    return planner, pairing
+
+
+async def test_polls_until_state_number_is_trusted():
+    planner, pairing = make_planner()
+
+    # A fixed s# of 1 (as the spec allows for IP accessories) never stops polling
+    planner.process_discovery({"s#": "1", "c#": "1"})
+    assert await planner.async_poll() == {(1, 9): {"value": 1}}
+    assert await planner.async_poll() == {(1, 9): {"value": 2}}
+    assert not planner.trusted
+
+
+async def test_skips_poll_when_state_number_unchanged():
+    callback = mock.Mock()
+    planner, pairing = make_planner(callback=callback)
+
+    planner.process_discovery({"s#": "1"})
+    planner.process_discovery({"s#": "2"})
+    assert planner.trusted
+
+    # The change triggers an immediate refresh
+    await asyncio.sleep(0)
+    callback.assert_called_once_with({(1, 9): {"value": 1}})
+
+    assert await planner.async_poll() is None
+    assert pairing.calls == 1
+
+    planner.process_discovery({"s#": "2"})
+    assert await planner.async_poll() is None
+    assert await planner.async_poll(force=True) == {(1, 9): {"value": 2}}
+
+
+async def test_polls_after_max_skip_interval():
+    planner, pairing = make_planner(max_skip_interval=10)
+
+    planner.process_discovery({"s#": "1"})
+    planner.process_discovery({"s#": "2"})
+    await asyncio.sleep(0)
+    assert pairing.calls == 1
+
+    with mock.patch("aiohomekit.controller.polling.time.monotonic") as monotonic:
+        monotonic.return_value = planner._last_poll + 5
+        assert await planner.async_poll() is None
+
+        monotonic.return_value = planner._last_poll + 10
+        assert await planner.async_poll() is not None
+
+
+async def test_config_number_change():
+    config_changed = mock.Mock()
+    planner, pairing = make_planner(config_changed_callback=config_changed)
+
+    planner.process_discovery({"s#": "1", "c#": "1"})
+    planner.process_discovery({"s#": "2", "c#": "1"})
+    await asyncio.sleep(0)
+    assert not planner.should_poll()
+
+    planner.process_discovery({"s#": "2", "c#": "2"})
+    config_changed.assert_called_once_with(2)
+    assert planner.should_poll()
+
+
+async def test_refresh_failure_is_retried_on_next_poll():
+    callback = mock.Mock()
+    planner, pairing = make_planner(callback=callback)
+    pairing.error = AccessoryDisconnectedError("gone")
+
+    planner.process_discovery({"s#": "1"})
+    planner.process_discovery({"s#": "2"})
+    await asyncio.sleep(0)
+
+    assert not callback.called
+    assert planner.should_poll()
+
+    pairing.error = None
+    assert await planner.async_poll() is not None
+    assert not planner.should_poll()
+    await planner.async_stop()
@@ -0,0 +1,103 @@
+import asyncio
+
+import pytest
+
+from aiohomekit.controller.reconnect import ReconnectScheduler
+
+
+async def run_attempts(scheduler, attempts):
+    order = []
+    release = asyncio.Event()
+
+    async def connect(host, key):
+        async with scheduler.attempt(host, key=key):
+            order.append(key)
+            await release.wait()
+
+    tasks = []
+    for host, key in attempts:
+        tasks.append(asyncio.ensure_future(connect(host, key)))
+        await asyncio.sleep(0)
+
+    return order, release, tasks
+
+
+async def test_global_limit():
+    scheduler = ReconnectScheduler(max_concurrent=2, max_per_host=2)
+
+    order, release, tasks = await run_attempts(
+        scheduler, [("10.0.0.1", "a"), ("10.0.0.2", "b"), ("10.0.0.3", "c")]
+    )
+
+    assert order == ["a", "b"]
+    assert scheduler.in_flight == 2
+
+    release.set()
+    await asyncio.gather(*tasks)
+
+    assert order == ["a", "b", "c"]
+    assert scheduler.in_flight == 0
+
+
+async def test_per_host_limit():
+    scheduler = ReconnectScheduler(max_concurrent=10, max_per_host=1)
+
+    order, release, tasks = await run_attempts(
+        scheduler, [("10.0.0.1", "a"), ("10.0.0.1", "b"), ("10.0.0.2", "c")]
+    )
+
+    # The second attempt for 10.0.0.1 waits, but doesn't hold up other hosts
+    assert order == ["a", "c"]
+
+    release.set()
+    await asyncio.gather(*tasks)
+    assert order == ["a", "c", "b"]
+
+
+async def test_prioritised_goes_first():
+    scheduler = ReconnectScheduler(max_concurrent=1)
+
+    order, release, tasks = await run_attempts(
+        scheduler, [("10.0.0.1", "a"), ("10.0.0.2", "b"), ("10.0.0.3", "c")]
+    )
+    scheduler.prioritise("c")
+
+    release.set()
+    await asyncio.gather(*tasks)
+
+    assert order == ["a", "c", "b"]
+
+
+async def test_cancelled_waiter_gives_up_its_place():
+    scheduler = ReconnectScheduler(max_concurrent=1)
+
+    order, release, tasks = await run_attempts(
+        scheduler, [("10.0.0.1", "a"), ("10.0.0.2", "b"), ("10.0.0.3", "c")]
+    )
+
+    tasks[1].cancel()
+    release.set()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+    assert order == ["a", "c"]
+    assert scheduler.in_flight == 0
+
+
+async def test_failed_attempt_releases_slot():
+    scheduler = ReconnectScheduler(max_concurrent=1)
+
+    with pytest.raises(OSError):
+        async with scheduler.attempt("10.0.0.1"):
+            raise OSError()
+
+    assert scheduler.in_flight == 0
+
+
+def test_delay_is_jittered_and_capped():
+    scheduler = ReconnectScheduler(initial_delay=1, max_delay=10)
+
+    delays = {scheduler.get_delay(0) for _ in range(20)}
+    assert len(delays) > 1
+    assert all(0.5 <= delay <= 1 for delay in delays)
+
+    assert all(5 <= scheduler.get_delay(20) <= 10 for _ in range(20))
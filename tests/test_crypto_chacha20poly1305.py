@@ -14,7 +14,12 @@
 # limitations under the License.
 #
 
+from unittest import mock
+
+import pytest
+
 from aiohomekit.crypto.chacha20poly1305 import (
+    ChaCha20Poly1305Context,
     chacha20_aead_decrypt,
     chacha20_aead_encrypt,
 )
@@ -181,3 +186,63 @@ def test_example2_8_2():
     assert plain_text == plain_text_
 
     assert chacha20_aead_decrypt(aad, key, iv, fixed, r + bytes([0, 1, 2, 3])) is False
+
+
+def test_context_matches_functions():
+    key = bytes(range(32))
+    aad = b"\x05\x00"
+
+    encryptor = ChaCha20Poly1305Context(key)
+    decryptor = ChaCha20Poly1305Context(key)
+
+    for counter in range(3):
+        iv = counter.to_bytes(8, byteorder="little")
+        encrypted = encryptor.encrypt(aad, b"hello")
+        assert encrypted == chacha20_aead_encrypt(
+            aad, key, iv, bytes([0, 0, 0, 0]), b"hello"
+        )
+        assert decryptor.decrypt(memoryview(aad), memoryview(encrypted)) == b"hello"
+
+    assert encryptor.counter == 3
+    assert decryptor.counter == 3
+
+
+def test_context_frames():
+    key = bytes(range(32))
+    frames = [(b"\x01\x00", b"a"), (b"\x02\x00", b"bc"), (b"\x03\x00", b"def")]
+
+    encrypted = ChaCha20Poly1305Context(key).encrypt_frames(frames)
+    assert len(encrypted) == 3
+
+    decryptor = ChaCha20Poly1305Context(key)
+    assert decryptor.decrypt_frames(
+        (aad, data) for (aad, _), data in zip(frames, encrypted)
+    ) == [b"a", b"bc", b"def"]
+    assert decryptor.counter == 3
+
+
+def test_context_decrypt_invalid_tag():
+    key = bytes(range(32))
+
+    encrypted = ChaCha20Poly1305Context(key).encrypt(b"", b"hello")
+
+    decryptor = ChaCha20Poly1305Context(key)
+    assert decryptor.decrypt(b"", encrypted + b"\x00") is False
+    assert decryptor.decrypt_frames([(b"", encrypted[:-1]), (b"", encrypted)]) == []
+    assert decryptor.counter == 0
+
+
+@pytest.mark.parametrize("supports_encrypt_into", [True, False])
+def test_context_encrypt_into(supports_encrypt_into):
+    key = bytes(range(32))
+    buf = bytearray(5 + 16 + 2)
+
+    with mock.patch(
+        "aiohomekit.crypto.chacha20poly1305.SUPPORTS_ENCRYPT_INTO",
+        supports_encrypt_into,
+    ):
+        context = ChaCha20Poly1305Context(key)
+        context.encrypt_into(b"\x05\x00", b"hello", memoryview(buf)[2:])
+
+    assert context.counter == 1
+    assert bytes(buf[2:]) == ChaCha20Poly1305Context(key).encrypt(b"\x05\x00", b"hello")
@@ -14,6 +14,9 @@
 # limitations under the License.
 #
 
+import hashlib
+from unittest import mock
+
 from aiohomekit.crypto.srp import SrpClient, SrpServer
 
 
@@ -42,3 +45,49 @@ def test_1():
 
     # step M5
     assert client.verify_servers_proof(servers_proof) is True
+
+
+def test_precomputed_group_constants():
+    client = SrpClient("Pair-Setup", "123-45-678")
+
+    hash_instance = hashlib.sha512()
+    hash_instance.update(SrpClient.to_byte_array(client.n))
+    hash_instance.update(bytearray.fromhex(383 * "00" + "05"))
+
+    assert client._calculate_k() == int.from_bytes(hash_instance.digest(), "big")
+
+
+def test_public_keys_are_not_recalculated():
+    client = SrpClient("Pair-Setup", "123-45-678")
+    server = SrpServer("Pair-Setup", "123-45-678")
+
+    assert client.get_public_key() == pow(client.g, client.a, client.n)
+    assert server.get_public_key() == (
+        client._calculate_k() * server.verifier + pow(server.g, server.b, server.n)
+    ) % server.n
+
+
+def test_shared_secret_calculated_once():
+    setup_code = "123-45-678"
+    server = SrpServer("Pair-Setup", setup_code)
+
+    client = SrpClient("Pair-Setup", setup_code)
+    client.set_salt(server.get_salt())
+    client.set_server_public_key(server.get_public_key())
+
+    with mock.patch.object(
+        client, "get_shared_secret", wraps=client.get_shared_secret
+    ) as get_shared_secret:
+        clients_proof = client.get_proof()
+
+        server.set_client_public_key(client.get_public_key())
+        assert server.verify_clients_proof(clients_proof) is True
+
+        assert client.verify_servers_proof(server.get_proof(clients_proof)) is True
+        assert client.get_session_key() == server.get_session_key()
+
+    assert get_shared_secret.call_count == 1
+
+    # A new server public key means a new session
+    client.set_server_public_key(SrpServer("Pair-Setup", setup_code).get_public_key())
+    assert client.get_session_key() != server.get_session_key()
@@ -27,3 +27,8 @@ def test_loads_trailing_comma():
             {"aid": 10, "iid": 13, "value": 20.5},
         ]
     }
+
+
+def test_loads_lenient():
+    """Test commentjson is used directly."""
+    assert hkjson.loads_lenient('{"aid":10,}') == {"aid": 10}
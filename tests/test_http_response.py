@@ -14,6 +14,7 @@
 # limitations under the License.
 #
 import json
+import time
 
 from aiohomekit.http.response import HttpResponse
 
@@ -331,3 +332,71 @@ def test_newline_in_payload():
         res.body
         == b'{"characteristics":[{"aid":1,"iid":10,"value":35},\r\n{"aid":1,"iid":13,"value":36.0999984741211}]}'
     )
+
+
+def make_chunked_accessories_response(size):
+    accessory = json.dumps(
+        {
+            "aid": 1,
+            "services": [
+                {
+                    "iid": 1,
+                    "type": "0000003E-0000-1000-8000-0026BB765291",
+                    "characteristics": [
+                        {
+                            "iid": 2,
+                            "type": "00000023-0000-1000-8000-0026BB765291",
+                            "format": "string",
+                            "perms": ["pr"],
+                            "value": "Dummy",
+                        }
+                    ],
+                }
+            ],
+        }
+    ).encode()
+    count = size // (len(accessory) + 1)
+    body = b'{"accessories": [' + b",".join([accessory] * count) + b"]}"
+
+    data = bytearray(
+        b"HTTP/1.1 200 OK\r\n"
+        b"Content-Type: application/hap+json\r\n"
+        b"Transfer-Encoding: chunked\r\n"
+        b"\r\n"
+    )
+    for pos in range(0, len(body), 4096):
+        chunk = body[pos : pos + 4096]
+        data += b"%x\r\n" % len(chunk) + chunk + b"\r\n"
+    data += b"0\r\n\r\n"
+
+    return bytes(data), body, count
+
+
+def feed_byte_at_a_time(data):
+    response = HttpResponse()
+
+    start = time.perf_counter()
+    for i in range(len(data)):
+        response.feed(data[i : i + 1])
+    elapsed = time.perf_counter() - start
+
+    return response, elapsed
+
+
+def test_benchmark_1mb_chunked_byte_at_a_time():
+    """
+    A 1MB chunked /accessories response arriving one byte at a time should take time
+    proportional to its size, not the square of it.
+    """
+    small_data, _, _ = make_chunked_accessories_response(256 * 1024)
+    data, body, count = make_chunked_accessories_response(1024 * 1024)
+
+    _, small_elapsed = feed_byte_at_a_time(small_data)
+    response, elapsed = feed_byte_at_a_time(data)
+
+    assert response.is_read_completely()
+    assert response.body == body
+    assert len(json.loads(response.body)["accessories"]) == count
+
+    # 4x the input should take about 4x as long. Quadratic parsing would be about 16x.
+    assert elapsed < small_elapsed * 8
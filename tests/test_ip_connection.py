@@ -0,0 +1,119 @@
+import os
+from unittest import mock
+
+import pytest
+
+from aiohomekit.controller.ip.connection import SecureHomeKitProtocol
+from aiohomekit.crypto.chacha20poly1305 import chacha20_aead_encrypt
+
+RESPONSE = b"EVENT/1.0 200 OK\r\nContent-Length: 4\r\n\r\ntest"
+
+
+def encrypt_frames(key: bytes, payload: bytes, frame_size: int = 1024) -> bytes:
+    result = b""
+    for counter, pos in enumerate(range(0, len(payload), frame_size)):
+        block = payload[pos : pos + frame_size]
+        len_bytes = len(block).to_bytes(2, byteorder="little")
+        result += len_bytes + chacha20_aead_encrypt(
+            len_bytes,
+            key,
+            counter.to_bytes(8, byteorder="little"),
+            bytes([0, 0, 0, 0]),
+            block,
+        )
+    return result
+
+
+def make_protocol():
+    a2c_key = os.urandom(32)
+    connection = mock.Mock(host="127.0.0.1", port=8080)
+    protocol = SecureHomeKitProtocol(connection, a2c_key, os.urandom(32))
+    return protocol, connection, a2c_key
+
+
+def test_data_received_single_call():
+    protocol, connection, key = make_protocol()
+
+    protocol.data_received(encrypt_frames(key, RESPONSE * 3, frame_size=10))
+
+    assert connection.event_received.call_count == 3
+    assert connection.event_received.call_args[0][0].body == b"test"
+    assert protocol._incoming_buffer == b""
+    assert protocol._incoming_offset == 0
+
+
+def test_data_received_byte_at_a_time():
+    protocol, connection, key = make_protocol()
+
+    data = encrypt_frames(key, RESPONSE * 3, frame_size=10)
+    for i in range(len(data)):
+        protocol.data_received(data[i : i + 1])
+
+    assert connection.event_received.call_count == 3
+    assert protocol.a2c_counter == len(range(0, len(RESPONSE * 3), 10))
+
+
+def test_data_received_compacts_buffer():
+    protocol, connection, key = make_protocol()
+
+    data = encrypt_frames(key, RESPONSE * 2000)
+
+    # Feed everything but the last byte so that the buffer always holds a partial frame
+    for pos in range(0, len(data) - 1, 1000):
+        protocol.data_received(data[pos : min(pos + 1000, len(data) - 1)])
+        assert protocol._incoming_offset < 64 * 1024 + 1042
+
+    protocol.data_received(data[-1:])
+
+    assert connection.event_received.call_count == 2000
+    assert protocol._incoming_buffer == b""
+
+
+def test_encode_frames_round_trip():
+    key = os.urandom(32)
+    connection = mock.Mock(host="127.0.0.1", port=8080)
+    sender = SecureHomeKitProtocol(connection, os.urandom(32), key)
+
+    payload = RESPONSE * 200
+    encoded = sender.encode_frames(payload)
+
+    assert len(encoded) == len(payload) + 18 * len(range(0, len(payload), 1024))
+    assert encoded == encrypt_frames(key, payload)
+    assert sender.c2a_counter == len(range(0, len(payload), 1024))
+
+    receiver = SecureHomeKitProtocol(connection, key, os.urandom(32))
+    receiver.data_received(encoded)
+
+    assert connection.event_received.call_count == 200
+
+
+async def test_send_bytes_single_write():
+    protocol, connection, _ = make_protocol()
+
+    transport = mock.Mock()
+    transport.is_closing.return_value = False
+    protocol.connection_made(transport)
+
+    with mock.patch("asyncio.wait_for"):
+        await protocol.send_bytes(b"x" * 5000)
+
+    transport.write.assert_called_once()
+    assert len(transport.write.call_args[0][0]) == 5000 + 5 * 18
+
+
+def test_data_received_corrupt_frame():
+    protocol, connection, key = make_protocol()
+
+    data = bytearray(encrypt_frames(key, RESPONSE * 3, frame_size=len(RESPONSE)))
+    frame_length = len(RESPONSE) + 18
+
+    # Flip a bit in the tag of the second frame
+    data[2 * frame_length - 1] ^= 1
+
+    with pytest.raises(RuntimeError):
+        protocol.data_received(bytes(data))
+
+    # The first frame was still delivered, and the state points at the bad frame
+    assert connection.event_received.call_count == 1
+    assert protocol.a2c_counter == 1
+    assert protocol._incoming_offset == frame_length
@@ -1,3 +1,6 @@
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+
 from aiohomekit.controller.ip import IpDiscovery, IpPairing
 
 
@@ -16,6 +19,32 @@ async def test_pair(controller_and_unpaired_accessory):
     }
 
 
+async def test_pair_in_executor(controller_and_unpaired_accessory):
+    controller = controller_and_unpaired_accessory
+    discovery = IpDiscovery(
+        controller,
+        {"address": "127.0.0.1", "port": 51842, "id": "00:01:02:03:04:05", "ff": 1},
+    )
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        controller.crypto_executor = executor
+
+        with mock.patch.object(executor, "submit", wraps=executor.submit) as submit:
+            pairing = await discovery.perform_pairing("alias", "031-45-154")
+
+            # Every step of pair setup ran in the executor
+            assert submit.call_count == 5
+
+            assert await pairing.get_characteristics([(1, 9)]) == {
+                (1, 9): {"value": False},
+            }
+
+            # And so did pair verify
+            assert submit.call_count == 8
+
+        await pairing.close()
+        controller.crypto_executor = None
+
 async def test_identify(controller_and_unpaired_accessory):
     discovery = IpDiscovery(
         controller_and_unpaired_accessory,
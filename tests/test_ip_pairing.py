@@ -1,10 +1,25 @@
 import asyncio
+from concurrent.futures import ThreadPoolExecutor
+import time
 from unittest import mock
 
 import pytest
 
+from aiohomekit.controller.cache import AccessoriesCache
+from aiohomekit.controller.ip.connection import ConcurrencyLimit
+from aiohomekit.controller.ip.pairing import (
+    SUBSCRIBE_PER_AID,
+    SUBSCRIBE_SINGLE,
+    IpPairing,
+    get_accessories_model,
+)
+from aiohomekit.controller.reconnect import ReconnectScheduler
+from aiohomekit.exceptions import AccessoryDisconnectedError, HttpErrorResponse
+from aiohomekit.protocol import derive_resume_session_id, pair_verify
 from aiohomekit.protocol.statuscodes import HapStatusCode
 
+from tests.accessoryserver import AccessoryRequestHandler
+
 
 async def test_list_accessories(pairing):
     accessories = await pairing.list_accessories_and_characteristics()
@@ -190,6 +205,39 @@ async def test_receiving_events(pairings):
     assert event_value == {(1, 9): {"value": True}}
 
 
+async def test_receiving_change_sets(pairings):
+    left, right = pairings
+
+    ev = asyncio.Event()
+    received = []
+
+    def handler(changes):
+        received.append(changes)
+        ev.set()
+
+    right.dispatcher_connect_changes(handler)
+    await right.subscribe([(1, 9)])
+
+    await left.put_characteristics([(1, 9, True)])
+    await asyncio.wait_for(ev.wait(), 5)
+
+    assert received == [(((1, 9), True),)]
+
+
+def test_event_received_lenient_json(pairing):
+    received = []
+    pairing.dispatcher_connect(received.append)
+
+    event = mock.Mock(body=b'{"characteristics":[{"aid":1,"iid":9,"value":true},]}')
+    pairing.connection.event_received(event)
+    assert pairing.connection._lenient_json
+
+    event = mock.Mock(body=b'{"characteristics":[{"aid":1,"iid":9,"value":false}]}')
+    pairing.connection.event_received(event)
+
+    assert received == [{(1, 9): {"value": True}}, {(1, 9): {"value": False}}]
+
+
 async def test_subscribe_invalid_iid(pairing):
     """
     Test that can get an error when subscribing to an invalid iid.
@@ -278,3 +326,335 @@ async def test_add_and_remove_pairings(pairing):
 async def test_identify(pairing):
     identified = await pairing.identify()
     assert identified is True
+
+
+async def test_pipelined_get_characteristics(pairing):
+    pairing.set_pipeline_depth(4)
+    assert pairing.pipeline_depth == 4
+    assert pairing.pairing_data["PipelineDepth"] == 4
+
+    results = await asyncio.gather(
+        *(pairing.get_characteristics([(1, 9)]) for i in range(10))
+    )
+
+    for characteristics in results:
+        assert characteristics[(1, 9)] == {"value": False}
+
+
+async def test_pipelining_allow_and_deny_lists(pairing):
+    await pairing.list_accessories_and_characteristics()
+    assert pairing.pipeline_depth == 1
+
+    with mock.patch(
+        "aiohomekit.controller.ip.pairing.PIPELINING_ALLOWED_MODELS", {"Demoserver"}
+    ):
+        await pairing.list_accessories_and_characteristics()
+        assert pairing.pipeline_depth == 4
+
+        with mock.patch(
+            "aiohomekit.controller.ip.pairing.PIPELINING_DENIED_MODELS", {"Demoserver"}
+        ):
+            await pairing.list_accessories_and_characteristics()
+            assert pairing.pipeline_depth == 1
+
+        pairing.set_pipeline_depth(2)
+        assert pairing.pipeline_depth == 2
+
+        pairing.set_pipeline_depth(None)
+        assert pairing.pipeline_depth == 4
+
+
+def test_get_accessories_model(pairing):
+    assert "PipelineDepth" not in pairing.pairing_data
+    assert pairing.pipeline_depth == 1
+
+    assert get_accessories_model([]) is None
+    assert (
+        get_accessories_model(
+            [
+                {
+                    "aid": 1,
+                    "services": [
+                        {
+                            "type": "0000003E-0000-1000-8000-0026BB765291",
+                            "characteristics": [
+                                {
+                                    "type": "00000021-0000-1000-8000-0026BB765291",
+                                    "value": "Demoserver",
+                                }
+                            ],
+                        }
+                    ],
+                }
+            ]
+        )
+        == "Demoserver"
+    )
+
+
+async def test_concurrency_limit_counts_in_flight():
+    limit = ConcurrencyLimit(2)
+    entered = []
+
+    async def request(i, release):
+        async with limit:
+            entered.append(i)
+            await release.wait()
+
+    release = asyncio.Event()
+    tasks = [asyncio.ensure_future(request(i, release)) for i in range(4)]
+    await asyncio.sleep(0)
+    assert entered == [0, 1]
+
+    # Dropping the limit must not let anything else in while two are in flight
+    limit.set_limit(1)
+    await asyncio.sleep(0)
+    assert entered == [0, 1]
+
+    limit.set_limit(4)
+    await asyncio.sleep(0)
+    assert entered == [0, 1, 2, 3]
+
+    release.set()
+    await asyncio.gather(*tasks)
+
+
+async def test_get_characteristics_coalesced(pairing):
+    await pairing.get_characteristics([(1, 9)])
+
+    with mock.patch.object(
+        pairing.connection, "get_json", wraps=pairing.connection.get_json
+    ) as get_json:
+        results = await asyncio.gather(
+            pairing.get_characteristics([(1, 9)]),
+            pairing.get_characteristics([(1, 2), (1, 9)]),
+            pairing.get_characteristics([(1, 9)], include_type=True),
+        )
+
+    assert get_json.call_count == 2
+    assert get_json.call_args_list[0][0][0] == "/characteristics?id=1.2,1.9"
+
+    assert results[0] == {(1, 9): {"value": False}}
+    assert set(results[1]) == {(1, 2), (1, 9)}
+    assert results[2][(1, 9)]["type"] == "25"
+
+
+async def test_get_characteristics_coalesced_failure(pairing):
+    await pairing.get_characteristics([(1, 9)])
+
+    with mock.patch.object(
+        pairing.connection,
+        "get_json",
+        side_effect=AccessoryDisconnectedError("Boom"),
+    ):
+        with pytest.raises(AccessoryDisconnectedError):
+            await asyncio.gather(
+                pairing.get_characteristics([(1, 9)]),
+                pairing.get_characteristics([(1, 9)]),
+            )
+
+    assert pairing._read_batches == {}
+    assert await pairing.get_characteristics([(1, 9)]) == {(1, 9): {"value": False}}
+
+
+async def test_put_characteristics_batched(pairing):
+    await pairing.get_characteristics([(1, 9)])
+    pairing.write_batching = True
+
+    with mock.patch.object(
+        pairing.connection, "put_json", wraps=pairing.connection.put_json
+    ) as put_json:
+        results = await asyncio.gather(
+            pairing.put_characteristics([(1, 9, True)]),
+            pairing.put_characteristics([(1, 9, False)]),
+            pairing.put_characteristics([(1, 9, True)]),
+        )
+
+    put_json.assert_called_once_with(
+        "/characteristics",
+        {"characteristics": [{"aid": 1, "iid": 9, "value": True}]},
+    )
+    assert results == [{}, {}, {}]
+
+    characteristics = await pairing.get_characteristics([(1, 9)])
+    assert characteristics[(1, 9)] == {"value": True}
+
+
+async def test_update_subscriptions_groups_by_aid(pairing):
+    await pairing.get_characteristics([(1, 9)])
+
+    with mock.patch.object(pairing.connection, "put_json", return_value={}) as put:
+        await pairing._update_subscriptions([(2, 1), (1, 9), (2, 3), (1, 9)], True)
+
+    assert [call[0][1] for call in put.call_args_list] == [
+        {"characteristics": [{"aid": 1, "iid": 9, "ev": True}]},
+        {
+            "characteristics": [
+                {"aid": 2, "iid": 1, "ev": True},
+                {"aid": 2, "iid": 3, "ev": True},
+            ]
+        },
+    ]
+
+
+async def test_update_subscriptions_single(pairing):
+    await pairing.get_characteristics([(1, 9)])
+    pairing.set_subscription_mode(SUBSCRIBE_SINGLE)
+
+    with mock.patch.object(pairing.connection, "put_json", return_value={}) as put:
+        await pairing._update_subscriptions([(2, 1), (1, 9)], True)
+
+    put.assert_called_once()
+    assert pairing.pairing_data["SubscriptionMode"] == SUBSCRIBE_SINGLE
+
+
+async def test_update_subscriptions_single_fallback(pairing):
+    await pairing.get_characteristics([(1, 9)])
+    pairing.set_subscription_mode(SUBSCRIBE_SINGLE)
+
+    with mock.patch.object(
+        pairing.connection,
+        "put_json",
+        side_effect=[HttpErrorResponse("Rejected", response=None), {}, {}],
+    ) as put:
+        await pairing._update_subscriptions([(2, 1), (1, 9)], True)
+
+    assert put.call_count == 3
+    assert pairing.subscription_mode == SUBSCRIBE_PER_AID
+
+
+async def test_list_accessories_cached(pairing, tmp_path):
+    pairing.controller.accessories_cache = AccessoriesCache(tmp_path)
+
+    accessories = await pairing.list_accessories_and_characteristics(config_num=1)
+
+    with mock.patch.object(pairing.connection, "get_json") as get_json:
+        cached = await pairing.list_accessories_and_characteristics(config_num=1)
+        assert not get_json.called
+
+    assert cached == accessories
+    assert pairing.pairing_data["accessories"] == accessories
+
+    # A new c# means the accessory database changed and must be fetched again
+    with mock.patch.object(pairing.connection, "get_json") as get_json:
+        get_json.return_value = {"accessories": []}
+        assert await pairing.list_accessories_and_characteristics(config_num=2) == []
+        assert get_json.called
+
+
+async def test_list_accessories_without_config_num(pairing, tmp_path):
+    pairing.controller.accessories_cache = AccessoriesCache(tmp_path)
+
+    await pairing.list_accessories_and_characteristics()
+
+    # Without a known c# nothing can be cached
+    assert list(tmp_path.iterdir()) == []
+
+
+async def _reconnect(pairing):
+    pairing.connection.transport.close()
+    await asyncio.sleep(0)
+    assert not pairing.connection.is_connected
+
+    characteristics = await pairing.get_characteristics([(1, 9)])
+    assert characteristics[(1, 9)] == {"value": False}
+
+
+async def test_reconnect_resumes_session(pairing):
+    await pairing.get_characteristics([(1, 9)])
+
+    session_id, shared_secret = pairing.connection._resume_session
+    assert session_id == derive_resume_session_id(shared_secret)
+
+    with mock.patch(
+        "aiohomekit.controller.ip.connection.pair_verify", wraps=pair_verify
+    ) as verify:
+        await _reconnect(pairing)
+
+    verify.assert_called_once_with(pairing.pairing_data, (session_id, shared_secret))
+
+    # A resumed session gets a fresh session id and secret from the accessory
+    new_session_id, new_shared_secret = pairing.connection._resume_session
+    assert new_session_id != session_id
+    assert new_shared_secret != shared_secret
+    assert new_session_id != derive_resume_session_id(new_shared_secret)
+
+
+async def test_reconnect_unknown_session_falls_back(pairing):
+    await pairing.get_characteristics([(1, 9)])
+
+    pairing.connection._resume_session = (b"\x00" * 8, b"\x00" * 32)
+    await _reconnect(pairing)
+
+    # The accessory carried on with a full pair verify
+    session_id, shared_secret = pairing.connection._resume_session
+    assert session_id == derive_resume_session_id(shared_secret)
+    assert pairing.connection._resume_supported
+
+
+async def test_reconnect_resume_rejected(pairing):
+    await pairing.get_characteristics([(1, 9)])
+
+    with mock.patch.object(AccessoryRequestHandler, "PAIR_RESUME", False):
+        await _reconnect(pairing)
+
+        assert not pairing.connection._resume_supported
+
+        with mock.patch(
+            "aiohomekit.controller.ip.connection.pair_verify", wraps=pair_verify
+        ) as verify:
+            await _reconnect(pairing)
+
+    verify.assert_called_once_with(pairing.pairing_data, None)
+
+
+async def _measure_loop_latency(until):
+    """Returns the longest time a 1ms sleep overran by until the future is done."""
+    loop = asyncio.get_event_loop()
+    worst = 0
+
+    while not until.done():
+        start = loop.time()
+        await asyncio.sleep(0.001)
+        worst = max(worst, loop.time() - start - 0.001)
+
+    return worst
+
+
+async def test_benchmark_mass_reconnect_loop_latency(controller_and_paired_accessory):
+    """
+    Reconnect 40 pairings at once and measure how long the event loop is held up,
+    with the pair verify crypto on the loop and in a thread pool.
+    """
+    controller = controller_and_paired_accessory
+    pairing_data = controller.pairings["alias"].pairing_data
+    controller.reconnect_scheduler = ReconnectScheduler(
+        max_concurrent=40, max_per_host=40
+    )
+
+    results = {}
+
+    with ThreadPoolExecutor(max_workers=4) as executor:
+        for name, crypto_executor in (("loop", None), ("executor", executor)):
+            controller.crypto_executor = crypto_executor
+            pairings = [IpPairing(controller, pairing_data) for _ in range(40)]
+
+            start = time.perf_counter()
+            reconnect = asyncio.ensure_future(
+                asyncio.gather(
+                    *(pairing.connection.ensure_connection() for pairing in pairings)
+                )
+            )
+            latency = await _measure_loop_latency(reconnect)
+            await reconnect
+            elapsed = time.perf_counter() - start
+
+            assert all(pairing.connection.is_connected for pairing in pairings)
+            await asyncio.gather(*(pairing.close() for pairing in pairings))
+
+            results[name] = (latency, elapsed)
+
+    controller.crypto_executor = None
+
+    for name, (latency, elapsed) in results.items():
+        print(f"{name}: worst loop latency {latency * 1000:.1f}ms, took {elapsed:.2f}s")
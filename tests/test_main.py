@@ -57,3 +57,39 @@ async def test_list_pairings(pairing):
         "\tPublic Key: 0xd708df2fbf4a8779669f0ccd43f4962d6d49e4274f88b1292f822edc3bcf8ed8\n"
         "\tPermissions: 1 (admin)\n"
     )
+
+
+async def test_discover_ip_stops_early():
+    seen = {}
+
+    async def iter_devices(max_seconds, async_zeroconf_instance=None, **kwargs):
+        seen.update(kwargs)
+        yield {
+            "name": "Testlicht._hap._tcp.local.",
+            "address": "127.0.0.1",
+            "port": 51842,
+            "c#": "1",
+            "ff": 0,
+            "flags": "No support for HomeKit Accessory Protocol",
+            "id": "12:34:56:00:01:0A",
+            "md": "Demoserver",
+            "pv": "1.0",
+            "s#": "1",
+            "sf": "1",
+            "statusflags": "Accessory has not been paired with any controllers.",
+            "ci": "5",
+            "category": "Lightbulb",
+        }
+
+    with mock.patch(
+        "aiohomekit.controller.controller.async_iter_homekit_devices", iter_devices
+    ), mock.patch("sys.stdout") as stdout:
+        await main(["discover-ip", "-n", "1", "-d", "12:34:56:00:01:0A"])
+
+    assert seen == {
+        "count": 1,
+        "device_ids": ["12:34:56:00:01:0A"],
+        "quiet_period": None,
+    }
+    printed = "".join(call[0][0] for call in stdout.write.call_args_list)
+    assert "Device ID (id): 12:34:56:00:01:0A" in printed
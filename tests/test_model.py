@@ -15,8 +15,11 @@
 #
 
 import base64
+import glob
+import time
+import tracemalloc
 
-from aiohomekit.model import Accessories
+from aiohomekit.model import Accessories, mixin
 from aiohomekit.model.characteristics import CharacteristicsTypes
 from aiohomekit.model.characteristics.const import (
     AudioCodecValues,
@@ -452,3 +455,92 @@ def test_set_value():
     on_char.value = True
 
     assert on_char.value is True
+
+
+def test_indexed_lookups_follow_mutations():
+    accessories = Accessories.from_file("tests/fixtures/hue_bridge.json")
+
+    accessory = accessories.aid(6623462389072572)
+    assert accessories.get_characteristic(6623462389072572, 37).type_name == "name"
+    assert accessories.get_characteristic(6623462389072572, 999999) is None
+    assert accessories.get_characteristic(1234, 37) is None
+
+    service = accessory.add_service(ServicesTypes.LIGHTBULB)
+    char = service.add_char(CharacteristicsTypes.ON)
+    char.iid = 999999
+    assert accessories.get_characteristic(6623462389072572, 999999) is char
+    assert accessory.services.iid(service.iid) is service
+
+    # Renumbering after the index was built must not return a stale entry
+    char.iid = 999998
+    assert accessory.characteristics.iid(999999) is None
+    assert accessory.characteristics.iid(999998) is char
+
+
+def test_process_changes_ignores_unknown_aid():
+    accessories = Accessories.from_file("tests/fixtures/hue_bridge.json")
+
+    accessories.process_changes(
+        {(1234, 37): {"value": "x"}, (6623462389072572, 37): {"value": "New"}}
+    )
+
+    assert accessories.get_characteristic(6623462389072572, 37).value == "New"
+
+
+def test_create_from_dict_round_trip():
+    original = Accessories.from_file("tests/fixtures/hue_bridge.json")
+    id_counter = mixin.id_counter
+
+    loaded = Accessories.from_list(original.serialize())
+
+    assert loaded.serialize() == original.serialize()
+    # The aids come from the data, so no global ids are allocated
+    assert mixin.id_counter == id_counter
+
+
+def test_create_from_dict_reserves_iids():
+    accessory = Accessories.from_file("tests/fixtures/hue_bridge.json").aid(
+        6623462389072572
+    )
+    iids = {service.iid for service in accessory.services} | {
+        char.iid for service in accessory.services for char in service.characteristics
+    }
+
+    service = accessory.add_service(ServicesTypes.LIGHTBULB)
+    char = service.add_char(CharacteristicsTypes.ON)
+
+    assert service.iid not in iids
+    assert char.iid not in iids
+
+
+def test_benchmark_fixture_models():
+    """
+    Characteristics and services are slotted, so a model with thousands of
+    characteristics stays small and quick to build.
+    """
+    fixtures = sorted(glob.glob("tests/fixtures/*.json"))
+
+    start = time.perf_counter()
+    tracemalloc.start()
+    try:
+        models = [Accessories.from_file(fixture) for fixture in fixtures]
+        allocated, _ = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    elapsed = time.perf_counter() - start
+
+    chars = [
+        char
+        for model in models
+        for accessory in model
+        for service in accessory.services
+        for char in service.characteristics
+    ]
+    assert len(chars) > 500
+
+    assert not hasattr(chars[0], "__dict__")
+    assert not hasattr(chars[0].service, "__dict__")
+
+    # Includes the services, accessories and parsed JSON, not just the characteristics
+    assert allocated / len(chars) < 2048
+    assert elapsed / len(chars) < 0.001
@@ -149,3 +149,29 @@ def test_getitem_name():
 def test_getitem_unknown_2():
     with pytest.raises(KeyError):
         CharacteristicsTypes["UNKNOWN"]
+
+
+def test_lookup_tables_match_slow_path():
+    tables = (
+        (CharacteristicsTypes._short_table, CharacteristicsTypes._get_short),
+        (CharacteristicsTypes._short_uuid_table, CharacteristicsTypes._get_short_uuid),
+        (CharacteristicsTypes._uuid_table, CharacteristicsTypes._get_uuid),
+    )
+    for table, func in tables:
+        for item, result in table.items():
+            assert func(item) == result
+
+
+def test_unknown_uuid_is_cached():
+    vendor_uuid = "4AAAF940-0DEC-11E5-B939-0800200C9A66"
+    CharacteristicsTypes._get_uuid_cached.cache_clear()
+
+    assert CharacteristicsTypes.get_uuid(vendor_uuid.lower()) == vendor_uuid
+    assert CharacteristicsTypes.get_uuid(vendor_uuid.lower()) == vendor_uuid
+    assert CharacteristicsTypes._get_uuid_cached.cache_info().hits == 1
+
+
+def test_unknown_item_is_not_cached():
+    for _ in range(2):
+        with pytest.raises(KeyError):
+            CharacteristicsTypes.get_uuid("UNKNOWN")
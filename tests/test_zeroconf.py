@@ -14,6 +14,7 @@
 # limitations under the License.
 #
 
+import asyncio
 import socket
 import sys
 from unittest.mock import MagicMock, PropertyMock, call, patch
@@ -26,16 +27,18 @@ else:
     from unittest.mock import AsyncMock  # noqa
 
 import pytest
-from zeroconf import BadTypeInNameException, Error
+from zeroconf import BadTypeInNameException, Error, ServiceStateChange
 from zeroconf.asyncio import AsyncServiceInfo
 
 from aiohomekit.exceptions import AccessoryNotFoundError
 from aiohomekit.model.feature_flags import FeatureFlags
 from aiohomekit.zeroconf import (
+    HomeKitBrowser,
     _service_info_is_homekit_device,
     async_discover_homekit_devices,
     async_find_data_for_device_id,
     async_find_device_ip_and_port,
+    async_iter_homekit_devices,
     get_from_properties,
 )
 
@@ -636,3 +639,171 @@ def test_is_homekit_device_case_insensitive():
     )
 
     assert _service_info_is_homekit_device(info)
+
+
+def make_hap_info(name, device_id, config_num=b"1"):
+    return AsyncServiceInfo(
+        "_hap._tcp.local.",
+        name,
+        addresses=[socket.inet_aton("127.0.0.1")],
+        port=1234,
+        properties={b"id": device_id, b"c#": config_num, b"md": b"any", b"s#": b"1"},
+        weight=0,
+        priority=0,
+    )
+
+
+async def test_browser_tracks_devices(mock_asynczeroconf):
+    browser = HomeKitBrowser(mock_asynczeroconf)
+    with patch("aiohomekit.zeroconf.AsyncServiceBrowser") as mock_browser:
+        mock_browser.return_value.async_cancel = AsyncMock()
+        await browser.async_start()
+    assert mock_browser.call_args[1]["handlers"] == [browser._handle_state_change]
+
+    listener = MagicMock()
+    browser.add_listener(listener)
+
+    name = "foo1._hap._tcp.local."
+    with patch(
+        "aiohomekit.zeroconf.AsyncServiceInfo",
+        return_value=make_hap_info(name, b"00:00:02:00:00:02"),
+    ):
+        browser._handle_state_change(
+            mock_asynczeroconf.zeroconf, "_hap._tcp.local.", name, ServiceStateChange.Added
+        )
+        await asyncio.sleep(0)
+
+    data = browser.get("00:00:02:00:00:02")
+    assert data["address"] == "127.0.0.1"
+    assert data["port"] == 1234
+    assert data["c#"] == "1"
+    assert browser.devices() == [data]
+    listener.assert_called_once_with("00:00:02:00:00:02", data)
+
+    # An update that doesn't change anything doesn't call listeners again
+    with patch(
+        "aiohomekit.zeroconf.AsyncServiceInfo",
+        return_value=make_hap_info(name, b"00:00:02:00:00:02"),
+    ):
+        browser._handle_state_change(
+            mock_asynczeroconf.zeroconf,
+            "_hap._tcp.local.",
+            name,
+            ServiceStateChange.Updated,
+        )
+        await asyncio.sleep(0)
+    assert listener.call_count == 1
+
+    with patch(
+        "aiohomekit.zeroconf.AsyncServiceInfo",
+        return_value=make_hap_info(name, b"00:00:02:00:00:02", config_num=b"2"),
+    ):
+        browser._handle_state_change(
+            mock_asynczeroconf.zeroconf,
+            "_hap._tcp.local.",
+            name,
+            ServiceStateChange.Updated,
+        )
+        await asyncio.sleep(0)
+    assert browser.get("00:00:02:00:00:02")["c#"] == "2"
+    assert listener.call_count == 2
+
+    browser._handle_state_change(
+        mock_asynczeroconf.zeroconf, "_hap._tcp.local.", name, ServiceStateChange.Removed
+    )
+    assert browser.get("00:00:02:00:00:02") is None
+    listener.assert_called_with("00:00:02:00:00:02", None)
+
+    await browser.async_stop()
+    mock_browser.return_value.async_cancel.assert_called_once()
+
+
+async def test_browser_expires_devices(mock_asynczeroconf):
+    browser = HomeKitBrowser(mock_asynczeroconf)
+
+    record = MagicMock()
+    record.get_expiration_time.return_value = 5000
+    mock_asynczeroconf.zeroconf.cache.get_all_by_details.return_value = [record]
+
+    name = "foo1._hap._tcp.local."
+    with patch(
+        "aiohomekit.zeroconf.AsyncServiceInfo",
+        return_value=make_hap_info(name, b"00:00:02:00:00:02"),
+    ), patch("aiohomekit.zeroconf.current_time_millis", return_value=4000):
+        await browser._async_update(name)
+        assert browser.get("00:00:02:00:00:02") is not None
+
+    with patch("aiohomekit.zeroconf.current_time_millis", return_value=5000):
+        assert browser.get("00:00:02:00:00:02") is None
+        assert browser.devices() == []
+
+
+async def test_async_find_data_for_device_id_resolves_known_name_only(
+    mock_asynczeroconf,
+):
+    devices = {
+        "foo1._hap._tcp.local.": b"00:00:01:00:00:01",
+        "foo2._hap._tcp.local.": b"00:00:01:00:00:02",
+    }
+    mock_asynczeroconf.zeroconf.cache = MagicMock(
+        get_all_by_details=MagicMock(
+            return_value=[MagicMock(alias=name) for name in devices]
+        )
+    )
+
+    def make_info(service_type, name):
+        return make_hap_info(name, devices[name])
+
+    with patch(
+        "aiohomekit.zeroconf.async_zeroconf_has_hap_service_browser", return_value=True
+    ), patch("aiohomekit.zeroconf.AsyncServiceInfo", side_effect=make_info) as info:
+        result = await async_find_data_for_device_id(
+            device_id="00:00:01:00:00:02",
+            async_zeroconf_instance=mock_asynczeroconf,
+        )
+        assert result["name"] == "foo2._hap._tcp.local."
+        assert info.call_count == 2
+
+        # Now the name is known, only that record is resolved
+        info.reset_mock()
+        result = await async_find_data_for_device_id(
+            device_id="00:00:01:00:00:02",
+            async_zeroconf_instance=mock_asynczeroconf,
+        )
+        assert result["name"] == "foo2._hap._tcp.local."
+        assert info.call_count == 1
+
+        # If the device moved to another name, fall back to resolving everything
+        devices["foo1._hap._tcp.local."] = b"00:00:01:00:00:02"
+        devices["foo2._hap._tcp.local."] = b"00:00:01:00:00:03"
+        info.reset_mock()
+        result = await async_find_data_for_device_id(
+            device_id="00:00:01:00:00:02",
+            async_zeroconf_instance=mock_asynczeroconf,
+        )
+        assert result["name"] == "foo1._hap._tcp.local."
+        assert info.call_count == 3
+
+
+@pytest.mark.parametrize(
+    "stop_condition",
+    [{"count": 1}, {"device_ids": ["00:00:02:00:00:02"]}, {"quiet_period": 0.1}],
+)
+async def test_async_iter_homekit_devices_stops_early(
+    mock_asynczeroconf, stop_condition
+):
+    info = make_hap_info("name._hap._tcp.local.", b"00:00:02:00:00:02")
+
+    loop = asyncio.get_event_loop()
+    start = loop.time()
+    with patch("aiohomekit.zeroconf.AsyncServiceInfo", return_value=info):
+        result = [
+            data["id"]
+            async for data in async_iter_homekit_devices(
+                max_seconds=10, **stop_condition
+            )
+        ]
+
+    assert result == ["00:00:02:00:00:02"]
+    assert loop.time() - start < 5
+    mock_asynczeroconf.async_close.assert_called_once()